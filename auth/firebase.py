@@ -0,0 +1,27 @@
+# auth/firebase.py
+import threading
+from typing import Optional
+
+# firebase_admin (and the google/requests stack under it) is imported and
+# initialized on first use, not at boot: it is slow to import and ADC
+# discovery may reach out to the metadata server.
+_init_lock = threading.Lock()
+
+
+def firebase_auth():
+    """The firebase_admin.auth module, with the default app initialized."""
+    import firebase_admin
+    from firebase_admin import auth, credentials
+
+    if not firebase_admin._apps:
+        with _init_lock:
+            if not firebase_admin._apps:
+                firebase_admin.initialize_app(credentials.ApplicationDefault())
+    return auth
+
+
+def firebase_project_id() -> Optional[str]:
+    import firebase_admin
+
+    firebase_auth()
+    return firebase_admin.get_app().project_id
@@ -0,0 +1,175 @@
+# auth/ratelimit.py
+"""
+Per-client rate limits in front of the routes: a token bucket per (policy,
+client). The client is the Firebase uid when the bearer token is one
+already verified (auth.tokens.token_cache), the peer IP otherwise; tokens
+are not verified here, so an unknown or forged one only gets the IP's
+bucket. Behind a proxy, run uvicorn with --proxy-headers and
+--forwarded-allow-ips so the peer IP is the client's.
+
+Policies map "METHOD /route/template" to a rate and a burst; requests
+matching none pass through untouched. Limited routes answer with
+RateLimit-Limit / RateLimit-Remaining / RateLimit-Reset, and a refused
+request gets 429 with Retry-After before reaching the app (and so the DB
+pool or Firebase).
+"""
+import math, os, re, time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import orjson
+from starlette.routing import compile_path
+
+from auth.tokens import token_cache
+from metrics.registry import HTTP_RATE_LIMITED
+
+# ---- ENV ----
+# "METHOD /path=REQUESTS/SECONDS[:BURST]; ..." (METHOD may be *, BURST defaults to REQUESTS)
+RATE_LIMITS         = os.getenv("RATE_LIMITS", "GET /auth/check=30/60:10; PATCH /me/username=10/60:5")
+RATE_LIMIT_ENABLED  = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # buckets held, all policies together
+
+_POLICY = re.compile(r"\s*(\*|[A-Z]+)\s+(/\S*)\s*=\s*(\d+)\s*/\s*(\d+(?:\.\d+)?)\s*(?::\s*(\d+))?\s*")
+_BODY_429 = orjson.dumps({"detail": "Too many requests"})
+
+
+class Policy(NamedTuple):
+    name: str       # "METHOD /path", the metrics label
+    method: str     # or "*"
+    regex: re.Pattern
+    rate: float     # tokens per second
+    burst: int
+
+
+def parse_policies(spec: str) -> list[Policy]:
+    policies = []
+    for part in filter(str.strip, spec.split(";")):
+        m = _POLICY.fullmatch(part)
+        if m is None or int(m.group(3)) == 0 or float(m.group(4)) == 0 or m.group(5) == "0":
+            raise ValueError(f"Invalid RATE_LIMITS entry: {part.strip()!r}")
+        method, path, requests, seconds, burst = m.groups()
+        regex, _, _ = compile_path(path)
+        policies.append(Policy(f"{method} {path}", method, regex, int(requests) / float(seconds), int(burst or requests)))
+    return policies
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    reset_s: float   # until the bucket is full again
+    retry_s: float   # until the next token (0 when allowed)
+
+
+class BucketTable:
+    """
+    Token buckets in one LRU table of at most `max_keys` entries. A bucket
+    is kept as the time it will be full again (GCRA), one float: in the
+    past means full, which is the same as no bucket, so such entries are
+    dropped as they reach the old end of the table.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.evicted = 0
+        self._full_at: "OrderedDict[tuple, float]" = OrderedDict()
+
+    def take(self, key: tuple, rate: float, burst: int, now: float) -> Decision:
+        full_at = self._full_at.get(key)
+        if full_at is None or full_at < now:
+            full_at = now
+        else:
+            self._full_at.move_to_end(key)
+        # tokens held: burst - (full_at - now) * rate
+        debt = full_at - now
+        if debt > (burst - 1) / rate:
+            return Decision(False, 0, debt, debt - (burst - 1) / rate)
+        full_at += 1 / rate
+        self._full_at[key] = full_at
+        self._expire(now)
+        return Decision(True, int(burst - (full_at - now) * rate + 1e-9), full_at - now, 0.0)
+
+    def _expire(self, now: float) -> None:
+        items = self._full_at
+        while items:
+            key, full_at = next(iter(items.items()))
+            if full_at < now:
+                del items[key]
+            elif len(items) > self.max_keys:
+                del items[key]
+                self.evicted += 1
+            else:
+                break
+
+    def clear(self) -> None:
+        self._full_at.clear()
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+
+rate_buckets = BucketTable()
+
+
+def client_key(scope) -> str:
+    """"uid:<uid>" for an already verified bearer token, else "ip:<peer>"."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            if value[:7].lower() == b"bearer ":
+                claims = token_cache.get(value[7:].decode("latin-1").strip())
+                if claims is not None and claims.get("uid"):
+                    return "uid:" + claims["uid"]
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """Plain ASGI middleware, like metrics.middleware.MetricsMiddleware."""
+
+    def __init__(self, app, policies: Optional[list[Policy]] = None, buckets: BucketTable = rate_buckets,
+                 enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.policies = parse_policies(RATE_LIMITS) if policies is None else policies
+        self.buckets = buckets
+        self.enabled = enabled and bool(self.policies)
+        self._rejected = [HTTP_RATE_LIMITED.labels(p.name) for p in self.policies]
+        self._limit_headers = [(b"ratelimit-limit", str(p.burst).encode()) for p in self.policies]
+
+    def _policy(self, scope) -> Optional[tuple[int, Policy]]:
+        method, path = scope["method"], scope["path"]
+        for i, p in enumerate(self.policies):
+            if (p.method == method or p.method == "*") and p.regex.match(path):
+                return i, p
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        matched = self._policy(scope)
+        if matched is None:
+            return await self.app(scope, receive, send)
+
+        i, policy = matched
+        d = self.buckets.take((i, client_key(scope)), policy.rate, policy.burst, time.monotonic())
+        headers = [
+            self._limit_headers[i],
+            (b"ratelimit-remaining", str(d.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(d.reset_s)).encode()),
+        ]
+        if not d.allowed:
+            self._rejected[i].inc()
+            headers += [
+                (b"retry-after", str(max(1, math.ceil(d.retry_s))).encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(_BODY_429)).encode()),
+            ]
+            await send({"type": "http.response.start", "status": 429, "headers": headers})
+            await send({"type": "http.response.body", "body": _BODY_429})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,199 @@
+# auth/tokens.py
+import asyncio, hashlib, os, re, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from auth.firebase import firebase_auth, firebase_project_id
+
+# ---- ENV ----
+FIREBASE_PROJECT_ID    = os.getenv("FIREBASE_PROJECT_ID") or os.getenv("GOOGLE_CLOUD_PROJECT")
+TOKEN_CACHE_MAX        = int(os.getenv("TOKEN_CACHE_MAX", "10000"))
+TOKEN_VERIFY_WORKERS   = int(os.getenv("TOKEN_VERIFY_WORKERS", "4"))
+TOKEN_CLOCK_SKEW_S     = int(os.getenv("TOKEN_CLOCK_SKEW_S", "0"))
+CERTS_REFRESH_MARGIN_S = int(os.getenv("CERTS_REFRESH_MARGIN_S", "300"))
+CERTS_MIN_REFETCH_S    = int(os.getenv("CERTS_MIN_REFETCH_S", "30"))
+
+CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+# signature checks are CPU bound and cert fetches block on the network,
+# so both run here instead of on the event loop
+_executor = ThreadPoolExecutor(max_workers=TOKEN_VERIFY_WORKERS, thread_name_prefix="idtoken")
+
+
+class InvalidToken(Exception):
+    pass
+
+
+# ----------------------------
+#  Verified-token cache
+# ----------------------------
+
+class TokenCache:
+    """Verified claims keyed by sha256(token), dropped at the token's `exp`."""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX):
+        self.max_size = max_size
+        self._items: "OrderedDict[bytes, dict]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        claims = self._items.get(key)
+        if claims is None:
+            return None
+        if claims.get("exp", 0) <= time.time():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        if claims.get("exp", 0) <= time.time():
+            return
+        key = self._key(token)
+        self._items[key] = claims
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# ----------------------------
+#  Public keys (Google x509 certs)
+# ----------------------------
+
+def _fetch_certs() -> tuple[dict, float]:
+    import requests
+
+    res = requests.get(CERTS_URL, timeout=10)
+    res.raise_for_status()
+    m = _MAX_AGE_RE.search(res.headers.get("Cache-Control", ""))
+    max_age = int(m.group(1)) if m else 3600
+    return res.json(), time.time() + max_age
+
+
+class KeySet:
+    """
+    Locally held signing certs. Once loaded they are refreshed in the
+    background shortly before they expire, so requests only wait on the
+    network for the very first fetch or for an unknown `kid` (rotation).
+    """
+
+    def __init__(self, fetch=_fetch_certs):
+        self._fetch = fetch
+        self._certs: dict = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def set(self, certs: dict, expires_at: float) -> None:
+        self._certs = dict(certs)
+        self._expires_at = expires_at
+        self._fetched_at = time.time()
+
+    async def _refresh(self) -> None:
+        loop = asyncio.get_running_loop()
+        certs, expires_at = await loop.run_in_executor(_executor, self._fetch)
+        self.set(certs, expires_at)
+
+    def _refresh_task(self) -> asyncio.Task:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh())
+            # background refreshes may fail quietly, the next request retries
+            self._refreshing.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._refreshing
+
+    async def get(self, kid: Optional[str]) -> dict:
+        now = time.time()
+        if not self._certs or now >= self._expires_at:
+            await self._refresh_task()
+        elif now >= self._expires_at - CERTS_REFRESH_MARGIN_S:
+            self._refresh_task()  # keep serving the current set meanwhile
+
+        if kid not in self._certs and time.time() - self._fetched_at >= CERTS_MIN_REFETCH_S:
+            await self._refresh_task()
+        return self._certs
+
+
+# ----------------------------
+#  Verification
+# ----------------------------
+
+def _project_id() -> Optional[str]:
+    if FIREBASE_PROJECT_ID:
+        return FIREBASE_PROJECT_ID
+    try:
+        return firebase_project_id()
+    except Exception:
+        return None
+
+
+def _verify_with_certs(token: str, certs: dict, project_id: str) -> dict:
+    """Same checks as firebase_admin.auth.verify_id_token, against local certs."""
+    from google.auth import jwt as google_jwt
+
+    try:
+        claims = google_jwt.decode(
+            token, certs=certs, audience=project_id, clock_skew_in_seconds=TOKEN_CLOCK_SKEW_S
+        )
+    except ValueError as e:
+        raise InvalidToken(str(e))
+
+    if claims.get("iss") != ISSUER_PREFIX + project_id:
+        raise InvalidToken("bad issuer")
+    sub = claims.get("sub")
+    if not isinstance(sub, str) or not sub or len(sub) > 128:
+        raise InvalidToken("bad subject")
+    if claims.get("auth_time", 0) > time.time() + TOKEN_CLOCK_SKEW_S:
+        raise InvalidToken("auth_time in the future")
+
+    claims["uid"] = sub
+    return claims
+
+
+def _verify_with_sdk(token: str) -> dict:
+    try:
+        return firebase_auth().verify_id_token(token)
+    except Exception as e:
+        raise InvalidToken(str(e))
+
+
+token_cache = TokenCache()
+key_set = KeySet()
+
+
+async def verify_token(token: str) -> dict:
+    """Verified claims for `token`; raises InvalidToken."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    loop = asyncio.get_running_loop()
+    project_id = _project_id()
+    if project_id:
+        from google.auth import jwt as google_jwt
+
+        try:
+            kid = google_jwt.decode_header(token).get("kid")
+        except Exception:
+            raise InvalidToken("malformed token")
+        certs = await key_set.get(kid)
+        claims = await loop.run_in_executor(_executor, _verify_with_certs, token, certs, project_id)
+    else:
+        # no project id to check `aud` against, let the SDK work it out
+        claims = await loop.run_in_executor(_executor, _verify_with_sdk, token)
+
+    token_cache.put(token, claims)
+    return claims
@@ -0,0 +1,104 @@
+# bench/__main__.py
+"""
+API load benchmark against a local database.
+
+    python -m bench --scale small --duration 30 --concurrency 50
+    python -m bench --scale small --check          # exit 1 on regression
+    python -m bench --scale small --save           # record new baselines
+
+Drives the FastAPI `app` from main.py in process (httpx ASGI transport),
+with Firebase replaced by bench.firebase_stub. DATABASE_URL selects the
+database; the synthetic catalog is seeded unless --no-seed is given.
+Focused benchmarks live next to this one (bench.auth_me, bench.search, ...).
+"""
+import argparse, asyncio, json, os, pathlib, sys
+
+# every request comes from one client here; bench.ratelimit measures the limiter
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+
+from bench.firebase_stub import LocalSigner, install_user_lookup
+from bench.catalog import SCALES, Scale, course_ids, media_id, seed
+from bench.load import Scenario, run_load, format_report, compare
+from cache.catalog import catalog_cache
+from db.postgres import engine
+from main import app
+
+BASELINES = pathlib.Path(__file__).with_name("baselines.json")
+N_USERS = 500
+
+
+def scenarios(scale: Scale, signer: LocalSigner) -> list[Scenario]:
+    courses = course_ids(scale)
+    tokens = [signer.token(f"bench-user-{i}") for i in range(N_USERS)]
+    words = ["Lesson", "Part", "Setup", "Networking"]
+
+    def rand_media(rng):
+        return media_id(rng.randrange(scale.medias))
+
+    return [
+        Scenario("GET /courses", 10, lambda rng: ("/courses", {})),
+        Scenario("GET /courses?type=", 5, lambda rng: (f"/courses?type={rng.choice(['video', 'podcast', 'text'])}", {})),
+        Scenario("GET /courses/{id}/medias", 20, lambda rng: (f"/courses/{rng.choice(courses)}/medias?limit=50", {})),
+        Scenario("GET /medias", 5, lambda rng: ("/medias?limit=100", {})),
+        Scenario("GET /medias/{id}", 20, lambda rng: (f"/medias/{rand_media(rng)}", {})),
+        Scenario("GET /medias/{id}/transcript", 10, lambda rng: (f"/medias/{rand_media(rng)}/transcript", {})),
+        Scenario("GET /search", 5, lambda rng: (f"/search?q={rng.choice(words)}+{rng.randrange(100)}", {})),
+        Scenario("GET /me", 20, lambda rng: ("/me", {"Authorization": f"Bearer {rng.choice(tokens)}"})),
+        Scenario("GET /auth/check", 5, lambda rng: (f"/auth/check?email=bench-user-{rng.randrange(2 * N_USERS)}@example.com", {})),
+    ]
+
+
+async def main(args) -> int:
+    scale = SCALES[args.scale]
+    if not args.no_seed:
+        await seed(scale)
+    if args.no_catalog_cache:
+        catalog_cache.max_entries = 0
+
+    signer = LocalSigner().install()
+    install_user_lookup({f"bench-user-{i}@example.com" for i in range(N_USERS)}, latency_s=args.firebase_latency)
+    selected = [s for s in scenarios(scale, signer) if not args.routes or any(r in s.name for r in args.routes)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        if args.warmup:
+            await run_load(client, selected, concurrency=args.concurrency, duration_s=args.warmup, seed=args.seed + 1)
+        stats = await run_load(client, selected, concurrency=args.concurrency, duration_s=args.duration, seed=args.seed)
+    await engine.dispose()
+
+    print(f"scale={args.scale} concurrency={args.concurrency} duration={args.duration}s")
+    print(format_report(stats))
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    if args.save:
+        baselines[args.scale] = {name: s._asdict() for name, s in stats.items()}
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"baselines saved to {BASELINES}")
+    if args.check:
+        if args.scale not in baselines:
+            print(f"NO BASELINE for scale {args.scale} in {BASELINES}: run --save first")
+            return 1
+        problems = compare(stats, baselines[args.scale], args.tolerance)
+        for p in problems:
+            print("REGRESSION", p)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(prog="python -m bench")
+    p.add_argument("--scale", choices=sorted(SCALES), default="small")
+    p.add_argument("--concurrency", type=int, default=50)
+    p.add_argument("--duration", type=float, default=30)
+    p.add_argument("--warmup", type=float, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--routes", nargs="*", help="only scenarios whose name contains one of these")
+    p.add_argument("--firebase-latency", type=float, default=0.05, help="seconds per stubbed Firebase lookup")
+    p.add_argument("--no-seed", action="store_true")
+    p.add_argument("--no-catalog-cache", action="store_true")
+    p.add_argument("--check", action="store_true", help="exit 1 when results regress past the baselines")
+    p.add_argument("--save", action="store_true", help="store these results as the baselines")
+    p.add_argument("--tolerance", type=float, default=float(os.getenv("BENCH_TOLERANCE", "0.2")))
+    sys.exit(asyncio.run(main(p.parse_args())))
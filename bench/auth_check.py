@@ -0,0 +1,98 @@
+# bench/auth_check.py
+"""
+GET /auth/check under concurrent load, with Firebase replaced by
+bench.firebase_stub (--latency seconds per lookup, calls counted per email):
+
+  burst          every email requested --repeat times at once, in mixed
+                 case: one upstream call per normalized email, made on an
+                 executor thread, never the event loop's.
+  cached         the same burst again: no upstream call.
+  negative TTL   past AUTH_CHECK_NEG_TTL_S unknown emails are looked up
+                 again, once each; known ones are still cached.
+
+    python -m bench.auth_check --emails 100 --repeat 10 --latency 0.2
+"""
+import argparse, asyncio, os, threading, time
+
+# unknown emails expire quickly here, so the run can wait them out
+os.environ.setdefault("AUTH_CHECK_NEG_TTL_S", "5")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+from firebase_admin import auth as fb_auth
+
+from bench.firebase_stub import install_user_lookup
+from main import app
+from routers.auth_public import AUTH_CHECK_NEG_TTL_S, AUTH_CHECK_TTL_S, _found, _inflight, _missing
+
+
+def check(name: str, ok: bool, detail: str) -> bool:
+    print(f"{name:<14} {detail}  {'ok' if ok else 'MISMATCH'}")
+    return ok
+
+
+async def run(args) -> bool:
+    known = {f"known-{i}@example.com" for i in range(args.emails // 2)}
+    emails = sorted(known | {f"unknown-{i}@example.com" for i in range(args.emails - len(known))})
+    calls = install_user_lookup(known, latency_s=args.latency)
+    _found.clear(); _missing.clear()
+
+    # threads the lookups ran on: never the event loop's
+    lookup, threads = fb_auth.get_user_by_email, set()
+
+    def get_user_by_email(email: str):
+        threads.add(threading.get_ident())
+        return lookup(email)
+
+    fb_auth.get_user_by_email = get_user_by_email
+
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60, limits=limits) as client:
+        async def burst() -> bool:
+            """Every email --repeat times at once; True when all answers are right."""
+            async def one(email: str, i: int):
+                r = await client.get("/auth/check", params={"email": email.upper() if i % 2 else email})
+                return r.status_code == 200 and r.json()["exists"] == (email in known)
+            return all(await asyncio.gather(*(one(e, i) for e in emails for i in range(args.repeat))))
+
+        t0 = time.perf_counter()
+        right = await burst()
+        elapsed = time.perf_counter() - t0
+        ok = check("burst", right and set(calls) == set(emails) and set(calls.values()) == {1}
+                   and threading.get_ident() not in threads,
+                   f"{len(emails) * args.repeat} requests in {elapsed * 1000:.0f} ms, {sum(calls.values())} "
+                   f"upstream calls for {len(emails)} emails, on {len(threads)} threads off the loop")
+        if elapsed >= AUTH_CHECK_NEG_TTL_S:
+            print(f"the burst outlasted AUTH_CHECK_NEG_TTL_S={AUTH_CHECK_NEG_TTL_S:g}: use fewer --emails or --repeat")
+
+        before = sum(calls.values())
+        t0 = time.perf_counter()
+        right = await burst()
+        elapsed = time.perf_counter() - t0
+        ok &= check("cached", right and sum(calls.values()) == before,
+                    f"{len(emails) * args.repeat} requests in {elapsed * 1000:.0f} ms, "
+                    f"{sum(calls.values()) - before} upstream calls")
+
+        await asyncio.sleep(AUTH_CHECK_NEG_TTL_S + 0.1)
+        right = await burst()
+        again = {e for e, n in calls.items() if n == 2}
+        ok &= check("negative TTL", right and again == set(emails) - known and max(calls.values()) == 2
+                    and AUTH_CHECK_TTL_S > AUTH_CHECK_NEG_TTL_S + 0.1,
+                    f"after {AUTH_CHECK_NEG_TTL_S:g}s: {len(again)} unknown emails looked up again, "
+                    f"{sum(n == 1 for n in calls.values())} known still cached")
+    return ok and len(_inflight) == 0
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--emails", type=int, default=100, help="half known to the stub, half not")
+    p.add_argument("--repeat", type=int, default=10, help="concurrent requests per email")
+    p.add_argument("--latency", type=float, default=0.2, help="seconds per stubbed Firebase lookup")
+    ok = asyncio.run(run(p.parse_args()))
+    print("OK" if ok else "MISMATCH")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
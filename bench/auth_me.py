@@ -0,0 +1,78 @@
+# bench/auth_me.py
+"""
+p50/p99 latency of GET /me under concurrent load with locally signed ID tokens.
+
+    python -m bench.auth_me --requests 5000 --concurrency 100 --users 200
+
+The DB dependency is replaced by an in-memory session and the /me user
+cache is cleared before every request, so only token handling is measured.
+Run once with the cache on and once with TOKEN_CACHE_MAX=0.
+"""
+import argparse, asyncio, statistics, time
+
+import httpx
+
+from bench.firebase_stub import LocalSigner
+from auth import tokens
+from crud.users import user_cache
+from db.postgres import get_primary_db
+from main import app
+from models.user import UserORM
+
+
+class _FakeResult:
+    def scalar_one_or_none(self):
+        return UserORM(sub="bench", email="bench@bench.local", username="bench")
+
+
+class _FakeSession:
+    async def execute(self, stmt, params=None):
+        return _FakeResult()
+
+    async def commit(self):
+        pass
+
+
+async def _fake_db():
+    yield _FakeSession()
+
+
+async def run(n_requests: int, concurrency: int, n_users: int) -> list[float]:
+    signer = LocalSigner().install()
+    toks = [signer.token(f"user-{i}") for i in range(n_users)]
+    app.dependency_overrides[get_primary_db] = _fake_db
+
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with sem:
+                user_cache.clear()
+                t0 = time.perf_counter()
+                r = await client.get("/me", headers={"Authorization": f"Bearer {toks[i % n_users]}"})
+                latencies.append(time.perf_counter() - t0)
+                assert r.status_code == 200, r.text
+
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+    return latencies
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=5000)
+    p.add_argument("--concurrency", type=int, default=100)
+    p.add_argument("--users", type=int, default=200)
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    lat = asyncio.run(run(args.requests, args.concurrency, args.users))
+    wall = time.perf_counter() - t0
+    q = statistics.quantiles(lat, n=100)
+    print(f"token cache max={tokens.TOKEN_CACHE_MAX} workers={tokens.TOKEN_VERIFY_WORKERS}")
+    print(f"{len(lat)} req in {wall:.2f}s  {len(lat) / wall:.0f} req/s  "
+          f"p50={q[49] * 1000:.2f}ms  p99={q[98] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
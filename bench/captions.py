@@ -0,0 +1,175 @@
+# bench/captions.py
+"""
+Caption import/export on generated multi-hour captions: parse time and
+peak memory of the streaming WebVTT/SRT parser (crud/captions.py) next to
+the JSON + Pydantic path of POST /medias, a VTT -> transcript -> VTT round
+trip, and PUT /medias/{id}/transcript + GET /medias/{id}/transcript.vtt
+through the app with an in-memory session. Exits non-zero on a mismatch.
+
+    python -m bench.captions --hours 10 --cue-s 2
+"""
+import argparse, asyncio, json, random, time, tracemalloc
+from typing import List
+
+import httpx
+from pydantic import TypeAdapter
+
+from cache.transcripts import TranscriptIndex, transcript_index
+from crud.captions import CaptionParser, parse_captions, to_vtt
+from db.postgres import get_db
+from main import app
+from models.media import TranscriptLine
+
+WORDS = "the a of to and in we this function value list request caché naïve über".split()
+
+
+def make_lines(hours: float, cue_s: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {"time": t, "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))}
+        for t in range(0, int(hours * 3600), cue_s)
+    ]
+
+
+def _ts(s: int, sep: str) -> str:
+    return f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}{sep}000"
+
+
+def make_srt(lines: list[dict], cue_s: int) -> bytes:
+    return "".join(
+        f"{i}\r\n{_ts(l['time'], ',')} --> {_ts(l['time'] + cue_s, ',')}\r\n<i>{l['text']}</i>\r\n\r\n"
+        for i, l in enumerate(lines, 1)
+    ).encode()
+
+
+def make_vtt(lines: list[dict], cue_s: int) -> bytes:
+    return ("WEBVTT - generated\n\nNOTE bench\n\n" + "".join(
+        f"c{i}\n{_ts(l['time'], '.')} --> {_ts(l['time'] + cue_s, '.')} align:start\n<v Speaker>{l['text']}\n\n"
+        for i, l in enumerate(lines)
+    )).encode()
+
+
+async def _chunks(body: bytes, size: int):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def measure(fn) -> tuple[object, float, int]:
+    """Result, wall time, and peak traced memory (of a second, traced run)."""
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+class _Result:
+    def __init__(self, row=None): self.row = row
+    def first(self): return self.row
+    def mappings(self): return self
+    def one_or_none(self): return self.row
+    def scalar_one(self): return self.row
+
+
+class _Row(dict):
+    __getattr__ = dict.__getitem__
+
+
+class _Session:
+    """UPDATE ... RETURNING course_id, crud.changes' statements and MEDIA_TRANSCRIPT, for one media."""
+    def __init__(self, media_id: str):
+        self.media_id, self.transcript = media_id, None
+
+    async def execute(self, stmt, params=None):
+        if getattr(stmt, "is_update", False):
+            self.transcript = stmt.compile().params["media_transcript"]
+            return _Result(_Row(course_id="bench"))
+        if getattr(stmt, "is_insert", False):  # crud.changes: version bump (RETURNING version), row stamps
+            return _Result(1)
+        if isinstance(params, dict) and params.get("media_id") == self.media_id:
+            return _Result(_Row(media_id=self.media_id, media_transcript=self.transcript))
+        return _Result()
+
+    async def commit(self): pass
+    async def rollback(self): pass
+
+
+async def http_round_trip(body: bytes, media_id: str) -> tuple[list[dict], bytes, float]:
+    session = _Session(media_id)
+
+    async def _db():
+        yield session
+
+    app.dependency_overrides[get_db] = _db
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        t0 = time.perf_counter()
+        r = await client.put(f"/medias/{media_id}/transcript", content=_chunks(body, 64 * 1024),
+                             headers={"Content-Type": "text/vtt"})
+        assert r.status_code == 204, r.text
+        r = await client.get(f"/medias/{media_id}/transcript.vtt")
+        r.raise_for_status()
+        elapsed = time.perf_counter() - t0
+    app.dependency_overrides.pop(get_db)
+    transcript_index.pop(media_id)
+    return session.transcript, r.content, elapsed
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--hours", type=float, default=10)
+    p.add_argument("--cue-s", type=int, default=2)
+    p.add_argument("--chunk-kb", type=int, default=64)
+    args = p.parse_args()
+
+    lines = make_lines(args.hours, args.cue_s)
+    srt, vtt = make_srt(lines, args.cue_s), make_vtt(lines, args.cue_s)
+    as_json = json.dumps(lines).encode()
+    chunk = args.chunk_kb * 1024
+    print(f"{len(lines)} cues over {args.hours:g} h: srt {len(srt) / 1e6:.1f} MB, "
+          f"vtt {len(vtt) / 1e6:.1f} MB, json {len(as_json) / 1e6:.1f} MB")
+
+    adapter = TypeAdapter(List[TranscriptLine])
+    cases = [
+        ("json + pydantic", lambda: [l.model_dump() for l in adapter.validate_json(as_json)]),
+        ("srt stream", lambda: asyncio.run(parse_captions(_chunks(srt, chunk)))),
+        ("vtt stream", lambda: asyncio.run(parse_captions(_chunks(vtt, chunk)))),
+    ]
+    ok = True
+    for name, fn in cases:
+        out, elapsed, peak = measure(fn)
+        same = out == lines
+        ok &= same
+        print(f"{name:<16} {elapsed * 1000:7.0f} ms  peak {peak / 1e6:6.1f} MB  "
+              f"{len(out) / elapsed / 1e3:6.0f}k cues/s  {'ok' if same else 'MISMATCH'}")
+
+    # the parser alone, without the lines it returns: what one upload buffers
+    def parse_only():
+        parser = CaptionParser()
+        n = 0
+        for i in range(0, len(vtt), chunk):
+            n += len(parser.feed(vtt[i:i + chunk].decode()))
+        return n + len(parser.close())
+    n, elapsed, peak = measure(parse_only)
+    print(f"{'vtt, no result':<16} {elapsed * 1000:7.0f} ms  peak {peak / 1e6:6.1f} MB  (one {args.chunk_kb} KiB chunk + one cue)")
+
+    index = TranscriptIndex(lines)
+    exported, elapsed, _ = measure(lambda: "".join(to_vtt(index.times, index.texts())).encode())
+    reparsed = asyncio.run(parse_captions(_chunks(exported, chunk)))
+    same = reparsed == lines
+    ok &= same
+    print(f"{'export vtt':<16} {elapsed * 1000:7.0f} ms  {len(exported) / 1e6:.1f} MB  "
+          f"re-parsed {'ok' if same else 'MISMATCH'}")
+
+    stored, body, elapsed = asyncio.run(http_round_trip(vtt, "bench_captions"))
+    same = stored == lines and body == exported
+    ok &= same
+    print(f"{'PUT + GET .vtt':<16} {elapsed * 1000:7.0f} ms  {'ok' if same else 'MISMATCH'}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# bench/catalog.py
+"""Synthetic catalogs at a few fixed scales, seeded through the bulk ingestion path."""
+from typing import NamedTuple
+
+import data
+from db.schema import create_schema
+
+
+class Scale(NamedTuple):
+    courses: int
+    medias: int
+    lines: int  # transcript lines per media
+
+
+SCALES = {
+    "tiny":   Scale(courses=5, medias=100, lines=12),
+    "small":  Scale(courses=20, medias=2_000, lines=30),
+    "medium": Scale(courses=200, medias=50_000, lines=60),
+    "large":  Scale(courses=1_000, medias=1_000_000, lines=60),
+}
+
+
+def course_ids(scale: Scale) -> list[str]:
+    return [c["course_id"] for c in data.COURSES] + [f"syn_course_{i}" for i in range(scale.courses)]
+
+
+def media_id(i: int) -> str:
+    return f"syn_media_{i}"
+
+
+async def seed(scale: Scale) -> None:
+    """Fixed data.py catalog plus `scale` generated rows. Existing rows are kept."""
+    await create_schema()
+    await data.seed("courses", data.COURSES)
+    await data.seed("medias", data.MEDIAS)
+    await data.seed("courses", data.synthetic_courses(scale.courses))
+    counts = await data.seed("medias", data.synthetic_medias(scale.medias, scale.courses, lines=scale.lines))
+    print(f"seeded medias: {dict(counts)}")
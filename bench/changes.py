@@ -0,0 +1,145 @@
+# bench/changes.py
+"""
+Fan-out of the catalog change feed: --subscribers SSE streams open on one
+worker (uvicorn, in process), --events change events published into the
+feed the way the LISTEN callback does, and the time until every
+subscriber has each event. Then half the subscribers reconnect with their
+Last-Event-ID and must get exactly the events they missed. No database.
+
+    python -m bench.changes --subscribers 5000 --events 50 --rate 10
+"""
+import argparse, asyncio, resource, socket, statistics, time
+
+import uvicorn
+from fastapi import FastAPI
+
+from cache.changes import change_feed
+from crud.changes import media_change
+from routers.catalog import router as catalog_router
+from models.serialize import dumps
+
+app = FastAPI()
+app.include_router(catalog_router)
+
+
+class Subscriber:
+    """Minimal SSE client on a raw socket: records (event id, arrival time)."""
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.arrivals: dict[str, float] = {}
+        self.resets = 0
+        self.ready = asyncio.Event()
+
+    async def run(self, port: int, last_event_id: str | None = None, stop_after: int | None = None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        extra = f"Last-Event-ID: {last_event_id}\r\n" if last_event_id else ""
+        writer.write(f"GET /catalog/changes HTTP/1.1\r\nHost: bench\r\n{extra}\r\n".encode())
+        await writer.drain()
+        try:
+            event_id = None
+            while stop_after is None or len(self.ids) < stop_after:
+                line = await reader.readline()
+                if not line:
+                    return
+                if line.startswith(b"retry:"):
+                    self.ready.set()
+                elif line.startswith(b"id: "):
+                    event_id = line[4:].strip().decode()
+                elif line == b"event: reset\n":
+                    self.resets += 1
+                elif line == b"\n" and event_id:
+                    self.ids.append(event_id)
+                    self.arrivals[event_id] = time.perf_counter()
+                    event_id = None
+        finally:
+            writer.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def publish(n: int, rate: float, sent: dict[str, float], prefix: str) -> None:
+    for i in range(n):
+        payload = dumps({"id": f"{prefix}{i}", **media_change("updated", f"m{i}", "c")}).decode()
+        sent[f"{prefix}{i}"] = time.perf_counter()
+        change_feed.publish(payload)
+        await asyncio.sleep(1 / rate)
+
+
+def delivery_ms(subs: list[Subscriber], sent: dict[str, float]) -> list[float]:
+    """Per event: ms until the last subscriber had it."""
+    return [
+        (max(s.arrivals[e] for s in subs) - t0) * 1000
+        for e, t0 in sent.items() if all(e in s.arrivals for s in subs)
+    ]
+
+
+async def run(args) -> None:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", lifespan="off"))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    subs = [Subscriber() for _ in range(args.subscribers)]
+    tasks = []
+    t0 = time.perf_counter()
+    for i in range(0, len(subs), 500):  # connect in waves, the backlog is finite
+        batch = subs[i:i + 500]
+        tasks += [asyncio.ensure_future(s.run(port)) for s in batch]
+        await asyncio.gather(*(s.ready.wait() for s in batch))
+    rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{change_feed.subscribers} subscribers connected in {time.perf_counter() - t0:.1f}s, "
+          f"~{(rss1 - rss0) / len(subs):.1f} KiB RSS each (server + client side)")
+
+    sent: dict[str, float] = {}
+    cpu0 = time.process_time()
+    await publish(args.events, args.rate, sent, "a")
+    await asyncio.sleep(1)
+    cpu = time.process_time() - cpu0
+    lat = delivery_ms(subs, sent)
+    q = statistics.quantiles(lat, n=100) if len(lat) > 1 else [0.0] * 99
+    complete = sum(len(s.ids) == args.events for s in subs)
+    print(f"{len(lat)}/{args.events} events reached all {len(subs)}: last subscriber after "
+          f"p50={q[49]:.0f}ms p99={q[98]:.0f}ms max={max(lat, default=0):.0f}ms; "
+          f"{cpu / (args.events * len(subs)) * 1e6:.1f} µs CPU per delivered event; {complete} complete")
+
+    # resume: half drop after the first events, reconnect with Last-Event-ID
+    half = subs[: len(subs) // 2]
+    for t in tasks[: len(half)]:
+        t.cancel()
+    await asyncio.gather(*tasks[: len(half)], return_exceptions=True)
+    missed: dict[str, float] = {}
+    await publish(args.events, args.rate, missed, "b")
+    resumed = [Subscriber() for _ in half]
+    rtasks = [
+        asyncio.ensure_future(r.run(port, s.ids[-1], stop_after=args.events))
+        for r, s in zip(resumed, half)
+    ]
+    await asyncio.wait(rtasks, timeout=10)
+    ok = sum(r.ids == list(missed) and not r.resets for r in resumed)
+    print(f"resumed with Last-Event-ID: {ok}/{len(resumed)} got exactly the {args.events} missed events")
+
+    for t in tasks + rtasks:
+        t.cancel()
+    await asyncio.gather(*tasks, *rtasks, return_exceptions=True)
+    server.should_exit = True
+    await serving
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--subscribers", type=int, default=5000)
+    p.add_argument("--events", type=int, default=50)
+    p.add_argument("--rate", type=float, default=10, help="events per second")
+    args = p.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
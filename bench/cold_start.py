@@ -0,0 +1,73 @@
+# bench/cold_start.py
+"""
+Cold start: import time of main.py, and time from process start to the
+first /ready 200 and the first catalog response under uvicorn.
+
+    python -m bench.cold_start --runs 5 --mode verify
+
+Time-to-first-request needs the local database from DATABASE_URL.
+"""
+import argparse, os, socket, statistics, subprocess, sys, time
+
+import httpx
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def import_time() -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_request(mode: str, timeout_s: float = 60) -> tuple[float, float]:
+    port = _free_port()
+    env = {**os.environ, "DB_SCHEMA_MODE": mode}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while True:
+                if time.perf_counter() - t0 > timeout_s or proc.poll() is not None:
+                    raise RuntimeError("server did not become ready")
+                try:
+                    if client.get("/ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            t_ready = time.perf_counter() - t0
+            client.get("/courses").raise_for_status()
+            t_first = time.perf_counter() - t0
+        return t_ready, t_first
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--mode", choices=["create", "verify"], default="verify")
+    p.add_argument("--import-only", action="store_true")
+    args = p.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    print(f"import main: median {statistics.median(imports) * 1000:.0f} ms")
+    if args.import_only:
+        return
+    runs = [first_request(args.mode) for _ in range(args.runs)]
+    print(f"/ready 200 after:        median {statistics.median(r[0] for r in runs) * 1000:.0f} ms ({args.mode})")
+    print(f"first /courses response: median {statistics.median(r[1] for r in runs) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
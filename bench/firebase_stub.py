@@ -0,0 +1,79 @@
+# bench/firebase_stub.py
+"""
+Firebase stand-ins for benchmarks: ID tokens signed with a local RSA key
+(accepted by auth.tokens through its key set) and an in-memory
+get_user_by_email for /auth/check.
+"""
+import datetime, os, threading, time
+from collections import Counter
+from types import SimpleNamespace
+
+os.environ.setdefault("FIREBASE_PROJECT_ID", "bench-project")
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from firebase_admin import auth as fb_auth
+from google.auth import crypt, jwt as google_jwt
+
+from auth import tokens
+
+KID = "bench-kid"
+
+
+class LocalSigner:
+    def __init__(self):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        key_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        self.signer = crypt.RSASigner.from_string(key_pem, key_id=KID)
+        self.cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+
+    def install(self) -> "LocalSigner":
+        """Make auth.tokens trust this key (no cert fetch from Google)."""
+        tokens.key_set.set({KID: self.cert_pem}, time.time() + 86400)
+        return self
+
+    def token(self, uid: str, email: str | None = None, ttl_s: int = 3600) -> str:
+        pid = tokens.FIREBASE_PROJECT_ID
+        now = int(time.time())
+        claims = {
+            "iss": tokens.ISSUER_PREFIX + pid, "aud": pid, "sub": uid,
+            "iat": now, "exp": now + ttl_s, "auth_time": now,
+            "email": email or f"{uid}@bench.local",
+        }
+        return google_jwt.encode(self.signer, claims).decode()
+
+
+def install_user_lookup(known: set[str], latency_s: float = 0.0) -> Counter:
+    """
+    Replace fb_auth.get_user_by_email with a lookup over `known` emails.
+    Returns the count of calls per email, updated as they happen.
+    """
+    password = SimpleNamespace(provider_id="password")
+    calls: Counter = Counter()
+    lock = threading.Lock()  # called from the executor's threads
+
+    def get_user_by_email(email: str):
+        with lock:
+            calls[email] += 1
+        if latency_s:
+            time.sleep(latency_s)
+        if email not in known:
+            raise fb_auth.UserNotFoundError(f"No user record found for {email}")
+        return SimpleNamespace(email=email, provider_data=[password])
+
+    fb_auth.get_user_by_email = get_user_by_email
+    return calls
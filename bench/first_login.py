@@ -0,0 +1,107 @@
+# bench/first_login.py
+"""
+Concurrent logins against a local Postgres, through crud.users.upsert_user_from_identity,
+with the rows counted afterwards:
+
+  first login     one new UID: every call returns the same user, one row.
+  relink          a new UID with the email of an existing row (Firebase
+                  account recreated): that row is taken over, no new row.
+  email moved     a UID that has a row logs in with the email of another
+                  row: the email moves to the UID's row, both rows remain.
+
+    python -m bench.first_login --concurrency 300
+"""
+import argparse, asyncio, time, uuid
+
+from sqlalchemy import delete, or_, select
+
+from crud.users import upsert_user_from_identity
+from db.postgres import engine, Base, AsyncSessionLocal
+from models.user import UserORM
+
+
+async def login(uid: str, email: str):
+    async with AsyncSessionLocal() as db:
+        u = await upsert_user_from_identity(db, uid=uid, email=email)
+        return u.user_id
+
+
+async def logins(concurrency: int, uid: str, email: str) -> tuple[set, float]:
+    t0 = time.perf_counter()
+    ids = await asyncio.gather(*(login(uid, email) for _ in range(concurrency)))
+    return set(ids), time.perf_counter() - t0
+
+
+async def rows_of(tag: str) -> dict[str, tuple]:
+    """sub -> (user_id, email) of the rows this run created."""
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(
+            select(UserORM.sub, UserORM.user_id, UserORM.email)
+            .where(or_(UserORM.sub.like(f"{tag}%"), UserORM.email.like(f"{tag}%")))
+        )
+        return {sub: (user_id, email) for sub, user_id, email in res}
+
+
+async def seed(*rows: tuple[str, str]) -> dict[str, object]:
+    async with AsyncSessionLocal() as db:
+        objs = [UserORM(sub=sub, email=email) for sub, email in rows]
+        db.add_all(objs)
+        await db.commit()
+        return {o.sub: o.user_id for o in objs}
+
+
+def check(name: str, elapsed: float, ok: bool, detail: str) -> bool:
+    print(f"{name:<12} {elapsed * 1000:6.0f} ms  {detail}  {'ok' if ok else 'MISMATCH'}")
+    return ok
+
+
+async def run(concurrency: int) -> bool:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    tag = f"first-login-{uuid.uuid4().hex[:8]}"
+    ok = True
+    try:
+        # first login
+        uid, email = f"{tag}-new", f"{tag}-new@bench.local"
+        ids, elapsed = await logins(concurrency, uid, email)
+        rows = await rows_of(f"{tag}-new")
+        ok &= check("first login", elapsed, len(ids) == 1 and len(rows) == 1 and rows[uid] == (ids.pop(), email),
+                    f"rows={len(rows)}")
+
+        # relink: the email's row changes sub
+        old, uid, email = f"{tag}-old", f"{tag}-recreated", f"{tag}-relink@bench.local"
+        seeded = await seed((old, email))
+        ids, elapsed = await logins(concurrency, uid, email)
+        rows = {s: r for s, r in (await rows_of(tag)).items() if s in (old, uid)}
+        ok &= check("relink", elapsed, ids == {seeded[old]} and rows == {uid: (seeded[old], email)},
+                    f"rows={len(rows)}")
+
+        # email moved: the UID keeps its row, the other row loses the email
+        uid, other, email = f"{tag}-has-row", f"{tag}-other", f"{tag}-moved@bench.local"
+        seeded = await seed((uid, f"{tag}-before@bench.local"), (other, email))
+        ids, elapsed = await logins(concurrency, uid, email)
+        rows = {s: r for s, r in (await rows_of(tag)).items() if s in (uid, other)}
+        ok &= check("email moved", elapsed,
+                    ids == {seeded[uid]} and rows == {uid: (seeded[uid], email), other: (seeded[other], None)},
+                    f"rows={len(rows)}")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(UserORM).where(UserORM.sub.like(f"{tag}%")))
+            await db.commit()
+        left = len(await rows_of(tag))
+        await engine.dispose()
+    return ok and left == 0
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--concurrency", type=int, default=300)
+    args = p.parse_args()
+    ok = asyncio.run(run(args.concurrency))
+    print("OK" if ok else "MISMATCH")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench/list_payload.py
+"""
+Payload size and latency of a media listing with and without transcripts
+(local Postgres).
+
+    python -m bench.list_payload --medias 500 --lines 720
+
+"before" asks for every column (what the listings used to return),
+"after" is the default lean projection.
+"""
+import argparse, asyncio, statistics, time
+
+import httpx
+from sqlalchemy.dialects.postgresql import insert
+
+from data import long_transcript
+from db.postgres import engine, Base, AsyncSessionLocal
+from main import app
+from models.course import CourseORM
+from models.media import MediaORM
+from routers.media import MEDIA_FIELDS
+
+COURSE_ID = "bench_payload"
+
+
+async def seed(medias: int, lines: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(CourseORM).values(
+            course_id=COURSE_ID, course_title="Bench", course_type="video",
+        ).on_conflict_do_nothing(index_elements=["course_id"]))
+        rows = [{
+            "media_id": f"{COURSE_ID}_{i:06d}", "media_title": f"Lecture {i}",
+            "media_description": "bench", "course_id": COURSE_ID,
+            "media_url": f"https://example.invalid/{i}.mp4",
+            "media_transcript": long_transcript(f"Lecture {i}", n=lines),
+        } for i in range(medias)]
+        await session.execute(insert(MediaORM).values(rows).on_conflict_do_nothing(index_elements=["media_id"]))
+        await session.commit()
+
+
+async def measure(client: httpx.AsyncClient, params: dict, repeat: int) -> tuple[int, float]:
+    times, size = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        r = await client.get(f"/courses/{COURSE_ID}/medias", params=params)
+        times.append(time.perf_counter() - t0)
+        r.raise_for_status()
+        size = len(r.content)
+    return size, statistics.median(times)
+
+
+async def run(medias: int, lines: int, repeat: int) -> None:
+    await seed(medias, lines)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        before = await measure(client, {"limit": 500, "fields": ",".join(MEDIA_FIELDS)}, repeat)
+        after = await measure(client, {"limit": 500}, repeat)
+        titles = await measure(client, {"limit": 500, "fields": "media_title"}, repeat)
+    for name, (size, t) in (("before", before), ("after", after), ("titles", titles)):
+        print(f"{name:>7}: {size / 1024:>10.1f} KiB  {t * 1000:>8.2f} ms")
+    await engine.dispose()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--medias", type=int, default=500)
+    p.add_argument("--lines", type=int, default=720)
+    p.add_argument("--repeat", type=int, default=10)
+    args = p.parse_args()
+    asyncio.run(run(args.medias, args.lines, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
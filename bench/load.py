@@ -0,0 +1,96 @@
+# bench/load.py
+"""Closed-loop async load generator with per-route latency percentiles."""
+import asyncio, random, statistics, time
+from collections import defaultdict
+from typing import Callable, NamedTuple
+
+import httpx
+
+
+class Scenario(NamedTuple):
+    name: str                                       # route template, used as the report key
+    weight: int
+    request: Callable[[random.Random], tuple[str, dict]]  # rng -> (url, headers)
+    ok: tuple[int, ...] = (200,)
+
+
+class RouteStats(NamedTuple):
+    count: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def _percentiles(latencies: list[float]) -> tuple[float, float, float]:
+    if len(latencies) < 2:
+        v = latencies[0] * 1000 if latencies else 0.0
+        return v, v, v
+    q = statistics.quantiles(latencies, n=100, method="inclusive")
+    return q[49] * 1000, q[94] * 1000, q[98] * 1000
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    scenarios: list[Scenario],
+    *,
+    concurrency: int,
+    duration_s: float,
+    seed: int = 0,
+) -> dict[str, RouteStats]:
+    """`concurrency` workers each send one request at a time for `duration_s`."""
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    weights = [s.weight for s in scenarios]
+    deadline = time.perf_counter() + duration_s
+
+    async def worker(n: int):
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < deadline:
+            sc = rng.choices(scenarios, weights)[0]
+            url, headers = sc.request(rng)
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(url, headers=headers)
+                failed = r.status_code not in sc.ok
+            except httpx.HTTPError:
+                failed = True
+            latencies[sc.name].append(time.perf_counter() - t0)
+            if failed:
+                errors[sc.name] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    out = {}
+    for name, lat in sorted(latencies.items()):
+        p50, p95, p99 = _percentiles(lat)
+        out[name] = RouteStats(len(lat), errors[name], len(lat) / elapsed, p50, p95, p99)
+    return out
+
+
+def format_report(stats: dict[str, RouteStats]) -> str:
+    lines = [f"{'route':<40} {'count':>7} {'err':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    for name, s in stats.items():
+        lines.append(f"{name:<40} {s.count:>7} {s.errors:>5} {s.rps:>9.1f} {s.p50_ms:>8.2f} {s.p95_ms:>8.2f} {s.p99_ms:>8.2f}")
+    return "\n".join(lines)
+
+
+def compare(stats: dict[str, RouteStats], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Regressions against `baseline` ({route: {rps, p95_ms, p99_ms}}), as messages; a route without one is one."""
+    problems = []
+    for name, s in stats.items():
+        if s.errors:
+            problems.append(f"{name}: {s.errors} failed requests")
+        base = baseline.get(name)
+        if not base:
+            problems.append(f"{name}: no baseline, run --save")
+            continue
+        if s.rps < base["rps"] * (1 - tolerance):
+            problems.append(f"{name}: {s.rps:.1f} req/s < baseline {base['rps']:.1f}")
+        for key in ("p95_ms", "p99_ms"):
+            if getattr(s, key) > base[key] * (1 + tolerance):
+                problems.append(f"{name}: {key} {getattr(s, key):.2f} > baseline {base[key]:.2f}")
+    return problems
@@ -0,0 +1,86 @@
+# bench/media_pages.py
+"""
+OFFSET vs keyset paging over a synthetic `medias` table (local Postgres).
+
+    python -m bench.media_pages --rows 1000000 --page 100
+
+Rows go into a dedicated course (`bench_course`) and are removed with --drop.
+"""
+import argparse, asyncio, time
+
+from sqlalchemy import text
+
+from db.postgres import engine, Base
+import models.course, models.media  # noqa: F401  (register tables)
+
+COURSE_ID = "bench_course"
+
+
+async def seed(rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "INSERT INTO courses (course_id, course_title, course_type) "
+            "VALUES (:c, 'Bench', 'video') ON CONFLICT DO NOTHING"
+        ), {"c": COURSE_ID})
+        have = await conn.scalar(text("SELECT count(*) FROM medias WHERE course_id = :c"), {"c": COURSE_ID})
+        if have >= rows:
+            return
+        await conn.execute(text(
+            "INSERT INTO medias (media_id, media_title, media_description, course_id, media_url) "
+            "SELECT 'bench_' || lpad(g::text, 9, '0'), 'Title ' || g, 'desc', :c, 'https://example.invalid/' || g "
+            "FROM generate_series(:lo, :hi) g ON CONFLICT DO NOTHING"
+        ), {"c": COURSE_ID, "lo": have + 1, "hi": rows})
+        await conn.execute(text("ANALYZE medias"))
+
+
+async def timed(conn, sql: str, params: dict, repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    rows = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = (await conn.execute(text(sql), params)).all()
+        best = min(best, time.perf_counter() - t0)
+    return best, rows
+
+
+async def run(rows: int, page: int, repeat: int, drop: bool) -> None:
+    await seed(rows)
+    offset_sql = (
+        "SELECT media_id, media_title FROM medias WHERE course_id = :c "
+        "ORDER BY media_id LIMIT :n OFFSET :o"
+    )
+    keyset_sql = (
+        "SELECT media_id, media_title FROM medias WHERE course_id = :c AND media_id > :after "
+        "ORDER BY media_id LIMIT :n"
+    )
+    print(f"{'depth':>10} {'offset ms':>10} {'keyset ms':>10}")
+    async with engine.connect() as conn:
+        for depth in (0, 1_000, 10_000, 100_000, rows // 2, rows - page):
+            if depth < 0 or depth >= rows:
+                continue
+            t_off, got = await timed(conn, offset_sql, {"c": COURSE_ID, "n": page, "o": depth}, repeat)
+            after = f"bench_{depth:09d}"
+            t_key, got_k = await timed(conn, keyset_sql, {"c": COURSE_ID, "n": page, "after": after}, repeat)
+            assert [r[0] for r in got] == [r[0] for r in got_k]
+            print(f"{depth:>10} {t_off * 1000:>10.2f} {t_key * 1000:>10.2f}")
+
+    if drop:
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM medias WHERE course_id = :c"), {"c": COURSE_ID})
+            await conn.execute(text("DELETE FROM courses WHERE course_id = :c"), {"c": COURSE_ID})
+    await engine.dispose()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--page", type=int, default=100)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--drop", action="store_true")
+    args = p.parse_args()
+    asyncio.run(run(args.rows, args.page, args.repeat, args.drop))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# bench/overload.py
+"""
+Goodput under a burst, with and without the adaptive DB limiter
+(db/limiter.py). Clients give up after --client-timeout and retry right
+away, leaving the abandoned request running on the server, as real apps
+do; goodput counts only 200s that arrived before the client gave up.
+
+    python -m bench.overload --clients 400 --seconds 15
+
+By default the database is simulated: a pool of DB_POOL_SIZE +
+DB_MAX_OVERFLOW connections with DB_POOL_TIMEOUT_S checkout timeout, in
+front of a server with --db-cores cores taking --query-ms per query (more
+in-flight queries than cores wait for one: throughput stays at cores /
+query time, latency grows).
+--real sends the burst to GET /courses on the database from DATABASE_URL
+instead (seed it with data.py first).
+
+The limiter must deliver at least the goodput of the pool alone, with its
+cap below the pool's capacity at the end of the burst; exits non-zero if not.
+
+Before the bursts, checks that only DB use takes a limiter slot: --downloads
+slow clients of /medias/{id}/stream at once all get their file, and with
+every slot taken a cached GET /courses is still answered while an uncached
+one gets 503. Exits non-zero if not.
+"""
+import argparse, asyncio, itertools, os, statistics, tempfile, time
+from collections import Counter
+
+import httpx
+
+import db.postgres as pg
+import routers.media
+from cache.catalog import catalog_cache
+from crud.catalog import ingest
+from main import app
+
+STREAM_FILE = "bench-overload.mp4"
+
+
+class SimulatedDB:
+    """Connection pool + CPU-bound server, enough to reproduce pool queueing."""
+
+    def __init__(self, connections: int, pool_timeout_s: float, cores: int, query_s: float):
+        self.pool = asyncio.Semaphore(connections)
+        self.pool_timeout_s = pool_timeout_s
+        self.cores = asyncio.Semaphore(cores)  # the server's run queue
+        self.query_s = query_s
+
+    def __call__(self):
+        return _SimSession(self)
+
+
+class _Rows:
+    def mappings(self):
+        return self
+
+    def all(self):
+        return [{"course_id": "c1", "course_title": "t", "course_description": None, "course_type": "video"}]
+
+    def scalar_one_or_none(self):  # MEDIA_URL
+        return STREAM_FILE
+
+
+class _SimSession:
+    slot = None  # set by db.postgres._session, taken on first execute like LimitedSession
+
+    def __init__(self, db: SimulatedDB):
+        self.db = db
+        self.held = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.held:
+            self.db.pool.release()
+
+    async def execute(self, stmt, params=None):
+        if self.slot is not None:
+            await self.slot.take()
+        if not self.held:
+            await asyncio.wait_for(self.db.pool.acquire(), self.db.pool_timeout_s)
+            self.held = True
+        async with self.db.cores:
+            await asyncio.sleep(self.db.query_s)
+        return _Rows()
+
+    async def rollback(self):
+        pass
+
+
+async def burst(clients: int, seconds: float, client_timeout_s: float) -> dict:
+    outcomes: Counter = Counter()
+    good_latencies: list[float] = []
+    abandoned: set[asyncio.Task] = set()
+    seq = itertools.count()
+    deadline = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def one_client():
+            while time.perf_counter() < deadline:
+                # a fresh query string per request, so the catalog cache never answers
+                task = asyncio.ensure_future(client.get(f"/courses?type=bench{next(seq)}"))
+                t0 = time.perf_counter()
+                done, _ = await asyncio.wait((task,), timeout=client_timeout_s)
+                if not done:
+                    outcomes["client timeout"] += 1
+                    abandoned.add(task)
+                    task.add_done_callback(abandoned.discard)
+                    continue
+                try:
+                    r = task.result()
+                except Exception:
+                    outcomes["error"] += 1
+                    continue
+                if r.status_code == 200:
+                    outcomes["ok"] += 1
+                    good_latencies.append(time.perf_counter() - t0)
+                else:
+                    outcomes[str(r.status_code)] += 1
+                    if r.status_code == 503:
+                        await asyncio.sleep(min(float(r.headers.get("retry-after", "1")), 1.0))
+
+        await asyncio.gather(*(one_client() for _ in range(clients)))
+        still_running = len(abandoned)
+        for task in list(abandoned):
+            task.cancel()
+
+    q = statistics.quantiles(good_latencies, n=100) if len(good_latencies) > 1 else [0.0] * 99
+    return {
+        "goodput": outcomes["ok"] / seconds,
+        "outcomes": dict(outcomes),
+        "p50_ms": q[49] * 1000,
+        "p99_ms": q[98] * 1000,
+        "abandoned_running": still_running,
+    }
+
+
+def _scope(path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 5000), "server": ("bench", 80),
+    }
+
+
+async def slow_download(media_id: str, chunk_delay_s: float) -> int:
+    """Status of one download by a client that takes chunk_delay_s to read each chunk."""
+    status = 0
+
+    async def receive():
+        await asyncio.Event().wait()  # never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            await asyncio.sleep(chunk_delay_s)
+
+    await app(_scope(f"/medias/{media_id}/stream"), receive, send)
+    return status
+
+
+async def held_slots(args) -> bool:
+    """Slots are taken by DB use only: slow downloads and cache hits do not keep or need one."""
+    media_id = "bench_overload_stream"
+    if args.real:
+        async with pg.AsyncSessionLocal() as db:
+            course = {"course_id": "bench_overload", "course_title": "Overload bench", "course_type": "video"}
+            media = {"media_id": media_id, "media_title": "Overload bench", "media_description": "",
+                     "course_id": "bench_overload", "media_url": STREAM_FILE}
+            async for _ in ingest(db, "courses", [(1, course)]):
+                pass
+            async for _ in ingest(db, "medias", [(1, media)]):
+                pass
+    root = tempfile.mkdtemp()
+    with open(os.path.join(root, STREAM_FILE), "wb") as f:
+        f.write(os.urandom(8 * 1024 * 1024))
+    routers.media.MEDIA_ROOT = root
+    routers.media._media_urls.clear()  # every download looks its file up
+
+    t0 = time.perf_counter()
+    statuses = Counter(await asyncio.gather(*(slow_download(media_id, 0.1) for _ in range(args.downloads))))
+    print(f"{args.downloads} slow downloads at once: {dict(statuses)} in {time.perf_counter() - t0:.1f}s, "
+          f"limit {pg.db_limiter.limit:.0f}")
+    ok = statuses == Counter({200: args.downloads})
+
+    catalog_cache.settle_s = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/courses?type=cached")
+        for _ in range(int(pg.db_limiter.limit)):
+            await pg.db_limiter.acquire()
+        try:
+            cached = (await client.get("/courses?type=cached")).status_code
+            uncached = (await client.get("/courses?type=uncached")).status_code
+        finally:
+            for _ in range(int(pg.db_limiter.limit)):
+                pg.db_limiter.release(None)
+    print(f"every slot taken: cached GET /courses {cached}, uncached {uncached}")
+    await pg.engine.dispose()
+    return ok and (cached, uncached) == (200, 503)
+
+
+async def run(args) -> dict:
+    if not args.real:
+        pg.AsyncSessionLocal = SimulatedDB(
+            pg.DB_POOL_SIZE + pg.DB_MAX_OVERFLOW, pg.DB_POOL_TIMEOUT_S, args.db_cores, args.query_ms / 1000
+        )
+    try:
+        await burst(args.warmup_clients, args.warmup_seconds, args.client_timeout)
+        return await burst(args.clients, args.seconds, args.client_timeout)
+    finally:
+        await pg.engine.dispose()  # pooled connections belong to this event loop
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--clients", type=int, default=400)
+    p.add_argument("--seconds", type=float, default=15)
+    p.add_argument("--client-timeout", type=float, default=2.0)
+    p.add_argument("--db-cores", type=int, default=4)
+    p.add_argument("--query-ms", type=float, default=20)
+    p.add_argument("--warmup-clients", type=int, default=4, help="light load first, so latency has a baseline")
+    p.add_argument("--warmup-seconds", type=float, default=3)
+    p.add_argument("--real", action="store_true")
+    p.add_argument("--downloads", type=int, default=12, help="concurrent slow downloads, more than the slots")
+    args = p.parse_args()
+
+    pg.db_limiter = pg._make_limiter()
+    if not args.real:
+        pg.AsyncSessionLocal = SimulatedDB(pg.DB_POOL_SIZE + pg.DB_MAX_OVERFLOW, pg.DB_POOL_TIMEOUT_S, 4, 0.01)
+    if not asyncio.run(held_slots(args)):
+        print("MISMATCH")
+        raise SystemExit(1)
+
+    catalog_cache.max_entries = 0  # never cache, every request reaches the DB
+    goodput = {}
+    for enabled in (False, True):
+        pg.db_limiter = pg._make_limiter()
+        pg.db_limiter.enabled = enabled
+        res = asyncio.run(run(args))
+        goodput[enabled] = res["goodput"]
+        label = "adaptive limiter" if enabled else "pool queue only"
+        print(f"{label:<17} goodput {res['goodput']:7.1f} req/s  p50={res['p50_ms']:.0f}ms p99={res['p99_ms']:.0f}ms  "
+              f"{res['outcomes']}  still running after the burst: {res['abandoned_running']}")
+    limiter = pg.db_limiter
+    print(f"{'':<17} final limit {limiter.limit:.1f} of {limiter.max_limit}, rejected {limiter.rejected}")
+    ok = goodput[True] >= goodput[False] and limiter.limit < limiter.max_limit
+    print("OK" if ok else "MISMATCH")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# bench/ratelimit.py
+"""
+Per-request cost of the rate limit middleware (auth/ratelimit.py), called
+directly as ASGI around an app that only answers 204: no policy matched,
+allowed by IP, allowed by uid (verified-token cache hit), refused, and a
+flood of distinct IPs against a bounded bucket table. Also checks the 429
+and its headers. No database, no Firebase.
+
+    python -m bench.ratelimit --requests 200000 --ips 1000000 --max-keys 100000
+"""
+import argparse, asyncio, time, tracemalloc
+
+from auth.ratelimit import BucketTable, RateLimitMiddleware, parse_policies
+from auth.tokens import token_cache
+
+# the shipped defaults plus a few, so matching walks a realistic list
+POLICIES = "GET /auth/check=30/60:10; PATCH /me/username=10/60:5; POST /medias=60/60; PUT /medias/{media_id}/transcript=10/60"
+
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 204, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+class _Capture:
+    def __init__(self):
+        self.status = 0
+        self.headers: dict[bytes, bytes] = {}
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.headers = dict(message["headers"])
+
+
+def scope(method: str, path: str, ip: str, token: str | None = None) -> dict:
+    headers = [(b"host", b"bench"), (b"user-agent", b"bench")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": (ip, 5000)}
+
+
+async def per_request_us(app, scopes: list[dict], n: int) -> float:
+    send = _Capture()
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for i in range(n):
+            await app(scopes[i % len(scopes)], _receive, send)
+        best = min(best, (time.perf_counter() - t0) / n * 1e6)
+    return best
+
+
+async def run(args) -> None:
+    generous = parse_policies(POLICIES.replace("GET /auth/check=30/60:10", "GET /auth/check=1000000000/1"))
+    mw = RateLimitMiddleware(_app, policies=generous, buckets=BucketTable(args.max_keys), enabled=True)
+
+    token_cache.put("bench-token", {"uid": "bench-user", "exp": time.time() + 3600})
+    by_ip = [scope("GET", "/auth/check", f"10.0.{i // 256}.{i % 256}") for i in range(1000)]
+    cases = [
+        ("app alone", _app, by_ip),
+        ("no policy matched", mw, [scope("GET", "/courses", "10.0.0.1")]),
+        ("allowed, by IP", mw, by_ip),
+        ("allowed, by uid", mw, [scope("GET", "/auth/check", "10.0.0.1", "bench-token")]),
+        ("allowed, unverified token", mw, [scope("GET", "/auth/check", "10.0.0.1", "not-a-verified-token")]),
+    ]
+    base = None
+    for name, app, scopes in cases:
+        us = await per_request_us(app, scopes, args.requests)
+        base = us if base is None else base
+        print(f"{name:<28} {us:6.2f} µs/request  (+{us - base:.2f} over the app)")
+
+    strict = RateLimitMiddleware(_app, policies=parse_policies(POLICIES), buckets=BucketTable(args.max_keys), enabled=True)
+    s = scope("GET", "/auth/check", "10.9.9.9")
+    send = _Capture()
+    statuses = []
+    for _ in range(12):
+        await strict(s, _receive, send)
+        statuses.append(send.status)
+    us = await per_request_us(strict, [s], args.requests)
+    print(f"{'refused (429)':<28} {us:6.2f} µs/request  (+{us - base:.2f} over the app)")
+    print(f"  burst 10: statuses {statuses[:10].count(204)}x204 then {statuses[10:]}; headers of the 429: "
+          + ", ".join(f"{k.decode()}={v.decode()}" for k, v in send.headers.items() if k != b"content-type"))
+    ok = statuses == [204] * 10 + [429, 429] and send.headers.get(b"retry-after") == b"2"
+
+    # a flood of distinct IPs at the shipped /auth/check policy: the table stays at --max-keys
+    def ip(i: int) -> str:
+        return f"{i >> 24}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+    table = BucketTable(args.max_keys)
+    flood = RateLimitMiddleware(_app, policies=parse_policies(POLICIES), buckets=table, enabled=True)
+    scopes = [scope("GET", "/auth/check", ip(i)) for i in range(args.ips)]
+    t0 = time.perf_counter()
+    for s in scopes:
+        await flood(s, _receive, send)
+    elapsed = time.perf_counter() - t0
+    print(f"{args.ips} distinct IPs: {elapsed / args.ips * 1e6:.2f} µs/request, "
+          f"table {len(table)} buckets, {table.evicted} evicted")
+    ok = ok and len(table) == args.max_keys and table.evicted == args.ips - args.max_keys
+
+    table = BucketTable(args.max_keys)
+    flood = RateLimitMiddleware(_app, policies=parse_policies(POLICIES), buckets=table, enabled=True)
+    tracemalloc.start()
+    for s in scopes[: 2 * args.max_keys]:
+        await flood(s, _receive, send)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  full table: {size / 2**20:.1f} MiB, {size / len(table):.0f} bytes per bucket")
+    print("OK" if ok else "MISMATCH")
+    if not ok:
+        raise SystemExit(1)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=200_000)
+    p.add_argument("--ips", type=int, default=1_000_000)
+    p.add_argument("--max-keys", type=int, default=100_000)
+    asyncio.run(run(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
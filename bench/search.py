@@ -0,0 +1,91 @@
+# bench/search.py
+"""
+/search over a generated corpus (local Postgres).
+
+    python -m bench.search --transcripts 100000 --lines 30
+
+Transcripts are random sentences over a fixed vocabulary, written straight
+into `medias` and indexed with crud.transcripts.backfill_transcript_index.
+"""
+import argparse, asyncio, statistics, time
+
+import httpx
+from sqlalchemy import text
+
+from crud.transcripts import backfill_transcript_index
+from db.postgres import engine, Base, AsyncSessionLocal
+from main import app
+
+COURSE_ID = "bench_search"
+VOCAB = (
+    "array pointer closure thread mutex kernel socket widget state route "
+    "container pod deployment service gradient tensor matrix vector index query "
+    "cache latency throughput replica shard cursor stream buffer packet protocol"
+).split()
+QUERIES = ["kernel", "cache latency", "\"matrix vector\"", "pod -container", "gradient OR tensor", "socket buffer packet"]
+
+
+async def seed(transcripts: int, lines: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "INSERT INTO courses (course_id, course_title, course_type) "
+            "VALUES (:c, 'Bench', 'video') ON CONFLICT DO NOTHING"
+        ), {"c": COURSE_ID})
+        have = await conn.scalar(text("SELECT count(*) FROM medias WHERE course_id = :c"), {"c": COURSE_ID})
+        if have < transcripts:
+            vocab = "ARRAY[" + ",".join(f"'{w}'" for w in VOCAB) + "]"
+            await conn.execute(text(f"""
+                INSERT INTO medias (media_id, media_title, media_description, course_id, media_url, media_transcript)
+                SELECT 'search_' || lpad(g::text, 7, '0'), 'Lecture ' || g, 'bench', :c,
+                       'https://example.invalid/' || g,
+                       (SELECT jsonb_agg(jsonb_build_object(
+                                 'time', i * 5,
+                                 'text', (SELECT string_agg(({vocab})[1 + floor(random() * {len(VOCAB)})::int], ' ')
+                                          FROM generate_series(1, 8 + (g + i) % 5))))
+                          FROM generate_series(0, :lines - 1) i)
+                FROM generate_series(:lo, :hi) g
+                ON CONFLICT DO NOTHING
+            """), {"c": COURSE_ID, "lo": have + 1, "hi": transcripts, "lines": lines})
+    async with AsyncSessionLocal() as session:
+        t0 = time.perf_counter()
+        n = await backfill_transcript_index(session)
+        print(f"indexed {n} lines in {time.perf_counter() - t0:.1f}s")
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE transcript_lines"))
+
+
+async def run(transcripts: int, lines: int, repeat: int, pages: int) -> None:
+    await seed(transcripts, lines)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'query':>24} {'page':>5} {'p50 ms':>8} {'max ms':>8}")
+        for q in QUERIES:
+            cursor = None
+            for page in range(pages):
+                params = {"q": q, "limit": 20, **({"cursor": cursor} if cursor else {})}
+                times = []
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    r = await client.get("/search", params=params)
+                    times.append(time.perf_counter() - t0)
+                    r.raise_for_status()
+                print(f"{q:>24} {page:>5} {statistics.median(times) * 1000:>8.2f} {max(times) * 1000:>8.2f}")
+                cursor = r.json()["next_cursor"]
+                if not cursor:
+                    break
+    await engine.dispose()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--transcripts", type=int, default=100_000)
+    p.add_argument("--lines", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--pages", type=int, default=3)
+    args = p.parse_args()
+    asyncio.run(run(args.transcripts, args.lines, args.repeat, args.pages))
+
+
+if __name__ == "__main__":
+    main()
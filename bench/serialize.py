@@ -0,0 +1,90 @@
+# bench/serialize.py
+"""
+Requests/sec on one core for a 500-item media listing with transcripts:
+the old ORM -> Media.model_validate -> response_model path against the
+current dict -> orjson path. No database: both sides get the same rows
+from an in-memory session, and the catalog cache is disabled.
+
+    python -m bench.serialize --items 500 --lines 120 --requests 200
+"""
+import argparse, asyncio, time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from cache.catalog import catalog_cache
+from data import long_transcript
+from db.postgres import get_db
+from main import app
+from models.media import Media, MediaORM
+
+
+def make_rows(items: int, lines: int) -> list[dict]:
+    return [{
+        "media_id": f"media_{i:05d}", "media_title": f"Lecture {i}", "media_description": "bench",
+        "course_id": "bench", "media_url": f"https://example.invalid/{i}.mp4",
+        "media_transcript": long_transcript(f"Lecture {i}", n=lines),
+    } for i in range(items)]
+
+
+class _Result:
+    def __init__(self, rows): self.rows = rows
+    def mappings(self): return self
+    def scalars(self): return self
+    def all(self): return self.rows
+
+
+class _Session:
+    def __init__(self, rows): self.rows = rows
+    async def execute(self, stmt, params=None): return _Result(self.rows)
+
+
+def old_app(session) -> FastAPI:
+    old = FastAPI()
+
+    @old.get("/courses/{course_id}/medias", response_model=List[Media])
+    async def listing(course_id: str):
+        result = await session.execute(select(MediaORM))
+        return [Media.model_validate(r) for r in result.scalars().all()]
+
+    return old
+
+
+async def rps(target: FastAPI, path: str, n: int) -> float:
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.get(path)).raise_for_status()  # warm up
+        t0 = time.process_time()
+        for _ in range(n):
+            (await client.get(path)).raise_for_status()
+        return n / (time.process_time() - t0)
+
+
+async def run(items: int, lines: int, n: int) -> None:
+    rows = make_rows(items, lines)
+
+    async def fake_db():
+        yield _Session(rows)
+
+    app.dependency_overrides[get_db] = fake_db
+    catalog_cache.max_entries = 0
+
+    before = await rps(old_app(_Session([MediaORM(**r) for r in rows])), "/courses/bench/medias", n)
+    after = await rps(app, "/courses/bench/medias?limit=500&fields=media_transcript", n)
+    print(f"before: {before:8.1f} req/s/core")
+    print(f" after: {after:8.1f} req/s/core  ({after / before:.1f}x)")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--items", type=int, default=500)
+    p.add_argument("--lines", type=int, default=120)
+    p.add_argument("--requests", type=int, default=200)
+    args = p.parse_args()
+    asyncio.run(run(args.items, args.lines, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# bench/statements.py
+"""
+CPU per request on the hot lookups (GET /medias/{id}, GET /courses?type=,
+GET /me) with each DB_PREPARED_STATEMENTS mode (db/postgres.py): on, off
+and pooler. Each mode runs in its own process against DATABASE_URL, with
+the catalog cache off, on the "tiny" synthetic catalog (seeded first);
+process CPU time (app + in-process client) is divided by the requests
+served. Before that, db.warmup.warm_pool runs and every hot route is
+called once per pooled connection: with on and pooler none of them may
+prepare a statement then (exit 1 otherwise).
+
+    python -m bench.statements --requests 3000
+    python -m bench.statements --no-db     # statement build vs prebuilt only
+
+Point DATABASE_URL at PgBouncer (transaction pooling) to check that off
+and pooler keep working there; on is expected to fail behind it.
+"""
+import argparse, asyncio, os, subprocess, sys, time
+
+from sqlalchemy import select
+
+MODES = ("on", "off", "pooler")
+
+
+def build_cost(n: int) -> None:
+    """What the routes paid per call before db/queries.py: build + cache key."""
+    from db.queries import MEDIA_BY_ID
+    from models.media import MediaORM
+
+    t0 = time.process_time()
+    for i in range(n):
+        select(*MediaORM.__table__.c).where(MediaORM.media_id == f"m{i}")._generate_cache_key()
+    built = (time.process_time() - t0) / n
+    t0 = time.process_time()
+    for _ in range(n):
+        MEDIA_BY_ID._generate_cache_key()
+    prebuilt = (time.process_time() - t0) / n
+    print(f"statement per call: {built * 1e6:6.1f} µs   prebuilt: {prebuilt * 1e6:5.2f} µs")
+
+
+async def cpu_per_request(requests: int, warmup: int) -> tuple[float, int]:
+    """CPU per request, and the statements the routes still prepared after db.warmup.warm_pool."""
+    import asyncpg, httpx
+    from bench.catalog import course_ids, media_id, SCALES
+    from bench.firebase_stub import LocalSigner
+    from cache.catalog import catalog_cache
+    from db.postgres import engine, DB_POOL_SIZE
+    from db.warmup import warm_pool
+    from main import app
+
+    # asyncpg prepares only on a miss in the adapter's per-connection cache
+    prepared = 0
+    prepare = asyncpg.Connection.prepare
+
+    async def counted_prepare(self, *args, **kw):
+        nonlocal prepared
+        prepared += 1
+        return await prepare(self, *args, **kw)
+
+    asyncpg.Connection.prepare = counted_prepare
+
+    catalog_cache.max_entries = 0
+    signer = LocalSigner().install()
+    token = signer.token("bench-statements")
+    scale = SCALES["tiny"]
+    paths = [
+        (f"/medias/{media_id(i % scale.medias)}", {}) for i in range(50)
+    ] + [
+        (f"/courses?type={t}", {}) for t in ("video", "podcast", "text")
+    ] + [
+        ("/me", {"Authorization": f"Bearer {token}"}),
+    ]
+    # every hot route once, on each pooled connection (the pool hands them out in turn)
+    cold = paths[:1] + paths[-4:] + [
+        ("/courses", {}),
+        (f"/courses/{course_ids(scale)[0]}", {}),
+        (f"/medias/{media_id(0)}/transcript", {}),
+        (f"/medias/{media_id(0)}/stream", {}),
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await warm_pool()
+        prepared = 0
+        for path, headers in cold * DB_POOL_SIZE:
+            r = await client.get(path, headers=headers)
+            assert r.status_code < 500, (path, r.status_code, r.text)
+        after_warmup = prepared
+
+        async def batch(n: int):
+            for i in range(n):
+                path, headers = paths[i % len(paths)]
+                r = await client.get(path, headers=headers)
+                assert r.status_code < 500, (path, r.status_code, r.text)
+
+        await batch(warmup)
+        t0 = time.process_time()
+        await batch(requests)
+        cpu = time.process_time() - t0
+    await engine.dispose()
+    return cpu / requests, after_warmup
+
+
+def child(args) -> None:
+    per, prepared = asyncio.run(cpu_per_request(args.requests, args.warmup))
+    print(f"{per * 1e6:.1f} {prepared}")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=3000)
+    p.add_argument("--warmup", type=int, default=300)
+    p.add_argument("--modes", nargs="*", default=list(MODES), choices=MODES)
+    p.add_argument("--no-db", action="store_true")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.child:
+        return child(args)
+
+    build_cost(20000)
+    if args.no_db:
+        return
+    from bench.catalog import SCALES, seed
+    asyncio.run(seed(SCALES["tiny"]))
+    ok = True
+    for mode in args.modes:
+        env = {**os.environ, "DB_PREPARED_STATEMENTS": mode}
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.statements", "--child",
+             "--requests", str(args.requests), "--warmup", str(args.warmup)],
+            env=env, capture_output=True, text=True,
+        )
+        if out.returncode:
+            print(f"{mode:<7} failed: {(out.stderr.strip().splitlines() or ['?'])[-1]}")
+            ok = False
+            continue
+        per, prepared = out.stdout.strip().splitlines()[-1].split()
+        # off prepares (unnamed) on every execution by design
+        warmed = mode == "off" or prepared == "0"
+        ok &= warmed
+        print(f"{mode:<7} {float(per):8.1f} µs CPU per request   "
+              f"prepared by the routes after warm-up: {prepared}{'' if warmed else '  MISMATCH'}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
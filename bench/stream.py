@@ -0,0 +1,188 @@
+# bench/stream.py
+"""
+Random-seek throughput of GET /medias/{media_id}/stream against generated
+multi-GB files, next to Starlette's stock FileResponse on the same files and
+the raw disk ceiling (the same random preads from a thread pool).
+
+    python -m bench.stream --size-gb 2 --files 2 --concurrency 64 --clients 4 --range-kb 1024
+
+The server runs in a uvicorn subprocess with the DB lookup replaced by a
+fixed media_id -> file map, so no database is needed. Drop the page cache
+between runs (echo 3 > /proc/sys/vm/drop_caches) to measure the disk rather
+than memory. One Python client process is CPU bound well below NIC speed:
+raise --clients (and run on a machine with spare cores) to load the server.
+"""
+import argparse, asyncio, os, random, socket, subprocess, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import httpx
+
+from bench.load import Scenario, run_load
+
+BLOCK = 64 * 1024 * 1024
+
+
+def generate(directory: str, files: int, size_gb: float) -> list[str]:
+    """Write `files` files of `size_gb` each (skipped when already there)."""
+    os.makedirs(directory, exist_ok=True)
+    size = int(size_gb * 1024 ** 3)
+    block = os.urandom(BLOCK)
+    names = []
+    for i in range(files):
+        name = f"bench_{i}.mp4"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, "wb") as f:
+                left = size
+                while left:
+                    n = min(left, BLOCK)
+                    f.write(block[:n])
+                    left -= n
+        names.append(name)
+    return names
+
+
+def serve(directory: str, names: list[str], port: int) -> None:
+    """Server side (run in the subprocess)."""
+    os.environ["MEDIA_ROOT"] = directory
+    import uvicorn
+    from starlette.responses import FileResponse
+    from db.postgres import get_db
+    from main import app
+
+    class _Result:
+        def __init__(self, value):
+            self.value = value
+
+        def scalar_one_or_none(self):
+            return self.value
+
+    class _Session:
+        async def execute(self, stmt, params):
+            name = f"{params['media_id']}.mp4"  # MEDIA_URL
+            return _Result(name if name in names else None)
+
+    async def _db():
+        yield _Session()
+
+    app.dependency_overrides[get_db] = _db
+
+    @app.get("/bench/raw/{name}")
+    async def raw(name: str):
+        return FileResponse(os.path.join(directory, name))
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def disk_ceiling(directory: str, names: list[str], size: int, range_b: int, concurrency: int, duration_s: float) -> float:
+    """MB/s of random preads of `range_b` from `concurrency` threads."""
+    fds = [os.open(os.path.join(directory, n), os.O_RDONLY) for n in names]
+    deadline = time.perf_counter() + duration_s
+
+    def worker(n: int) -> int:
+        rng, done = random.Random(n), 0
+        while time.perf_counter() < deadline:
+            done += len(os.pread(rng.choice(fds), range_b, rng.randrange(0, size - range_b)))
+        return done
+
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            total = sum(pool.map(worker, range(concurrency)))
+    finally:
+        for fd in fds:
+            os.close(fd)
+    return total / duration_s / 1e6
+
+
+def _scenario(name: str, url, names: list[str], size: int, range_b: int) -> Scenario:
+    def request(rng: random.Random):
+        start = rng.randrange(0, size - range_b)
+        return url(rng.choice(names)), {"Range": f"bytes={start}-{start + range_b - 1}"}
+    return Scenario(name, 1, request, ok=(206,))
+
+
+async def http_throughput(port: int, scenario: Scenario, range_b: int, concurrency: int, duration_s: float):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        stats = (await run_load(client, [scenario], concurrency=concurrency, duration_s=duration_s))[scenario.name]
+    return stats, stats.rps * range_b / 1e6
+
+
+def _client(port: int, scenario_args: tuple, range_b: int, concurrency: int, duration_s: float):
+    scenario = _scenario(*scenario_args)
+    return asyncio.run(http_throughput(port, scenario, range_b, concurrency, duration_s))
+
+
+def _url_raw(name: str) -> str:
+    return f"/bench/raw/{name}"
+
+
+def _url_stream(name: str) -> str:
+    return f"/medias/{name.removesuffix('.mp4')}/stream"
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--dir", default="/tmp/lbv-stream")
+    p.add_argument("--files", type=int, default=2)
+    p.add_argument("--size-gb", type=float, default=2)
+    p.add_argument("--range-kb", type=int, default=1024)
+    p.add_argument("--concurrency", type=int, default=64)
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--clients", type=int, default=1, help="client processes (one Python client is CPU bound)")
+    p.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    names = [f"bench_{i}.mp4" for i in range(args.files)]
+    if args.serve:
+        return serve(args.dir, names, args.serve)
+
+    names = generate(args.dir, args.files, args.size_gb)
+    size = int(args.size_gb * 1024 ** 3)
+    range_b = args.range_kb * 1024
+    print(f"{args.files} x {args.size_gb} GB, {args.range_kb} KiB ranges, {args.concurrency} concurrent")
+    print(f"disk (pread):           {disk_ceiling(args.dir, names, size, range_b, args.concurrency, args.seconds):8.0f} MB/s")
+
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, "-m", "bench.stream", "--dir", args.dir, "--files", str(args.files),
+                             "--serve", str(port)])
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError("server exited")
+                try:
+                    client.get("/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.05)
+
+        runs = [("stock FileResponse", "raw", _url_raw), ("/medias/{id}/stream", "stream", _url_stream)]
+        per_client = max(1, args.concurrency // args.clients)
+        for label, name, url in runs:
+            with ProcessPoolExecutor(args.clients) as pool:
+                futures = [
+                    pool.submit(_client, port, (name, url, names, size, range_b), range_b, per_client, args.seconds)
+                    for _ in range(args.clients)
+                ]
+                results = [f.result() for f in futures]
+            mbps = sum(r[1] for r in results)
+            rps = sum(r[0].rps for r in results)
+            errors = sum(r[0].errors for r in results)
+            p50 = max(r[0].p50_ms for r in results)
+            p99 = max(r[0].p99_ms for r in results)
+            print(f"{label + ':':<24}{mbps:8.0f} MB/s  {rps:7.0f} req/s  "
+                  f"p50={p50:.1f}ms p99={p99:.1f}ms  errors={errors}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
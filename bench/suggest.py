@@ -0,0 +1,157 @@
+# bench/suggest.py
+"""
+Typeahead on a generated catalog of --titles texts (course titles and
+descriptions, media titles; Zipf-distributed words): build time and memory
+of the index (cache/suggest.py), per-keystroke latency while typing the
+start of existing titles, with typos, of one kind only and with no match,
+an in-place update, and GET /catalog/suggest through the app. No database.
+
+    python -m bench.suggest --titles 1000000
+"""
+import argparse, asyncio, random, statistics, string, time
+from itertools import accumulate
+
+import httpx
+
+from cache.suggest import SuggestIndex, suggest_index
+from main import app
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "shi", "po", "ven", "dor", "al", "is", "tra", "qu", "ex", "on", "ber", "zu"]
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096 / 2**20
+
+
+def make_vocab(n: int, rng: random.Random) -> list[str]:
+    vocab = set()
+    while len(vocab) < n:
+        vocab.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    vocab = sorted(vocab)
+    rng.shuffle(vocab)
+    return vocab
+
+
+def make_rows(titles: int, vocab: list[str], seed: int = 0) -> tuple[dict, dict]:
+    """(courses, medias) rows; each course has a title and a description, so counts for two."""
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    cum = list(accumulate(weights))
+
+    def text(lo: int, hi: int) -> str:
+        return " ".join(rng.choices(vocab, cum_weights=cum, k=rng.randint(lo, hi))).capitalize()
+
+    n_courses = titles // 50
+    courses = {
+        f"c{i}": {"course_id": f"c{i}", "course_title": text(2, 6), "course_description": text(8, 20)}
+        for i in range(n_courses)
+    }
+    medias = {
+        f"m{i}": {"media_id": f"m{i}", "course_id": f"c{rng.randrange(n_courses)}", "media_title": text(3, 9)}
+        for i in range(titles - 2 * n_courses)
+    }
+    return courses, medias
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def keystrokes(rows: list[dict], n: int, rng: random.Random, with_typo: bool = False) -> list[tuple[str, str]]:
+    """(query, expected row key) for every prefix typed of the first words of random titles."""
+    out = []
+    for row in rng.sample(rows, n):
+        key = row.get("media_id") or row["course_id"]
+        text = row.get("media_title") or row["course_title"]
+        ws = text.lower().split()[:3]
+        if with_typo:
+            j = rng.randrange(len(ws))
+            if len(ws[j]) >= 4:
+                ws[j] = typo(ws[j], rng)
+        typed = " ".join(ws)
+        out += [(typed[:i], key) for i in range(1, len(typed) + 1)]
+    return out
+
+
+def timed(index: SuggestIndex, queries: list[tuple[str, str]], kind: str | None = None) -> tuple[list[float], float]:
+    """Latencies in ms, and the share of full queries (all words typed) that found their row."""
+    lat, hits, full = [], 0, 0
+    for q, key in queries:
+        t0 = time.perf_counter()
+        items = index.search(q, 10, kind)
+        lat.append((time.perf_counter() - t0) * 1000)
+        if q.count(" ") == 2 and not q.endswith(" ") and len(q.rsplit(" ", 1)[1]) >= 3:
+            full += 1
+            hits += any((it["media_id"] or it["course_id"]) == key for it in items)
+    return lat, hits / max(full, 1)
+
+
+def report(name: str, lat: list[float], extra: str = "") -> None:
+    q = statistics.quantiles(lat, n=100)
+    print(f"{name:<32} {len(lat):>6} queries  p50={q[49]:.2f}ms p99={q[98]:.2f}ms max={max(lat):.2f}ms {extra}")
+
+
+async def run(args) -> None:
+    rng = random.Random(args.seed)
+    vocab = make_vocab(args.vocab, rng)
+    courses, medias = make_rows(args.titles, vocab, args.seed)
+
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    suggest_index.reset()
+    suggest_index.update("course", courses)
+    suggest_index.update("media", medias)
+    await suggest_index.refreshed()
+    stats = suggest_index.stats()
+    print(f"built {stats['entries']} entries / {stats['words']} words in {time.perf_counter() - t0:.1f}s, "
+          f"+{_rss_mb() - rss0:.0f} MB RSS")
+
+    rows = list(courses.values()) + list(medias.values())
+    queries = keystrokes(rows, args.samples, rng)
+    lat, hit = timed(suggest_index, queries)
+    report("typing titles", lat, f"row in top 10 after 3 words: {hit:.0%}")
+    for lo, hi in ((1, 1), (2, 3), (4, 100)):
+        part = [l for (q, _), l in zip(queries, lat) if lo <= len(q) <= hi]
+        if len(part) > 1:
+            report(f"  {lo}-{hi} characters", part)
+    lat, hit = timed(suggest_index, keystrokes(rows, args.samples, rng, with_typo=True))
+    report("typing titles with a typo", lat, f"row in top 10 after 3 words: {hit:.0%}")
+    # media titles rank after every course title: found through the media entries' own list
+    lat, hit = timed(suggest_index, keystrokes(list(medias.values()), args.samples, rng), "media")
+    report("typing media titles, kind=media", lat, f"row in top 10 after 3 words: {hit:.0%}")
+    lat, _ = timed(suggest_index, [("".join(rng.choices("xyjw", k=rng.randint(3, 8))), "") for _ in range(args.samples)])
+    report("no match", lat)
+
+    # a write: the snapshot hands over the changed rows
+    changed = {f"m{i}": {**medias[f"m{i}"], "media_title": f"Freshly renamed lecture {i}"} for i in range(100)}
+    t0 = time.perf_counter()
+    suggest_index.update("media", changed)
+    await suggest_index.refreshed()
+    found = suggest_index.search("freshly renamed lecture 42", 10)
+    print(f"100 renamed medias applied in {(time.perf_counter() - t0) * 1000:.1f}ms; "
+          f"found by the new title: {bool(found) and found[0]['media_id'] == 'm42'}")
+
+    queries = [q for q, _ in keystrokes(rows, 20, rng)]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        lat = []
+        for q in queries:
+            t0 = time.perf_counter()
+            r = await client.get("/catalog/suggest", params={"q": q})
+            lat.append((time.perf_counter() - t0) * 1000)
+            r.raise_for_status()
+    report("GET /catalog/suggest", lat)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--titles", type=int, default=1_000_000)
+    p.add_argument("--vocab", type=int, default=50_000)
+    p.add_argument("--samples", type=int, default=200, help="titles typed per query set")
+    p.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
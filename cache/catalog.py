@@ -0,0 +1,122 @@
+# cache/catalog.py
+import hashlib, os, time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple
+from fastapi import Request, Response
+from db.postgres import DATABASE_REPLICA_URLS, REPLICA_MAX_LAG_S
+from models.serialize import dumps
+
+# ---- ENV ----
+CATALOG_CACHE_MAX   = int(os.getenv("CATALOG_CACHE_MAX", "2048"))
+CATALOG_CACHE_TTL_S = float(os.getenv("CATALOG_CACHE_TTL_S", "30"))  # bounds staleness across workers
+# with replicas, a read right after a write may not see it yet: don't cache those
+CATALOG_CACHE_SETTLE_S = float(os.getenv("CATALOG_CACHE_SETTLE_S", str(REPLICA_MAX_LAG_S if DATABASE_REPLICA_URLS else 0)))
+
+
+class Entry(NamedTuple):
+    etag: str
+    body: bytes
+    expires_at: float
+
+
+class CatalogCache:
+    """
+    Serialized catalog responses (courses and media listings) keyed by path
+    and query string. Everything is dropped by `invalidate()`, which the
+    catalog write paths call after they commit. Writes made by other
+    workers are picked up when entries expire (`ttl_s`). For `settle_s`
+    after an invalidation bodies are served but not cached, since they may
+    have been read from a replica that has not replayed the write yet.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CATALOG_CACHE_MAX,
+        ttl_s: float = CATALOG_CACHE_TTL_S,
+        settle_s: float = CATALOG_CACHE_SETTLE_S,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.settle_s = settle_s
+        self.version = 0
+        self.invalidated_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+
+    def get(self, key: str) -> Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, body: bytes, version: int) -> Entry:
+        entry = Entry(
+            etag='"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+            body=body,
+            expires_at=time.monotonic() + self.ttl_s,
+        )
+        # a write committed while this body was being built: don't cache it
+        if version == self.version and time.monotonic() - self.invalidated_at >= self.settle_s:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self.invalidated_at = time.monotonic()
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+catalog_cache = CatalogCache()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag for t in if_none_match.split(","))
+
+
+def _cache_key(request: Request) -> str:
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+async def catalog_response(request: Request, build: Callable[[], Awaitable[Any]]) -> Response:
+    """
+    Serve a catalog read from the cache, or build it (DB query) and cache it.
+    Answers 304 when If-None-Match carries the current ETag.
+    """
+    key = _cache_key(request)
+    entry = catalog_cache.get(key)
+    if entry is None:
+        catalog_cache.misses += 1
+        version = catalog_cache.version
+        body = dumps(await build())
+        entry = catalog_cache.put(key, body, version)
+    else:
+        catalog_cache.hits += 1
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        catalog_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
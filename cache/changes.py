@@ -0,0 +1,167 @@
+# cache/changes.py
+"""
+Catalog change feed. Write paths queue a NOTIFY on the catalog_changes
+channel in their own transaction (crud.changes.record_changes), so
+Postgres delivers it on commit, in commit order, to every worker. Each
+worker holds one LISTEN connection (ChangeFeed) and keeps the last
+CATALOG_CHANGES_BUFFER events, pre-rendered as SSE frames, for its
+/catalog/changes subscribers.
+
+All workers see the same events in the same order, so a client resuming
+with Last-Event-ID can land on any of them. When the id is no longer held
+(too old, or the listener reconnected and may have missed events) the
+subscriber gets a `reset` event and should refetch the catalog.
+"""
+import asyncio, os
+from collections import deque
+from typing import NamedTuple, Optional
+
+import asyncpg
+import orjson
+from sqlalchemy.engine import make_url
+
+from db.postgres import DATABASE_URL
+
+# ---- ENV ----
+# LISTEN needs a session of its own: point this past a transaction-mode pooler
+CATALOG_LISTEN_URL       = os.getenv("CATALOG_LISTEN_URL") or DATABASE_URL
+CATALOG_CHANGES_BUFFER   = int(os.getenv("CATALOG_CHANGES_BUFFER", "10000"))  # events kept for Last-Event-ID
+CATALOG_LISTEN_RETRY_S   = float(os.getenv("CATALOG_LISTEN_RETRY_S", "2"))
+CATALOG_LISTEN_CHECK_S   = float(os.getenv("CATALOG_LISTEN_CHECK_S", "10"))   # liveness probe of the connection
+
+CHANNEL = "catalog_changes"
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+
+
+class Event(NamedTuple):
+    id: str
+    frame: bytes
+
+
+class ChangeFeed:
+    """
+    Events in delivery order, numbered by a local `seq`. Subscribers keep
+    the seq of the last event they sent and wait() for newer ones; an
+    event is rendered once however many subscribers read it.
+    """
+
+    def __init__(self, url: str = CATALOG_LISTEN_URL, buffer: int = CATALOG_CHANGES_BUFFER):
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.buffer = buffer
+        self.seq = 0
+        self.version = 0  # highest catalog version announced
+        self.subscribers = 0
+        self.received = 0
+        self.resets = 0
+        self.connected = False
+        self._events: "deque[Event]" = deque()
+        self._ids: dict[str, int] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, payload: str) -> None:
+        try:
+            change = orjson.loads(payload)
+            event_id = change["id"]
+        except (ValueError, KeyError, TypeError):
+            print("catalog change without an id, dropped:", payload[:200])
+            return
+        if isinstance(change.get("version"), int):
+            self.version = max(self.version, change["version"])
+        self.seq += 1
+        self.received += 1
+        if len(self._events) >= self.buffer:
+            del self._ids[self._events.popleft().id]
+        self._events.append(Event(event_id, f"id: {event_id}\nevent: change\ndata: {payload}\n\n".encode()))
+        self._ids[event_id] = self.seq
+        self._notify()
+
+    def reset(self) -> None:
+        """Forget the held events: every subscriber gets a reset."""
+        self._events.clear()
+        self._ids.clear()
+        self.seq += 1
+        self.resets += 1
+        self._notify()
+
+    def _notify(self) -> None:
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+    def resume(self, last_event_id: Optional[str]) -> tuple[int, bool]:
+        """(seq to read after, whether the client missed events) for a new subscriber."""
+        if last_event_id is None:
+            return self.seq, False
+        seq = self._ids.get(last_event_id)
+        return (self.seq, True) if seq is None else (seq, False)
+
+    def read(self, seq: int) -> tuple[list[bytes], int, bool]:
+        """Frames after `seq`, the new seq, and whether some were lost in between."""
+        behind = self.seq - seq
+        if behind <= 0:
+            return [], seq, False
+        if behind > len(self._events):
+            return [], self.seq, True
+        return [self._events[-i].frame for i in range(behind, 0, -1)], self.seq, False
+
+    async def wait(self, seq: int, timeout_s: float) -> bool:
+        """True once there is something after `seq`, False on timeout."""
+        if self.seq > seq:
+            return True
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout_s)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        self.publish(payload)
+
+    async def _run(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self.connected = True
+                # whatever was committed while not listening is unknown
+                self.reset()
+                while True:
+                    await asyncio.sleep(CATALOG_LISTEN_CHECK_S)
+                    await asyncio.wait_for(conn.fetchval("SELECT 1"), CATALOG_LISTEN_RETRY_S)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("catalog change listener failed, reconnecting:", e)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    conn.terminate()
+            await asyncio.sleep(CATALOG_LISTEN_RETRY_S)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "version": self.version,
+            "subscribers": self.subscribers,
+            "held": len(self._events),
+            "received": self.received,
+            "resets": self.resets,
+        }
+
+
+change_feed = ChangeFeed()
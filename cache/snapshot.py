@@ -0,0 +1,256 @@
+# cache/snapshot.py
+"""
+The whole catalog (every course and media row) for offline clients:
+a gzipped JSON bundle at a catalog version, and deltas between versions.
+
+Each worker keeps the rows in memory, serialized, with the version of
+their last write (catalog_row_versions, stamped by crud.changes). After a
+change notification (or every CATALOG_SNAPSHOT_REFRESH_S) it fetches only
+the rows written since its version, in one REPEATABLE READ transaction,
+and writes a new bundle to CATALOG_SNAPSHOT_DIR. Downloads and deltas are
+then served from disk and memory without a query.
+
+Watchers (the typeahead index, cache/suggest.py) are handed the rows as
+they load: reset() before a full load, update(kind, {key: row or None})
+for each batch, and refreshed() once the new version is published, outside
+the refresh lock.
+"""
+import asyncio, gzip, os, tempfile, time
+from bisect import bisect_left
+from typing import NamedTuple, Optional
+
+import anyio
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from cache.changes import change_feed
+from db.postgres import engine
+from models.catalog import CatalogMetaORM, CatalogRowVersionORM
+from models.course import CourseORM
+from models.media import MediaORM
+from models.serialize import dumps
+
+# ---- ENV ----
+CATALOG_SNAPSHOT_DIR        = os.getenv("CATALOG_SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "catalog-snapshots")
+CATALOG_SNAPSHOT_DEBOUNCE_S = float(os.getenv("CATALOG_SNAPSHOT_DEBOUNCE_S", "1"))   # changes in this window share a rebuild
+CATALOG_SNAPSHOT_REFRESH_S  = float(os.getenv("CATALOG_SNAPSHOT_REFRESH_S", "60"))   # also without notifications
+CATALOG_SNAPSHOT_KEEP_S     = float(os.getenv("CATALOG_SNAPSHOT_KEEP_S", "600"))     # older bundles, for downloads in progress
+
+_RETRY_S = 5
+_LOAD_BATCH = 1000
+
+# kind -> (ORM, key column, name in the bundle)
+KINDS = {
+    "course": (CourseORM, "course_id", "courses"),
+    "media": (MediaORM, "media_id", "medias"),
+}
+
+
+class Bundle(NamedTuple):
+    version: int
+    path: str
+    size: int
+
+
+def _select_rows(kind: str):
+    orm, key, _ = KINDS[kind]
+    return sa.select(*orm.__table__.c).order_by(orm.__table__.c[key])
+
+
+def _select_changed_rows(kind: str):
+    orm, key, _ = KINDS[kind]
+    col = orm.__table__.c[key]
+    return sa.select(*orm.__table__.c).where(col == sa.any_(sa.bindparam("keys", type_=ARRAY(sa.Text))))
+
+
+class CatalogSnapshot:
+    def __init__(self, directory: str = CATALOG_SNAPSHOT_DIR):
+        self.directory = directory
+        self.version: Optional[int] = None
+        self.bundle: Optional[Bundle] = None
+        self.rebuilds = 0
+        self.last_rebuild_s = 0.0
+        self._rows: dict[str, dict[str, bytes]] = {kind: {} for kind in KINDS}
+        self._row_versions: dict[tuple[str, str], int] = {}
+        self._log: list[tuple[int, str, str]] = []  # (version, kind, key) of versioned rows, sorted
+        self.watchers: list = []
+        self._lock = asyncio.Lock()
+        self._published = asyncio.Event()  # set (and replaced) at each new version
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Loading ---
+
+    async def refresh(self) -> bool:
+        """Catch up with the database; False when already at its version."""
+        async with self._lock:
+            t0 = time.perf_counter()
+            async with engine.connect() as conn:
+                # version and rows from one snapshot of the database
+                conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+                async with conn.begin():
+                    version = await conn.scalar(sa.select(sa.func.coalesce(sa.func.max(CatalogMetaORM.version), 0)))
+                    if version == self.version:
+                        return False
+                    if self.version is None:
+                        await self._load_all(conn)
+                    else:
+                        await self._load_since(conn, self.version)
+            self._log = sorted((v, kind, key) for (kind, key), v in self._row_versions.items() if v)
+            await self._write_bundle(version)
+            self.version = version
+            self.rebuilds += 1
+            self.last_rebuild_s = time.perf_counter() - t0
+            self._published.set()
+            self._published = asyncio.Event()
+        # published: bundle and deltas are served while the watchers catch up
+        for w in self.watchers:
+            await w.refreshed()
+        return True
+
+    async def _load_all(self, conn) -> None:
+        rv = CatalogRowVersionORM.__table__
+        res = await conn.execute(sa.select(rv.c.kind, rv.c.key, rv.c.version))
+        self._row_versions = {(kind, key): v for kind, key, v in res.all()}
+        for w in self.watchers:
+            w.reset()
+        for kind, (_, key, _) in KINDS.items():
+            rows = {}
+            result = await conn.stream(_select_rows(kind))
+            async for part in result.mappings().partitions(_LOAD_BATCH):
+                batch = {r[key]: r for r in part}
+                for k, r in batch.items():
+                    rows[k] = dumps(dict(r))
+                for w in self.watchers:
+                    w.update(kind, batch)
+            self._rows[kind] = rows
+
+    async def _load_since(self, conn, since: int) -> None:
+        rv = CatalogRowVersionORM.__table__
+        res = await conn.execute(sa.select(rv.c.kind, rv.c.key, rv.c.version).where(rv.c.version > since))
+        changed = res.all()
+        for kind, key, v in changed:
+            self._row_versions[(kind, key)] = v
+        for kind, (_, key, _) in KINDS.items():
+            keys = [k for kd, k, _ in changed if kd == kind]
+            if not keys:
+                continue
+            found = {}
+            for i in range(0, len(keys), _LOAD_BATCH):
+                res = await conn.execute(_select_changed_rows(kind), {"keys": keys[i:i + _LOAD_BATCH]})
+                for r in res.mappings().all():
+                    found[r[key]] = r
+            # applied in one go: delta() runs between the awaits above
+            rows = self._rows[kind]
+            for k in keys:
+                if k in found:
+                    rows[k] = dumps(dict(found[k]))
+                else:
+                    rows.pop(k, None)  # deleted
+            for w in self.watchers:
+                w.update(kind, {k: found.get(k) for k in keys})
+
+    async def wait_version(self, version: int, timeout_s: float) -> bool:
+        """True once this worker has published `version` or a later one, False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_s
+        while self.version is None or self.version < version:
+            try:
+                await asyncio.wait_for(self._published.wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    # --- Bundle on disk ---
+
+    def _render(self, version: int) -> bytes:
+        parts = [b'{"version":%d' % version]
+        for kind, (_, _, name) in KINDS.items():
+            rows = self._rows[kind]
+            parts.append(b',"%s":[' % name.encode())
+            parts.append(b",".join(rows[k] for k in sorted(rows)))
+            parts.append(b"]")
+        parts.append(b"}")
+        # mtime=0: every worker writes the same bytes for a version
+        return gzip.compress(b"".join(parts), compresslevel=6, mtime=0)
+
+    async def _write_bundle(self, version: int) -> None:
+        body = await anyio.to_thread.run_sync(self._render, version)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"catalog-{version}.json.gz")
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".catalog-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+        self.bundle = Bundle(version, path, len(body))
+        self._prune(path)
+
+    def _prune(self, keep: str) -> None:
+        cutoff = time.time() - CATALOG_SNAPSHOT_KEEP_S
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("catalog-") and entry.path != keep:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass  # another worker got there first
+
+    # --- Delta ---
+
+    def delta(self, since: int) -> bytes:
+        """JSON of the rows written after version `since` (up to self.version), and those deleted."""
+        changed = {kind: [] for kind in KINDS}
+        deleted = {kind: [] for kind in KINDS}
+        for _, kind, key in self._log[bisect_left(self._log, (since + 1,)):]:
+            row = self._rows[kind].get(key)
+            if row is None:
+                deleted[kind].append(key)
+            else:
+                changed[kind].append(row)
+        parts = [b'{"version":%d,"since":%d' % (self.version, since)]
+        for kind, (_, _, name) in KINDS.items():
+            parts.append(b',"%s":[' % name.encode())
+            parts.append(b",".join(changed[kind]))
+            parts.append(b"]")
+        parts.append(b',"deleted":' + dumps({KINDS[k][2]: ids for k, ids in deleted.items()}) + b"}")
+        return b"".join(parts)
+
+    # --- Background ---
+
+    async def _run(self) -> None:
+        while True:
+            seq = change_feed.seq
+            try:
+                await self.refresh()
+                timeout = CATALOG_SNAPSHOT_REFRESH_S
+            except Exception as e:
+                print("catalog snapshot refresh failed:", e)
+                timeout = _RETRY_S
+            if await change_feed.wait(seq, timeout):
+                await asyncio.sleep(CATALOG_SNAPSHOT_DEBOUNCE_S)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "courses": len(self._rows["course"]),
+            "medias": len(self._rows["media"]),
+            "bundle_bytes": self.bundle.size if self.bundle else 0,
+            "rebuilds": self.rebuilds,
+            "last_rebuild_s": self.last_rebuild_s,
+        }
+
+
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,390 @@
+# cache/suggest.py
+"""
+Typeahead over course titles, course descriptions and media titles.
+
+Texts are split into normalized words (case and accents folded). Every
+text is an entry, numbered by static rank (field weight, then shorter
+first), and each word has the ascending list of entries using it, so
+walking a posting list walks the best entries first and a query can stop
+once it has enough. The last word of a query is a prefix, looked up in the
+sorted vocabulary; when words match too little, close vocabulary words
+(found by shared trigrams, kept within a typo or two) are tried instead.
+A query walks whichever is cheapest: all entries in rank order, or the
+intersected posting lists of its rarer words.
+
+Rows come from the catalog snapshot (cache/snapshot.py): it feeds every
+row it loads to update(), and refreshed() applies them, as a full rebuild
+in a thread for the first load and when much would change, in place (in
+batches, between which queries run) otherwise.
+"""
+import asyncio, re, sys, unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import anyio
+
+FIELDS = {"course": ("course_title", "course_description"), "media": ("media_title",)}
+WEIGHTS = {"course_title": 3.0, "media_title": 2.0, "course_description": 1.0}
+
+_SCAN_MAX = 20_000         # entries looked at per query at most
+_PREFIX_WORDS_MAX = 5_000  # a prefix of more words is matched with startswith
+_FUZZY_MIN_LEN = 3
+_FUZZY_MIN_SIMILARITY = 0.4
+_FUZZY_WORDS = 8           # closest vocabulary words tried per query word
+_SIMILAR_CACHE = 10_000    # words whose close words are remembered
+_REBUILD_CHURN = 0.2       # rebuild once this share of entries is dead or out of rank order
+_APPLY_BATCH = 1_000       # rows changed in place per event loop turn
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def words(text: str) -> list[str]:
+    return _WORD.findall(normalize(text))
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _distance(a: str, b: str, cap: int) -> int:
+    """Edits (insert, delete, substitute, swap two neighbours) from a to b; cap + 1 past cap."""
+    if abs(len(a) - len(b)) > cap:
+        return cap + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > cap:
+            return cap + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class Doc(NamedTuple):
+    kind: str
+    key: str
+    field: str
+    text: str
+    course_id: Optional[str]
+
+
+def row_docs(kind: str, row) -> list[Doc]:
+    key = row[f"{kind}_id"]
+    return [Doc(kind, key, f, row[f], row.get("course_id")) for f in FIELDS[kind] if row.get(f)]
+
+
+class _Index:
+    def __init__(self, docs: Iterable[Doc]):
+        # per entry id: its doc (None once removed) and distinct words
+        self.docs: list[Optional[Doc]] = []
+        self.words: list[tuple[str, ...]] = []
+        self.postings: dict[str, array] = defaultdict(lambda: array("i"))
+        self.rows: dict[str, dict[str, tuple[int, ...]]] = {kind: {} for kind in FIELDS}
+        self.by_kind: dict[str, array] = {kind: array("i") for kind in FIELDS}
+        self.dead = 0
+        self.unranked = 0
+        for doc in sorted(docs, key=lambda d: (-WEIGHTS[d.field], len(d.text))):
+            self._add(doc)
+        self.vocab = sorted(self.postings)
+        self.trigrams: dict[str, list[str]] = defaultdict(list)
+        self._similar_cache: dict[tuple[str, bool], list[str]] = {}
+        for w in self.vocab:
+            self._add_trigrams(w)
+
+    def _add_trigrams(self, word: str) -> None:
+        if len(word) >= _FUZZY_MIN_LEN:
+            for g in _trigrams(word):
+                self.trigrams[g].append(word)
+
+    def _add(self, doc: Doc) -> list[str]:
+        i = len(self.docs)
+        # interned: one string per distinct word, however many texts use it
+        ws = tuple(dict.fromkeys(map(sys.intern, words(doc.text))))
+        self.docs.append(doc)
+        self.words.append(ws)
+        rows = self.rows[doc.kind]
+        rows[doc.key] = rows.get(doc.key, ()) + (i,)
+        self.by_kind[doc.kind].append(i)
+        new = []
+        for w in ws:
+            if w not in self.postings:
+                new.append(w)
+            self.postings[w].append(i)
+        return new
+
+    # --- Incremental updates (entries appended after the ranked ones) ---
+
+    def remove_row(self, kind: str, key: str) -> None:
+        for i in self.rows[kind].pop(key, ()):
+            self.docs[i] = None
+            self.dead += 1
+
+    def apply(self, changes: list[tuple[str, str, Optional[list[Doc]]]]) -> None:
+        """(kind, key, docs or None) per changed row: replaces the row's entries."""
+        new = []
+        for kind, key, docs in changes:
+            self.remove_row(kind, key)
+            for doc in docs or ():
+                new += self._add(doc)
+                self.unranked += 1
+        if new:
+            # two sorted runs, which sort() merges in linear time
+            new.sort()
+            self.vocab += new
+            self.vocab.sort()
+            for w in new:
+                self._add_trigrams(w)
+            self._similar_cache.clear()
+
+    def merged(self, changes: dict[tuple[str, str], Optional[list[Doc]]]) -> list[Doc]:
+        """The docs of this index with `changes` applied, for a rebuild."""
+        docs = [d for d in self.docs if d is not None and (d.kind, d.key) not in changes]
+        for changed in changes.values():
+            docs += changed or ()
+        return docs
+
+    @property
+    def churn(self) -> float:
+        return (self.dead + self.unranked) / max(len(self.docs), 1)
+
+    # --- Queries ---
+
+    def _prefix_words(self, prefix: str) -> list[str]:
+        lo = bisect_left(self.vocab, prefix)
+        hi = bisect_left(self.vocab, prefix + "\U0010ffff")
+        return self.vocab[lo:hi]
+
+    def _similar(self, word: str, prefix: bool = False) -> list[str]:
+        """
+        Vocabulary words closest to `word` (to a start of theirs when
+        `prefix`): sharing trigrams, then within a typo or two.
+        """
+        # typing repeats the same words keystroke after keystroke
+        similar = self._similar_cache.get((word, prefix))
+        if similar is None:
+            if len(self._similar_cache) >= _SIMILAR_CACHE:
+                self._similar_cache.clear()
+            similar = self._similar_cache[(word, prefix)] = self._find_similar(word, prefix)
+        return similar
+
+    def _find_similar(self, word: str, prefix: bool) -> list[str]:
+        grams = _trigrams(word)
+        if prefix:
+            grams = {g for g in grams if not g.endswith(" ")}
+        counts = Counter()
+        for g in grams:
+            counts.update(self.trigrams.get(g, ()))
+        max_typos = 1 if len(word) < 8 else 2
+        scored = []
+        for w, shared in counts.most_common(_FUZZY_WORDS * 8):
+            if w == word:
+                continue
+            typos = _distance(word, w[:len(word)] if prefix else w, max_typos)
+            if typos <= max_typos or (not prefix and shared / (len(grams) + len(_trigrams(w)) - shared) >= _FUZZY_MIN_SIMILARITY):
+                scored.append((typos, -shared, w))
+        scored.sort()
+        return [w for _, _, w in scored[:_FUZZY_WORDS]]
+
+    def _candidates(self, required: list[list[str]], prefix: Optional[str], exact: list[str], wanted: int,
+                    kind: Optional[str] = None) -> Iterator[int]:
+        """
+        Live entry ids, in rank order, of `kind` (unless None), having a word
+        of each group in `required`, and a word starting with `prefix`
+        (unless None) or in `exact`.
+        """
+        last = (self._prefix_words(prefix) if prefix is not None else []) + exact
+        # (words, posting lists) per condition; a prefix of very many words is
+        # checked with startswith instead (it matches most entries anyway).
+        # The kind is a condition too (no words: checked on the doc), so a
+        # rare kind is walked through its own list.
+        conds = [(set(g), [self.postings[w] for w in g if w in self.postings]) for g in required]
+        wide = prefix if len(last) > _PREFIX_WORDS_MAX else None
+        if wide is None:
+            conds.append((set(last), [self.postings[w] for w in last if w in self.postings]))
+        elif exact:
+            wide_exact = set(exact)
+        if kind is not None:
+            conds.append((None, [self.by_kind[kind]]))
+        # The first matches in rank order come from walking either all
+        # entries or the ids left after intersecting the k rarest conditions
+        # (as sets), checking the other conditions on each entry. The k with
+        # the fewest entries looked at in Python wins, set operations on ids
+        # counting 1/5 each (measured), with the words taken as independent.
+        n = max(len(self.docs), 1)
+        conds.sort(key=lambda c: sum(map(len, c[1])))
+        sizes = [sum(map(len, c[1])) for c in conds]
+        dens = [size / n for size in sizes]
+
+        def walked(skip: int, est: float) -> float:
+            d = 1.0
+            for x in dens[skip:]:
+                d *= x
+            return min(est, wanted / max(d, 1e-9))
+
+        plans = {0: walked(0, n)}  # conditions intersected -> cost
+        if conds:
+            plans[1] = walked(1, sizes[0]) + (sizes[0] / 5 if len(conds[0][1]) > 1 else 0)
+            est = float(n)
+            for k in range(1, len(conds) + 1):
+                est *= dens[k - 1]
+                if k > 1:
+                    plans[k] = walked(k, est) + sum(sizes[:k]) / 5
+        k = min(plans, key=plans.get)
+        ids: Iterable[int]
+        if k == 0:
+            ids = range(n)
+        elif k == 1 and len(conds[0][1]) == 1:
+            ids = conds[0][1][0]
+        else:
+            common = set().union(*conds[0][1])
+            for _, lists in conds[1:k]:
+                common = common.intersection(lists[0]) if len(lists) == 1 else common & set().union(*lists)
+            ids = sorted(common)
+        checks = [c[0] for c in conds[k:] if c[0] is not None]
+        docs, words_of = self.docs, self.words
+        for i in islice(ids, _SCAN_MAX):
+            d = docs[i]
+            if d is None or (kind is not None and d.kind != kind):
+                continue
+            ws = words_of[i]
+            for c in checks:
+                if c.isdisjoint(ws):
+                    break
+            else:
+                if wide is None or any(w.startswith(wide) for w in ws) or (exact and not wide_exact.isdisjoint(ws)):
+                    yield i
+
+    def search(self, q: str, limit: int, kind: Optional[str] = None) -> list[dict]:
+        """
+        Best `limit` rows for `q`, one suggestion per row. The last word is
+        a prefix unless `q` ends with a space.
+        """
+        ws = words(q)
+        if not ws:
+            return []
+        full, last = ws[:-1], ws[-1]
+        is_prefix = q[-1:].isalnum()
+        found: dict[tuple[str, str], dict] = {}
+
+        def collect(required: list[list[str]], exact: list[str], weight: float) -> None:
+            n = 0
+            for i in self._candidates(required, last if is_prefix else None, exact, limit * 4, kind):
+                d, ws = self.docs[i], self.words[i]
+                score = WEIGHTS[d.field] * weight - 0.02 * len(ws)
+                k = len(full)
+                if len(ws) > k and list(ws[:k]) == full and ws[k].startswith(last):
+                    score += 1.0  # the text starts with the query
+                if last in ws:
+                    score += 0.5  # a whole word, not only a prefix
+                row = (d.kind, d.key)
+                if row not in found or found[row]["score"] < score:
+                    found[row] = {
+                        "kind": d.kind,
+                        "course_id": d.key if d.kind == "course" else d.course_id,
+                        "media_id": d.key if d.kind == "media" else None,
+                        "field": d.field,
+                        "text": d.text,
+                        "score": round(score, 3),
+                    }
+                n += 1
+                if n >= limit * 4:
+                    break
+
+        collect([[w] for w in full], [] if is_prefix else [last], 1.0)
+
+        if len(found) < limit:
+            # typos: unknown words, and the last one, may be close vocabulary
+            # words (or, for the former, abbreviated)
+            required = [
+                [w] if w in self.postings else [w] + self._similar(w) + self._prefix_words(w)[:_FUZZY_WORDS]
+                for w in full
+            ]
+            exact = [] if is_prefix else [last]
+            if len(last) >= _FUZZY_MIN_LEN:
+                exact += self._similar(last, is_prefix)
+            if exact != ([] if is_prefix else [last]) or any(len(g) > 1 for g in required):
+                collect(required, exact, 0.5)
+
+        return sorted(found.values(), key=lambda r: -r["score"])[:limit]
+
+
+class SuggestIndex:
+    """Holds the current _Index; fed by the catalog snapshot."""
+
+    def __init__(self):
+        self.index: Optional[_Index] = None
+        self.rebuilds = 0
+        self._loading: Optional[list[Doc]] = None  # during a full load
+        self._pending: dict[tuple[str, str], Optional[list[Doc]]] = {}
+        self._lock = asyncio.Lock()  # one refreshed() at a time, in order
+
+    # --- Snapshot watcher ---
+
+    def reset(self) -> None:
+        """A full load follows."""
+        self._loading = []
+        self._pending = {}
+
+    def update(self, kind: str, rows: dict) -> None:
+        """{key: row mapping or None (deleted)} of one kind."""
+        for key, row in rows.items():
+            docs = row_docs(kind, row) if row is not None else None
+            if self._loading is not None:
+                self._loading += docs or ()
+            else:
+                self._pending[(kind, key)] = docs
+
+    async def refreshed(self) -> None:
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            index = self.index
+            if self._loading is not None:
+                docs, self._loading = self._loading, None
+                self.index = await anyio.to_thread.run_sync(_Index, docs)
+            elif index is None or not pending:
+                return
+            elif (index.dead + index.unranked + len(pending)) / max(len(index.docs), 1) <= _REBUILD_CHURN:
+                changes = [(kind, key, docs) for (kind, key), docs in pending.items()]
+                for i in range(0, len(changes), _APPLY_BATCH):
+                    if i:
+                        await asyncio.sleep(0)
+                    index.apply(changes[i:i + _APPLY_BATCH])
+                return
+            else:
+                # queries use the current index meanwhile; only refreshed() changes it
+                self.index = await anyio.to_thread.run_sync(lambda: _Index(index.merged(pending)))
+            self.rebuilds += 1
+
+    # --- Queries ---
+
+    def search(self, q: str, limit: int = 10, kind: Optional[str] = None) -> Optional[list[dict]]:
+        """None until the first build."""
+        if self.index is None:
+            return None
+        return self.index.search(q, limit, kind)
+
+    def stats(self) -> dict:
+        index = self.index
+        return {
+            "entries": len(index.docs) - index.dead if index else 0,
+            "words": len(index.vocab) if index else 0,
+            "churn": round(index.churn, 3) if index else 0.0,
+            "rebuilds": self.rebuilds,
+        }
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,152 @@
+# cache/transcripts.py
+import os, time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterator, NamedTuple, Optional
+
+from cache.catalog import CATALOG_CACHE_SETTLE_S
+from cache.ttl import SingleFlight
+
+# ---- ENV ----
+TRANSCRIPT_INDEX_MAX_BYTES = int(os.getenv("TRANSCRIPT_INDEX_MAX_BYTES", str(64 * 1024 * 1024)))
+TRANSCRIPT_INDEX_TTL_S     = float(os.getenv("TRANSCRIPT_INDEX_TTL_S", "300"))  # bounds staleness across workers
+
+_ENTRY_OVERHEAD = 256  # object headers of an index and its LRU slot, roughly
+
+
+class TranscriptIndex:
+    """
+    Caption lines of one media in three flat buffers: start times (sorted),
+    and the UTF-8 texts concatenated with their offsets. Lookups by playback
+    time are binary searches; only the returned lines are decoded.
+    """
+    __slots__ = ("times", "offsets", "blob")
+
+    def __init__(self, transcript: Optional[Any]):
+        if not transcript:
+            lines = []
+        elif isinstance(transcript, str):
+            lines = [(0, transcript)]
+        else:
+            # stable: lines sharing a start time keep their order
+            lines = sorted(((int(l["time"]), l["text"]) for l in transcript), key=lambda l: l[0])
+        encoded = [text.encode() for _, text in lines]
+        self.times = array("q", (t for t, _ in lines))
+        self.offsets = array("q", [0])
+        for b in encoded:
+            self.offsets.append(self.offsets[-1] + len(b))
+        self.blob = b"".join(encoded)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.blob) + (len(self.times) + len(self.offsets)) * 8 + _ENTRY_OVERHEAD
+
+    def _line(self, i: int) -> dict:
+        return {"time": self.times[i], "text": self.blob[self.offsets[i]:self.offsets[i + 1]].decode()}
+
+    def texts(self) -> Iterator[str]:
+        """Every line's text, in time order, decoded one at a time."""
+        for i in range(len(self.times)):
+            yield self.blob[self.offsets[i]:self.offsets[i + 1]].decode()
+
+    def _next_time(self, i: int) -> Optional[int]:
+        return self.times[i] if i < len(self.times) else None
+
+    def at(self, t: int) -> tuple[list[dict], Optional[int]]:
+        """The line active at `t` (the last one starting at or before it) and the next start time."""
+        i = bisect_right(self.times, t)
+        return ([self._line(i - 1)] if i else []), self._next_time(i)
+
+    def between(self, start: int, end: Optional[int]) -> tuple[list[dict], Optional[int]]:
+        """Lines active at some point in [start, end] and the first start time after `end`."""
+        lo = max(bisect_right(self.times, start) - 1, 0)
+        hi = len(self.times) if end is None else bisect_right(self.times, end)
+        return [self._line(i) for i in range(lo, hi)], self._next_time(hi)
+
+
+class Loaded(NamedTuple):
+    found: bool                       # False: no such media
+    transcript: Optional[Any] = None  # media_transcript as stored
+
+
+class TranscriptIndexCache:
+    """
+    LRU of TranscriptIndex by media_id, bounded by total size (`max_bytes`).
+    Indexes are built on first use from the transcript `load` returns; the
+    transcript write paths drop the media's entry with `pop()` after they
+    commit. As with the catalog cache, builds within `settle_s` of a pop are
+    served but not kept (a replica may not have the write yet).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = TRANSCRIPT_INDEX_MAX_BYTES,
+        ttl_s: float = TRANSCRIPT_INDEX_TTL_S,
+        settle_s: float = CATALOG_CACHE_SETTLE_S,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.settle_s = settle_s
+        self.popped_at = float("-inf")
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.version = 0  # bumped by pop(), so a build racing a write is not cached
+        self._entries: "OrderedDict[str, tuple[float, TranscriptIndex]]" = OrderedDict()
+        self._inflight = SingleFlight()
+
+    async def get(self, media_id: str, load: Callable[[], Awaitable[Loaded]]) -> Optional[TranscriptIndex]:
+        """Index of `media_id`, or None when `load` reports the media missing."""
+        entry = self._entries.get(media_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(media_id)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+
+        async def build():
+            version = self.version
+            loaded = await load()
+            if not loaded.found:
+                return None
+            index = TranscriptIndex(loaded.transcript)
+            if version == self.version and time.monotonic() - self.popped_at >= self.settle_s:
+                self._put(media_id, index)
+            return index
+
+        return await self._inflight.do(media_id, build)
+
+    def _put(self, media_id: str, index: TranscriptIndex) -> None:
+        self._drop(media_id)
+        if index.nbytes > self.max_bytes:
+            return
+        self._entries[media_id] = (time.monotonic() + self.ttl_s, index)
+        self.nbytes += index.nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def _drop(self, media_id: str) -> None:
+        entry = self._entries.pop(media_id, None)
+        if entry is not None:
+            self.nbytes -= entry[1].nbytes
+
+    def pop(self, media_id: str) -> None:
+        self.version += 1
+        self.popped_at = time.monotonic()
+        self._drop(media_id)
+
+    def clear(self) -> None:
+        self.version += 1
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses}
+
+
+transcript_index = TranscriptIndexCache()
@@ -0,0 +1,163 @@
+# crud/captions.py
+"""
+WebVTT / SRT <-> transcript lines ({"time": <start s>, "text": ...}).
+
+Import is a push parser fed with the body as it streams in: only the cue
+being read is buffered, so memory stays bounded by CAPTION_MAX_CUE_CHARS
+plus the parsed lines. Cue settings, end times, styling tags and
+NOTE/STYLE/REGION blocks are dropped; a transcript line keeps the start
+second and the plain text. Export writes the lines back as WebVTT, each
+cue ending where the next one starts.
+"""
+import codecs, html, os, re
+from bisect import bisect_right
+from typing import AsyncIterator, Iterator, Optional
+
+# ---- ENV ----
+CAPTION_MAX_BYTES     = int(os.getenv("CAPTION_MAX_BYTES", str(64 * 1024 * 1024)))  # one upload
+CAPTION_MAX_CUE_CHARS = int(os.getenv("CAPTION_MAX_CUE_CHARS", "16384"))            # one line / one cue
+CAPTION_LAST_CUE_S    = 5     # length given to the last cue on export
+CAPTION_CHUNK_CUES    = 500   # cues per chunk of the export stream
+
+_TIMING = re.compile(r"\s*(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})\s+-->\s+\S+")
+_TAG = re.compile(r"<[^>]*>")
+_SKIPPED_BLOCKS = ("NOTE", "STYLE", "REGION")
+
+
+class CaptionError(ValueError):
+    def __init__(self, line_no: int, msg: str):
+        super().__init__(f"line {line_no}: {msg}")
+        self.line_no = line_no
+
+
+class CaptionTooLarge(Exception):
+    pass
+
+
+class CaptionParser:
+    """
+    feed() decoded text, get back the transcript lines it completed;
+    close() flushes the last cue. The format is told by the first line:
+    "WEBVTT" or else SRT.
+    """
+
+    def __init__(self, max_cue_chars: int = CAPTION_MAX_CUE_CHARS):
+        self.max_cue_chars = max_cue_chars
+        self.vtt: Optional[bool] = None
+        self.line_no = 0
+        self._tail = ""
+        self._block: list[str] = []
+        self._block_chars = 0
+        self._block_start = 0
+
+    def feed(self, text: str) -> list[dict]:
+        buf = self._tail + text
+        # a "\r" at the end may be the first half of "\r\n"
+        hold = buf.endswith("\r")
+        if hold:
+            buf = buf[:-1]
+        lines = buf.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self._tail = lines.pop() + ("\r" if hold else "")
+        if len(self._tail) > self.max_cue_chars:
+            raise CaptionError(self.line_no + 1, f"line longer than {self.max_cue_chars} characters")
+        out: list[dict] = []
+        for line in lines:
+            self._line(line, out)
+        return out
+
+    def close(self) -> list[dict]:
+        out: list[dict] = []
+        if self._tail.rstrip("\r"):
+            self._line(self._tail.rstrip("\r"), out)
+        self._tail = ""
+        self._end_block(out)
+        if self.vtt is None:
+            raise CaptionError(self.line_no + 1, "no captions")
+        return out
+
+    def _line(self, line: str, out: list[dict]) -> None:
+        self.line_no += 1
+        if not line.strip():
+            self._end_block(out)
+            return
+        if not self._block:
+            self._block_start = self.line_no
+        self._block_chars += len(line)
+        if self._block_chars > self.max_cue_chars:
+            raise CaptionError(self._block_start, f"cue longer than {self.max_cue_chars} characters")
+        self._block.append(line)
+
+    def _end_block(self, out: list[dict]) -> None:
+        block, self._block, self._block_chars = self._block, [], 0
+        if not block:
+            return
+        if self.vtt is None:
+            self.vtt = block[0].startswith("WEBVTT")
+            if self.vtt:
+                return  # header block
+        if self.vtt and block[0].startswith(_SKIPPED_BLOCKS):
+            return
+        # optional cue identifier (SRT: the sequence number) before the timing line
+        i = 0 if "-->" in block[0] else 1
+        m = _TIMING.match(block[i]) if i < len(block) else None
+        if m is None:
+            raise CaptionError(self._block_start + i, "expected a timing line (00:00:01.000 --> 00:00:04.000)")
+        h, mnt, s, _ = m.groups()
+        text = "\n".join(_TAG.sub("", l).strip() for l in block[i + 1:])
+        if self.vtt:
+            text = html.unescape(text)
+        text = text.strip()
+        if text:
+            out.append({"time": int(h or 0) * 3600 + int(mnt) * 60 + int(s), "text": text})
+
+
+async def parse_captions(chunks: AsyncIterator[bytes], max_bytes: int = CAPTION_MAX_BYTES) -> list[dict]:
+    """Transcript lines of a UTF-8 WebVTT or SRT body; CaptionError, CaptionTooLarge."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    parser = CaptionParser()
+    lines: list[dict] = []
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise CaptionTooLarge()
+            lines += parser.feed(decoder.decode(chunk))
+        lines += parser.feed(decoder.decode(b"", final=True))
+    except UnicodeDecodeError:
+        raise CaptionError(parser.line_no + 1, "not UTF-8")
+    lines += parser.close()
+    return lines
+
+
+# ----------------------------
+#  Export
+# ----------------------------
+
+def _timestamp(s: int) -> str:
+    return f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}.000"
+
+
+def _cue_text(text: str) -> str:
+    # entities for & < > (so no "-->" either), and no blank line inside a cue
+    lines = (l.strip() for l in html.escape(text, quote=False).splitlines())
+    return "\n".join(l for l in lines if l) or "&nbsp;"
+
+
+def to_vtt(times, texts: Iterator[str]) -> Iterator[str]:
+    """
+    WebVTT in chunks of CAPTION_CHUNK_CUES cues, for start `times` (sorted)
+    and their `texts`. A cue ends at the next later start.
+    """
+    buf = ["WEBVTT\n\n"]
+    n = len(times)
+    for i, text in enumerate(texts):
+        t = times[i]
+        j = bisect_right(times, t, i + 1)
+        end = times[j] if j < n else t + CAPTION_LAST_CUE_S
+        buf.append(f"{_timestamp(t)} --> {_timestamp(end)}\n{_cue_text(text)}\n\n")
+        if len(buf) >= CAPTION_CHUNK_CUES:
+            yield "".join(buf)
+            buf.clear()
+    if buf:
+        yield "".join(buf)
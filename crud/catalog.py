@@ -0,0 +1,153 @@
+# crud/catalog.py
+import os
+from typing import Any, AsyncIterator, Iterable, Union
+import sqlalchemy as sa
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.course import Course, CourseORM
+from models.media import Media, MediaORM
+from crud.transcripts import index_transcripts
+from cache.catalog import catalog_cache
+from crud.changes import course_change, media_change, record_changes
+from cache.transcripts import transcript_index
+
+# ---- ENV ----
+# rows per multi-row INSERT and per transaction (asyncpg caps a statement at 32767 params)
+BULK_BATCH_SIZE = min(int(os.getenv("BULK_BATCH_SIZE", "500")), 5000)
+
+# ----------------------------
+#  Multi-row upserts
+# ----------------------------
+
+async def _upsert(db: AsyncSession, orm, key: str, rows: list[dict], update: bool) -> dict[str, str]:
+    """One INSERT ... ON CONFLICT for `rows`; returns {id: created|updated|exists}."""
+    table = orm.__table__
+    stmt = insert(orm).values(rows)
+    if update:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name != key},
+        )
+        # xmax is 0 only for rows this statement inserted
+        stmt = stmt.returning(table.c[key], sa.literal_column("xmax = 0"))
+        res = await db.execute(stmt)
+        done = {k: ("created" if inserted else "updated") for k, inserted in res.all()}
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[key]).returning(table.c[key])
+        res = await db.execute(stmt)
+        done = {k: "created" for k in res.scalars().all()}
+    return {r[key]: done.get(r[key], "exists") for r in rows}
+
+
+async def upsert_courses(db: AsyncSession, rows: list[dict], *, update: bool = False) -> dict[str, str]:
+    status = await _upsert(db, CourseORM, "course_id", rows, update)
+    await record_changes(db, [
+        course_change(status[r["course_id"]], r["course_id"]) for r in rows if status[r["course_id"]] != "exists"
+    ])
+    return status
+
+
+async def upsert_medias(db: AsyncSession, rows: list[dict], *, update: bool = False) -> dict[str, str]:
+    status = await _upsert(db, MediaORM, "media_id", rows, update)
+    written = [r for r in rows if status[r["media_id"]] != "exists"]
+    # keep /search in step with whatever was written
+    await index_transcripts(db, written)
+    await record_changes(db, [media_change(status[r["media_id"]], r["media_id"], r["course_id"]) for r in written])
+    return status
+
+
+# ----------------------------
+#  Streaming ingestion
+# ----------------------------
+
+KINDS = {
+    "courses": (Course, "course_id", upsert_courses),
+    "medias": (Media, "media_id", upsert_medias),
+}
+
+Item = tuple[int, Union[bytes, dict, Exception]]
+
+
+async def ingest(
+    db: AsyncSession,
+    kind: str,
+    items: Union[AsyncIterator[Item], Iterable[Item]],
+    *,
+    update: bool = False,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> AsyncIterator[dict]:
+    """
+    Validate (line_no, raw JSON | dict) items and write them in batches, one
+    transaction per batch. Yields one {"line", "id", "status"} result per
+    item, status being created/updated/exists/invalid/failed: invalid items
+    right away, the others when their batch commits. Only one batch is held
+    in memory.
+    """
+    model, key, upsert = KINDS[kind]
+    batch: list[tuple[int, dict]] = []
+    batch_keys: set[str] = set()
+
+    def invalidate(rows: list[dict]) -> None:
+        catalog_cache.invalidate()
+        if kind == "medias" and update:
+            for r in rows:
+                transcript_index.pop(r["media_id"])
+
+    async def flush() -> list[dict]:
+        rows = [r for _, r in batch]
+        try:
+            status = await upsert(db, rows, update=update)
+            await db.commit()
+            invalidate(rows)
+            out = [{"line": n, "id": r[key], "status": status[r[key]]} for n, r in batch]
+        except DBAPIError:
+            await db.rollback()
+            # find the offending rows: retry one by one, each in its own transaction
+            out = []
+            for n, r in batch:
+                try:
+                    status = await upsert(db, [r], update=update)
+                    await db.commit()
+                    out.append({"line": n, "id": r[key], "status": status[r[key]]})
+                except DBAPIError as e:
+                    await db.rollback()
+                    out.append({"line": n, "id": r[key], "status": "failed", "error": str(e.orig)})
+            invalidate([r for _, r in batch])
+        batch.clear()
+        batch_keys.clear()
+        return out
+
+    async def results(line_no: int, raw: Any) -> AsyncIterator[dict]:
+        if isinstance(raw, Exception):
+            yield {"line": line_no, "id": None, "status": "invalid", "error": str(raw)}
+            return
+        try:
+            obj = model.model_validate_json(raw) if isinstance(raw, bytes) else model.model_validate(raw)
+        except ValidationError as e:
+            yield {"line": line_no, "id": None, "status": "invalid",
+                   "error": e.errors(include_url=False, include_context=False, include_input=False)}
+            return
+        row = obj.model_dump()
+        # same id twice in one statement is an error for ON CONFLICT DO UPDATE
+        if row[key] in batch_keys:
+            for res in await flush():
+                yield res
+        batch.append((line_no, row))
+        batch_keys.add(row[key])
+        if len(batch) >= batch_size:
+            for res in await flush():
+                yield res
+
+    if hasattr(items, "__aiter__"):
+        async for line_no, raw in items:
+            async for res in results(line_no, raw):
+                yield res
+    else:
+        for line_no, raw in items:
+            async for res in results(line_no, raw):
+                yield res
+    if batch:
+        for res in await flush():
+            yield res
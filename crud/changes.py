@@ -0,0 +1,69 @@
+# crud/changes.py
+"""
+Write side of catalog changes. Every catalog write calls record_changes()
+in its transaction, before commit:
+
+  1. bumps catalog_meta.version (the row lock makes concurrent writers
+     take turns, so versions follow commit order),
+  2. stamps the written rows with it in catalog_row_versions (delta sync,
+     cache/snapshot.py),
+  3. queues one NOTIFY per change (live feed, cache/changes.py); Postgres
+     sends them on commit and drops them on rollback.
+"""
+import uuid
+from typing import Optional
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from cache.changes import CHANNEL
+from models.catalog import CatalogMetaORM, CatalogRowVersionORM
+from models.serialize import dumps
+
+
+def course_change(op: str, course_id: str) -> dict:
+    return {"kind": "course", "op": op, "course_id": course_id}
+
+
+def media_change(op: str, media_id: str, course_id: Optional[str]) -> dict:
+    return {"kind": "media", "op": op, "media_id": media_id, "course_id": course_id}
+
+
+def _statements():
+    meta = CatalogMetaORM.__table__
+    bump = insert(meta).values(id=1, version=1)
+    bump = bump.on_conflict_do_update(
+        index_elements=[meta.c.id], set_={"version": meta.c.version + 1}
+    ).returning(meta.c.version)
+
+    rv = CatalogRowVersionORM.__table__
+    stamp = insert(rv).from_select(
+        ["kind", "key", "version"],
+        sa.select(
+            sa.func.unnest(sa.bindparam("kinds", type_=ARRAY(sa.Text))),
+            sa.func.unnest(sa.bindparam("keys", type_=ARRAY(sa.Text))),
+            sa.bindparam("version", type_=sa.BigInteger),
+        ),
+    )
+    stamp = stamp.on_conflict_do_update(
+        index_elements=[rv.c.kind, rv.c.key], set_={"version": stamp.excluded.version}
+    )
+
+    notify = sa.select(
+        sa.func.pg_notify(CHANNEL, sa.func.unnest(sa.bindparam("payloads", type_=ARRAY(sa.Text))))
+    )
+    return bump, stamp, notify
+
+_BUMP, _STAMP, _NOTIFY = _statements()
+
+
+async def record_changes(db: AsyncSession, changes: list[dict]) -> Optional[int]:
+    """Version and announce `changes` in the caller's transaction; returns the new catalog version."""
+    if not changes:
+        return None
+    version = (await db.execute(_BUMP)).scalar_one()
+    # one row per key: ON CONFLICT cannot update the same row twice
+    keys = {(c["kind"], c[f"{c['kind']}_id"]) for c in changes}
+    await db.execute(_STAMP, {"kinds": [k for k, _ in keys], "keys": [k for _, k in keys], "version": version})
+    payloads = [dumps({"id": uuid.uuid4().hex, "version": version, **c}).decode() for c in changes]
+    await db.execute(_NOTIFY, {"payloads": payloads})
+    return version
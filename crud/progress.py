@@ -0,0 +1,217 @@
+# crud/progress.py
+import asyncio, os, uuid
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+import sqlalchemy as sa
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.postgres import AsyncSessionLocal
+from models.media import MediaORM
+from models.progress import WatchProgressORM
+from models.user import UserORM
+
+# ---- ENV ----
+PROGRESS_FLUSH_INTERVAL_S = float(os.getenv("PROGRESS_FLUSH_INTERVAL_S", "5"))
+PROGRESS_BUFFER_MAX       = int(os.getenv("PROGRESS_BUFFER_MAX", "50000"))  # pending (user, media) pairs
+PROGRESS_FLUSH_BATCH      = int(os.getenv("PROGRESS_FLUSH_BATCH", "1000"))  # rows per INSERT (5 params each)
+PROGRESS_BACKPRESSURE_S   = float(os.getenv("PROGRESS_BACKPRESSURE_S", "2"))
+PROGRESS_DRAIN_TIMEOUT_S  = float(os.getenv("PROGRESS_DRAIN_TIMEOUT_S", "10"))
+
+
+class Beat(NamedTuple):
+    position_s: float
+    duration_s: Optional[float]
+    updated_at: datetime
+
+
+class BufferFull(Exception):
+    pass
+
+
+# ----------------------------
+#  Batched upsert
+# ----------------------------
+
+_COLUMNS = ("user_id", "media_id", "position_s", "duration_s", "updated_at")
+
+def _upsert_stmt(rows: list[tuple]):
+    """
+    One INSERT ... SELECT FROM (VALUES ...) ON CONFLICT for a batch. The joins
+    drop rows whose media (or user) is gone instead of failing the batch on the
+    foreign keys, and a row only replaces an older one (other workers flush too).
+    """
+    v = sa.values(
+        sa.column("user_id", UUID(as_uuid=True)),
+        sa.column("media_id", sa.Text),
+        sa.column("position_s", sa.Float),
+        sa.column("duration_s", sa.Float),
+        sa.column("updated_at", sa.DateTime(timezone=True)),
+        name="v",
+    ).data(rows)
+    # an all-NULL VALUES column would come out as text
+    cols = [sa.cast(v.c[c], sa.Float) if c == "duration_s" else v.c[c] for c in _COLUMNS]
+    src = (
+        select(*cols)
+        .join(MediaORM, MediaORM.media_id == v.c.media_id)
+        .join(UserORM, UserORM.user_id == v.c.user_id)
+    )
+    wp = WatchProgressORM.__table__
+    ins = insert(WatchProgressORM).from_select(list(_COLUMNS), src)
+    return ins.on_conflict_do_update(
+        index_elements=[wp.c.user_id, wp.c.media_id],
+        set_={c: ins.excluded[c] for c in ("position_s", "duration_s", "updated_at")},
+        where=wp.c.updated_at <= ins.excluded.updated_at,
+    )
+
+
+# ----------------------------
+#  Write-behind buffer
+# ----------------------------
+
+class ProgressBuffer:
+    """
+    Playback heartbeats merged in memory, last write wins per (user_id,
+    media_id), and written in multi-row upserts every `interval_s` (sooner
+    once half full). At most `max_pending` pairs are held: a new pair that
+    arrives when full waits up to PROGRESS_BACKPRESSURE_S for a flush, then
+    gets BufferFull. stop() writes out whatever is pending.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = PROGRESS_BUFFER_MAX,
+        interval_s: float = PROGRESS_FLUSH_INTERVAL_S,
+        batch_size: int = PROGRESS_FLUSH_BATCH,
+    ):
+        self.max_pending = max_pending
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self.flushed = 0
+        self.rejected = 0
+        self._pending: dict[uuid.UUID, dict[str, Beat]] = {}
+        self._size = 0
+        self._flushing: dict[uuid.UUID, dict[str, Beat]] = {}  # being written, still served by pending_for
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _add(self, user_id: uuid.UUID, media_id: str, beat: Beat) -> bool:
+        by_media = self._pending.get(user_id)
+        if by_media is not None and media_id in by_media:
+            by_media[media_id] = beat
+            return True
+        if self._size >= self.max_pending:
+            return False
+        self._pending.setdefault(user_id, {})[media_id] = beat
+        self._size += 1
+        if self._size >= self.max_pending // 2:
+            self._wake.set()
+        return True
+
+    async def put(self, user_id: uuid.UUID, media_id: str, position_s: float, duration_s: Optional[float] = None) -> None:
+        beat = Beat(position_s, duration_s, datetime.now(timezone.utc))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + PROGRESS_BACKPRESSURE_S
+        while not self._add(user_id, media_id, beat):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.rejected += 1
+                raise BufferFull()
+            self._wake.set()
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def pending_for(self, user_id: uuid.UUID) -> dict[str, Beat]:
+        """Heartbeats of `user_id` not yet in the DB (newest per media)."""
+        out = dict(self._flushing.get(user_id, {}))
+        out.update(self._pending.get(user_id, {}))
+        return out
+
+    async def flush(self) -> int:
+        """Write everything pending; on failure it is put back (newer beats win)."""
+        if not self._size:
+            return 0
+        self._flushing, self._pending, self._size = self._pending, {}, 0
+        self._space.set()
+        rows = [(u, m, *b) for u, by_media in self._flushing.items() for m, b in by_media.items()]
+        done = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                for i in range(0, len(rows), self.batch_size):
+                    await db.execute(_upsert_stmt(rows[i:i + self.batch_size]))
+                    await db.commit()
+                    done = i + self.batch_size
+        except BaseException:
+            for u, m, *beat in rows[done:]:
+                by_media = self._pending.setdefault(u, {})
+                if m not in by_media:
+                    by_media[m] = Beat(*beat)
+                    self._size += 1
+            raise
+        finally:
+            self._flushing = {}
+        self.flushed += len(rows)
+        return len(rows)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print("progress flush failed, retrying:", e)
+        # drain
+        while self._size:
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"progress drain failed, {self._size} updates lost:", e)
+                return
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self, timeout_s: float = PROGRESS_DRAIN_TIMEOUT_S) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout_s)
+        finally:
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"pending": self._size, "flushed": self.flushed, "rejected": self.rejected}
+
+
+progress_buffer = ProgressBuffer()
+
+
+async def list_progress(db: AsyncSession, user_id: uuid.UUID, limit: int) -> list[dict]:
+    """Stored positions of `user_id` overlaid with its pending heartbeats, newest first."""
+    wp = WatchProgressORM.__table__
+    res = await db.execute(
+        select(wp.c.media_id, wp.c.position_s, wp.c.duration_s, wp.c.updated_at)
+        .where(wp.c.user_id == user_id)
+        .order_by(wp.c.updated_at.desc())
+        .limit(limit)
+    )
+    items = {r["media_id"]: dict(r) for r in res.mappings().all()}
+    for media_id, beat in progress_buffer.pending_for(user_id).items():
+        items[media_id] = {"media_id": media_id, **beat._asdict()}
+    return sorted(items.values(), key=lambda i: i["updated_at"], reverse=True)[:limit]
@@ -0,0 +1,91 @@
+# crud/transcripts.py
+from typing import Any, Optional
+from sqlalchemy import delete, insert, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from crud.changes import media_change, record_changes
+from models.media import MediaORM
+from models.transcript import TranscriptLineORM
+
+# ----------------------------
+#  Search index (transcript_lines)
+# ----------------------------
+
+def transcript_rows(media_id: str, course_id: str, transcript: Optional[Any]) -> list[dict]:
+    """media_transcript (list of TranscriptLine dicts, or plain text) -> transcript_lines rows."""
+    if not transcript:
+        return []
+    if isinstance(transcript, str):
+        return [{"media_id": media_id, "line_no": 0, "course_id": course_id, "time": 0, "text": transcript}]
+    return [
+        {"media_id": media_id, "line_no": i, "course_id": course_id,
+         "time": int(line["time"]), "text": line["text"]}
+        for i, line in enumerate(transcript)
+    ]
+
+
+async def index_transcript(
+    db: AsyncSession,
+    *,
+    media_id: str,
+    course_id: str,
+    transcript: Optional[Any],
+) -> None:
+    """Replace the indexed lines of one media. Runs in the caller's transaction."""
+    await db.execute(delete(TranscriptLineORM).where(TranscriptLineORM.media_id == media_id))
+    rows = transcript_rows(media_id, course_id, transcript)
+    if rows:
+        await db.execute(insert(TranscriptLineORM), rows)
+
+
+async def index_transcripts(db: AsyncSession, medias: list[dict]) -> None:
+    """Batch form of index_transcript for media rows (dicts with MediaORM columns)."""
+    if not medias:
+        return
+    await db.execute(
+        delete(TranscriptLineORM).where(TranscriptLineORM.media_id.in_([m["media_id"] for m in medias]))
+    )
+    rows = [
+        r for m in medias
+        for r in transcript_rows(m["media_id"], m["course_id"], m.get("media_transcript"))
+    ]
+    if rows:
+        await db.execute(insert(TranscriptLineORM), rows)
+
+
+async def replace_transcript(db: AsyncSession, media_id: str, transcript: list[dict]) -> bool:
+    """Store and index the transcript of one media, then commit; False if there is no such media."""
+    res = await db.execute(
+        update(MediaORM)
+        .where(MediaORM.media_id == media_id)
+        .values(media_transcript=transcript)
+        .returning(MediaORM.course_id)
+    )
+    row = res.first()
+    if row is None:
+        return False
+    await index_transcript(db, media_id=media_id, course_id=row.course_id, transcript=transcript)
+    await record_changes(db, [media_change("updated", media_id, row.course_id)])
+    await db.commit()
+    return True
+
+
+# medias that predate the index, or were written around the API
+_BACKFILL_SQL = text("""
+    INSERT INTO transcript_lines (media_id, line_no, course_id, time, text)
+    SELECT m.media_id, l.ord - 1, m.course_id, (l.value->>'time')::int, l.value->>'text'
+    FROM medias m
+    CROSS JOIN LATERAL jsonb_array_elements(m.media_transcript) WITH ORDINALITY AS l(value, ord)
+    WHERE jsonb_typeof(m.media_transcript) = 'array'
+      AND NOT EXISTS (SELECT 1 FROM transcript_lines t WHERE t.media_id = m.media_id)
+    UNION ALL
+    SELECT m.media_id, 0, m.course_id, 0, m.media_transcript #>> '{}'
+    FROM medias m
+    WHERE jsonb_typeof(m.media_transcript) = 'string'
+      AND NOT EXISTS (SELECT 1 FROM transcript_lines t WHERE t.media_id = m.media_id)
+""")
+
+
+async def backfill_transcript_index(db: AsyncSession) -> int:
+    res = await db.execute(_BACKFILL_SQL)
+    await db.commit()
+    return res.rowcount
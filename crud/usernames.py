@@ -0,0 +1,85 @@
+# crud/usernames.py
+import asyncio, os, re, time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, func
+from db.postgres import AsyncSessionLocal
+from models.user import UserORM
+
+USERNAME_RE = re.compile(r"^[a-z0-9_]{3,20}$")
+USERNAME_MAX_LEN = 20
+
+# ---- ENV ----
+USERNAME_INDEX_REFRESH_S = float(os.getenv("USERNAME_INDEX_REFRESH_S", "5"))
+
+# ----------------------------
+#  In-memory index of taken usernames
+# ----------------------------
+
+class UsernameIndex:
+    """
+    Lowercased usernames in use, mirrored from `users` (ux_users_username_lower).
+    Loaded once, then kept current from rows whose updated_at moved, in the
+    background every USERNAME_INDEX_REFRESH_S. Changes made by this worker
+    are applied right away; the unique index stays the final word on writes.
+    """
+
+    def __init__(self):
+        self._owner: dict[str, str] = {}    # username -> sub
+        self._by_user: dict[str, str] = {}  # sub -> username
+        self._since: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._loading: Optional[asyncio.Task] = None
+
+    def set(self, sub: str, username: Optional[str]) -> None:
+        old = self._by_user.pop(sub, None)
+        if old and self._owner.get(old) == sub:
+            del self._owner[old]
+        if username:
+            self._by_user[sub] = username
+            self._owner[username] = sub
+
+    async def _refresh(self) -> None:
+        stmt = select(UserORM.sub, func.lower(UserORM.username), UserORM.updated_at)
+        if self._since is not None:
+            stmt = stmt.where(UserORM.updated_at >= self._since)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt)).all()
+        for sub, username, updated_at in rows:
+            self.set(sub, username)
+            if self._since is None or updated_at > self._since:
+                self._since = updated_at
+        self._refreshed_at = time.monotonic()
+
+    def _refresh_task(self) -> asyncio.Task:
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.ensure_future(self._refresh())
+            self._loading.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._loading
+
+    async def ready(self) -> None:
+        if not self._refreshed_at:
+            await self._refresh_task()
+        elif time.monotonic() - self._refreshed_at >= USERNAME_INDEX_REFRESH_S:
+            self._refresh_task()  # answer from the current set meanwhile
+
+    def is_available(self, username: str, sub: Optional[str] = None) -> bool:
+        """Free, or already held by `sub` itself."""
+        owner = self._owner.get(username)
+        return owner is None or owner == sub
+
+    def suggest(self, username: str, n: int = 3) -> list[str]:
+        """Free variants of `username`: name1, name_1, name2, ... within the length limit."""
+        out: list[str] = []
+        for i in range(1, 10_000):
+            for sep in ("", "_"):
+                tail = f"{sep}{i}"
+                cand = username[: USERNAME_MAX_LEN - len(tail)] + tail
+                if cand not in self._owner and cand not in out:
+                    out.append(cand)
+                    if len(out) == n:
+                        return out
+        return out
+
+
+username_index = UsernameIndex()
@@ -1,9 +1,14 @@
 # crud/users.py
+import os
 from typing import Optional
-from sqlalchemy import select, func
+from sqlalchemy import select, func, or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from models.user import UserORM
+from cache.ttl import TTLCache
+from crud.usernames import username_index
+from db.queries import USER_BY_SUB, USER_UPSERT
 
 # ----------------------------
 #  Queries (help functions)
@@ -11,7 +16,7 @@ from models.user import UserORM
 
 async def get_user_by_sub(db: AsyncSession, sub: str) -> Optional[UserORM]:
     """Find user by Firebase UID (stored in UserORM.sub)."""
-    res = await db.execute(select(UserORM).where(UserORM.sub == sub))
+    res = await db.execute(USER_BY_SUB, {"sub": sub})
     return res.scalar_one_or_none()
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserORM]:
@@ -30,6 +35,21 @@ async def is_username_taken(db: AsyncSession, username: str) -> bool:
     )
     return res.scalar_one_or_none() is not None
 
+# ----------------------------
+#  Per-UID cache for /me
+# ----------------------------
+
+USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL_S", "60"))
+USER_CACHE_MAX   = int(os.getenv("USER_CACHE_MAX", "50000"))
+
+# uid -> {"email", "username", "user_id"}; dropped by every profile/username update below
+user_cache = TTLCache(USER_CACHE_MAX, USER_CACHE_TTL_S)
+
+def cache_user(u: UserORM) -> dict:
+    out = {"email": u.email, "username": u.username, "user_id": u.user_id}
+    user_cache.set(u.sub, out)
+    return out
+
 # ----------------------------
 #  Upsert from Identity (Firebase)
 # ----------------------------
@@ -45,70 +65,81 @@ async def upsert_user_from_identity(
 
     email_norm = email.lower() if email else None
 
-   
-    u = await get_user_by_sub(db, uid)
-    if u:
-        changed = False
-        if email_norm and u.email != email_norm:
-            u.email = email_norm; changed = True
-        if name is not None and getattr(u, "name", None) != name:
-            u.name = name; changed = True
-        if avatar is not None and getattr(u, "avatar", None) != avatar:
-            u.avatar = avatar; changed = True
-        if changed:
+    for attempt in range(3):
+        try:
+            params = {"sub": uid, "email": email_norm, "name": name, "avatar": avatar}
+            u = (await db.execute(USER_UPSERT, params)).scalar_one_or_none()
             await db.commit()
-            await db.refresh(u)
-        return u
-
-    
-    if email_norm:
-        u = await get_user_by_email(db, email_norm)
-        if u:
-            changed = False
-            if u.sub != uid:
-                u.sub = uid; changed = True
-            if name is not None and getattr(u, "name", None) != name:
-                u.name = name; changed = True
-            if avatar is not None and getattr(u, "avatar", None) != avatar:
-                u.avatar = avatar; changed = True
-            if changed:
-                try:
-                    await db.commit()
-                    await db.refresh(u)
-                except IntegrityError:
-                    # احتمالاً همزمان ردیفی با همین UID ساخته شده
-                    await db.rollback()
-                    existing = await get_user_by_sub(db, uid)
-                    if existing:
-                        return existing
+        except IntegrityError:
+            # the email belongs to another account
+            await db.rollback()
+            if not email_norm:
+                raise
+            try:
+                u = await _relink_email(db, uid=uid, email=email_norm, name=name, avatar=avatar)
+            except IntegrityError:
+                # a concurrent login moved the same rows first
+                await db.rollback()
+                if attempt == 2:
                     raise
+                continue
+        if u:
+            cache_user(u)
             return u
+        # a concurrent first login committed after our snapshot; its row is visible now
 
+    raise RuntimeError(f"upsert of user {uid} returned no row")
 
-    u = UserORM(sub=uid, email=email_norm, name=name, avatar=avatar)
-    db.add(u)
-    try:
-        await db.commit()
-        await db.refresh(u)
-        return u
-    except IntegrityError:
-   
+async def _relink_email(
+    db: AsyncSession,
+    *,
+    uid: str,
+    email: str,
+    name: Optional[str],
+    avatar: Optional[str],
+) -> Optional[UserORM]:
+    """
+    Give `email` to the UID, in one transaction. Without a row of its own
+    the UID takes over the row holding the email (same user, new Firebase
+    account); with one, the email is cleared from the stale row and set on
+    the UID's. None when neither row is there any more (caller retries).
+    """
+    # both rows locked in one statement, in a fixed order (no deadlock between two relinks)
+    rows = (await db.execute(
+        select(UserORM)
+        .where(or_(func.lower(UserORM.email) == email, UserORM.sub == uid))
+        .order_by(UserORM.user_id)
+        .with_for_update()
+    )).scalars().all()
+    stale = next((r for r in rows if r.email and r.email.lower() == email), None)
+    current = next((r for r in rows if r.sub == uid), None)
+    if stale is None or stale is current:
         await db.rollback()
-        existing = await get_user_by_sub(db, uid)
-        if existing:
-            return existing
-        if email_norm:
-            existing = await get_user_by_email(db, email_norm)
-            if existing:
-                if existing.sub != uid:
-                    existing.sub = uid
-                    try:
-                        await db.commit()
-                        await db.refresh(existing)
-                    except IntegrityError:
-                        await db.rollback()
-                return existing
-        raise
+        return None
+
+    user_cache.pop(stale.sub)
+    if current is None:
+        stale.sub = uid
+        u = stale
+    else:
+        stale.email = None
+        await db.flush()
+        current.email = email
+        u = current
+    if name is not None:
+        u.name = name
+    if avatar is not None:
+        u.avatar = avatar
+    await db.commit()
+    await db.refresh(u)
+    return u
+
+async def user_id_for(db: AsyncSession, *, uid: str, email: Optional[str] = None):
+    """users.user_id of a UID (row created on first use); cached like /me."""
+    cached = user_cache.get(uid)
+    if cached is not None:
+        return cached["user_id"]
+    return (await upsert_user_from_identity(db, uid=uid, email=email)).user_id
 
 # ----------------------------
 #  Profile updates
@@ -119,30 +150,36 @@ async def update_username(
     *,
     uid: str,
     new_username: str,
+    email: Optional[str] = None,
 ) -> UserORM:
- 
+    """
+    One conditional statement: set the username on the UID's row (creating
+    the row on first use). A name held by someone else trips
+    ux_users_username_lower and comes back as USERNAME_TAKEN.
+    """
     uname = new_username.strip().lower()
- 
-    if await is_username_taken(db, uname):
-        raise ValueError("USERNAME_TAKEN")
-
-    u = await get_user_by_sub(db, uid)
-    if not u:
-        raise ValueError("USER_NOT_FOUND")
-
-    if u.username == uname:
-        return u
 
-    u.username = uname
+    ins = insert(UserORM).values(sub=uid, email=email.lower() if email else None, username=uname)
+    ins = ins.on_conflict_do_update(
+        index_elements=[UserORM.sub],
+        set_={"username": uname, "updated_at": func.now()},
+        where=UserORM.__table__.c.username.is_distinct_from(uname),
+    ).returning(UserORM)
     try:
+        u = (await db.execute(ins.execution_options(populate_existing=True))).scalar_one_or_none()
         await db.commit()
-        await db.refresh(u)
-        return u
-    except IntegrityError:
+    except IntegrityError as e:
         await db.rollback()
-    
+        if "ux_users_username_lower" in str(e.orig):
+            raise ValueError("USERNAME_TAKEN")
         raise
 
+    if u is None:  # already had this username
+        u = await get_user_by_sub(db, uid)
+    user_cache.pop(uid)
+    username_index.set(u.sub, u.username)
+    return u
+
 async def update_profile_fields(
     db: AsyncSession,
     *,
@@ -163,5 +200,6 @@ async def update_profile_fields(
 
     if changed:
         await db.commit()
+        user_cache.pop(uid)
         await db.refresh(u)
     return u
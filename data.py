@@ -1,8 +1,10 @@
-import asyncio
-from sqlalchemy.dialects.postgresql import insert
-from db.postgres import engine, AsyncSessionLocal, Base
-from models.course import CourseORM
-from models.media import MediaORM
+import argparse, asyncio
+from collections import Counter
+from db.postgres import AsyncSessionLocal
+from db.schema import create_schema
+import models.catalog, models.course, models.media, models.progress, models.transcript, models.user  # noqa: F401  (create_all)
+from crud.catalog import ingest
+from crud.transcripts import backfill_transcript_index
 
 VID = {
     "bbb": "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4",
@@ -59,20 +61,52 @@ MEDIAS = [
     {"media_id": "media_19", "media_title": "IoT (text)", "media_description": "IoT devices, risks, and security.", "course_id": "course_6", "media_url": VID["fbj"], "media_transcript": long_transcript("IoT")},
 ]
 
-async def main():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+# ---- Synthetic catalog (generated lazily, so memory stays flat at any size) ----
 
+def synthetic_courses(n_courses: int):
+    types = ("video", "podcast", "text")
+    for i in range(n_courses):
+        yield {"course_id": f"syn_course_{i}", "course_title": f"Synthetic {i}",
+               "course_description": "Generated by data.py", "course_type": types[i % 3]}
+
+def synthetic_medias(n_medias: int, n_courses: int, lines: int = 12):
+    urls = list(VID.values())
+    for i in range(n_medias):
+        yield {"media_id": f"syn_media_{i}", "media_title": f"Lesson {i}",
+               "media_description": "Generated by data.py", "course_id": f"syn_course_{i % n_courses}",
+               "media_url": urls[i % len(urls)], "media_transcript": long_transcript(f"Lesson {i}", n=lines)}
+
+
+async def seed(kind: str, rows) -> Counter:
+    """Write rows through the bulk ingestion path (batched multi-row upserts)."""
+    counts = Counter()
     async with AsyncSessionLocal() as session:
-        for c in COURSES:
-            stmt = insert(CourseORM).values(**c).on_conflict_do_nothing(index_elements=["course_id"])
-            await session.execute(stmt)
-        for m in MEDIAS:
-            stmt = insert(MediaORM).values(**m).on_conflict_do_nothing(index_elements=["media_id"])
-            await session.execute(stmt)
-        await session.commit()
+        async for res in ingest(session, kind, enumerate(rows, 1)):
+            counts[res["status"]] += 1
+            if res["status"] in ("invalid", "failed"):
+                print(f"  {kind} line {res['line']}: {res.get('error')}")
+    return counts
+
 
-    print("✅ Seed inserted: 6 courses & 19 medias.")
+async def main(synthetic_medias_n: int = 0, synthetic_courses_n: int = 100):
+    await create_schema()
+
+    courses = await seed("courses", COURSES)
+    medias = await seed("medias", MEDIAS)
+    print(f"✅ Seed: courses {dict(courses)}, medias {dict(medias)}")
+
+    if synthetic_medias_n:
+        courses = await seed("courses", synthetic_courses(synthetic_courses_n))
+        medias = await seed("medias", synthetic_medias(synthetic_medias_n, synthetic_courses_n))
+        print(f"✅ Synthetic: courses {dict(courses)}, medias {dict(medias)}")
+
+    # medias written before transcript_lines existed
+    async with AsyncSessionLocal() as session:
+        await backfill_transcript_index(session)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    p = argparse.ArgumentParser()
+    p.add_argument("--synthetic-medias", type=int, default=0, help="also import N generated medias")
+    p.add_argument("--synthetic-courses", type=int, default=100)
+    args = p.parse_args()
+    asyncio.run(main(args.synthetic_medias, args.synthetic_courses))
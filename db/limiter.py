@@ -0,0 +1,143 @@
+# db/limiter.py
+import asyncio, math, os, time
+from collections import deque
+from typing import Optional
+
+# ---- ENV ----
+DB_LIMIT_ENABLED     = os.getenv("DB_LIMIT_ENABLED", "true").lower() == "true"
+DB_QUEUE_MAX         = int(os.getenv("DB_QUEUE_MAX", "1000"))        # requests waiting for a slot (memory bound)
+DB_QUEUE_TIMEOUT_S   = float(os.getenv("DB_QUEUE_TIMEOUT_S", "1.5")) # longest wait for a slot, then 503
+DB_LIMIT_TOLERANCE   = float(os.getenv("DB_LIMIT_TOLERANCE", "2"))   # latency growth accepted before shrinking
+DB_LIMIT_BASELINE_S  = float(os.getenv("DB_LIMIT_BASELINE_S", "60")) # window of the no-load latency minimum
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after_s: int):
+        super().__init__("database busy")
+        self.retry_after_s = retry_after_s
+
+
+class AdaptiveLimiter:
+    """
+    Caps the requests using the database at once, in front of the pool.
+    A request that would wait longer than `queue_timeout_s` for a slot (by
+    the current hold time and cap) is refused right away; the others wait
+    here, at most `queue_max` of them, instead of inside the pool for
+    DB_POOL_TIMEOUT_S.
+
+    The cap moves between `min_limit` and `max_limit` (the pool's capacity)
+    with how long slots are held, gradient style: a short-term average is
+    compared with the lowest it reached over the last one or two
+    `baseline_s` windows (the no-load latency), and the cap shrinks when
+    latency grows more than `tolerance` times and grows while it is used
+    in full at steady latency. A minimum, unlike an average, does not
+    drift up to the latency of a burst while the burst lasts.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        initial: Optional[int] = None,
+        min_limit: int = 1,
+        queue_max: int = DB_QUEUE_MAX,
+        queue_timeout_s: float = DB_QUEUE_TIMEOUT_S,
+        tolerance: float = DB_LIMIT_TOLERANCE,
+        baseline_s: float = DB_LIMIT_BASELINE_S,
+        enabled: bool = DB_LIMIT_ENABLED,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial or max_limit)
+        self.queue_max = queue_max
+        self.queue_timeout_s = queue_timeout_s
+        self.tolerance = tolerance
+        self.baseline_s = baseline_s
+        self.enabled = enabled
+        self.inflight = 0
+        self.rejected = 0
+        self._short_s: Optional[float] = None  # EWMA over ~10 samples
+        self._min_s = math.inf                 # lowest _short_s in this window
+        self._prev_min_s = math.inf            # ... and in the one before
+        self._window_end = 0.0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    def _wait_s(self) -> float:
+        """Expected wait for a slot by a request queued now."""
+        return (self._short_s or 0.0) * (len(self._waiters) + 1) / self.limit
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._wait_s()))
+
+    def _reject(self) -> Overloaded:
+        self.rejected += 1
+        return Overloaded(self._retry_after())
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the bounded queue if needed; raises Overloaded."""
+        if not self.enabled:
+            self.inflight += 1
+            return
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            return
+        if len(self._waiters) >= self.queue_max or self._wait_s() > self.queue_timeout_s:
+            raise self._reject()
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait((fut,), timeout=self.queue_timeout_s)
+        except asyncio.CancelledError:
+            if fut.done():
+                self.release(None)  # handed a slot just as the client went away
+            else:
+                fut.cancel()
+                self._waiters.remove(fut)
+            raise
+        if not fut.done():
+            fut.cancel()
+            self._waiters.remove(fut)
+            raise self._reject()
+        # release() handed its slot over (inflight already counts us)
+
+    def release(self, held_s: Optional[float]) -> None:
+        self.inflight -= 1
+        if held_s is not None and self.enabled:
+            self._update(held_s)
+        while self._waiters and self.inflight < int(self.limit):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    def _baseline_s(self) -> float:
+        return min(self._min_s, self._prev_min_s)
+
+    def _update(self, sample: float) -> None:
+        if self._short_s is None:
+            self._short_s = sample
+        self._short_s += (sample - self._short_s) * 0.1
+        now = time.monotonic()
+        if now >= self._window_end:
+            self._prev_min_s, self._min_s = self._min_s, self._short_s
+            self._window_end = now + self.baseline_s
+        self._min_s = min(self._min_s, self._short_s)
+        # not using the current cap: no signal to grow on
+        if self.inflight + 1 < self.limit / 2:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self._baseline_s() / self._short_s))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        # a twentieth of the way per sample: bigger steps hunt between the floor and the pool size
+        self.limit = float(max(self.min_limit, min(self.max_limit, self.limit + (target - self.limit) * 0.05)))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "inflight": self.inflight,
+            "queued": len(self._waiters),
+            "rejected": self.rejected,
+        }
+
@@ -1,10 +1,15 @@
 # db/postgres.py
-import os
-from typing import AsyncGenerator
+import asyncio, functools, itertools, os, time, uuid
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Optional
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from metrics.registry import DB_POOL_WAIT, DB_POOL_TIMEOUTS
+from db.limiter import AdaptiveLimiter, Overloaded
 
 load_dotenv()
 
@@ -16,10 +21,47 @@ DB_MAX_OVERFLOW   = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))  
 DB_POOL_TIMEOUT_S = int(os.getenv("DB_POOL_TIMEOUT_S", "30"))
 
+# read replicas (optional, comma separated). GET/HEAD requests read from them.
+DATABASE_REPLICA_URLS    = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_MAX_LAG_S        = float(os.getenv("REPLICA_MAX_LAG_S", "5"))
+REPLICA_CHECK_INTERVAL_S = float(os.getenv("REPLICA_CHECK_INTERVAL_S", "2"))
+REPLICA_CHECK_TIMEOUT_S  = float(os.getenv("REPLICA_CHECK_TIMEOUT_S", "1"))
 
-CONNECT_ARGS = {}
-if os.getenv("DB_DISABLE_STMT_CACHE", "false").lower() == "true":
-    CONNECT_ARGS["statement_cache_size"] = 0  # asyncpg
+
+# server-side prepared statements:
+#   on     - named per connection, cached (direct connections, session pooling)
+#   off    - unnamed, re-parsed on every execution; safe behind any
+#            transaction-mode pooler (legacy DB_DISABLE_STMT_CACHE=true)
+#   pooler - cached under globally unique names, for PgBouncer >= 1.21 with
+#            max_prepared_statements set, which tracks them per client
+DB_PREPARED_STATEMENTS = os.getenv(
+    "DB_PREPARED_STATEMENTS",
+    "off" if os.getenv("DB_DISABLE_STMT_CACHE", "false").lower() == "true" else "on",
+).lower()
+DB_STMT_CACHE_SIZE = int(os.getenv("DB_STMT_CACHE_SIZE", "100"))  # per connection
+
+
+def _connect_args(mode: str) -> dict:
+    # SQLAlchemy's adapter prepares and caches statements itself; asyncpg's own
+    # cache is zeroed too whenever a pooler may sit in between
+    if mode == "off":
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: "",
+        }
+    if mode == "pooler":
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": DB_STMT_CACHE_SIZE,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4().hex}__",
+        }
+    if mode == "on":
+        return {"prepared_statement_cache_size": DB_STMT_CACHE_SIZE}
+    raise ValueError(f"DB_PREPARED_STATEMENTS must be on, off or pooler, not {mode!r}")
+
+
+CONNECT_ARGS = _connect_args(DB_PREPARED_STATEMENTS)
 
 # ---- Naming convention Alembic ----
 NAMING_CONVENTION = {
@@ -32,31 +74,216 @@ NAMING_CONVENTION = {
 metadata = sa.MetaData(naming_convention=NAMING_CONVENTION)
 Base = declarative_base(metadata=metadata)
 
+# ---- Pool (checkout wait is reported at /metrics) ----
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa.exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - t0)
+
 # ---- Engine & Session ----
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=DB_ECHO,
-    future=True,               
-    pool_pre_ping=True,       
-    pool_size=DB_POOL_SIZE,
-    max_overflow=DB_MAX_OVERFLOW,
-    pool_recycle=DB_POOL_RECYCLE_S,
-    pool_timeout=DB_POOL_TIMEOUT_S,
-    connect_args=CONNECT_ARGS,
-)
+def _make_engine(url: str, **kw):
+    return create_async_engine(
+        url,
+        echo=DB_ECHO,
+        future=True,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE_S,
+        pool_timeout=DB_POOL_TIMEOUT_S,
+        connect_args=CONNECT_ARGS,
+        **kw,
+    )
+
+
+engine = _make_engine(DATABASE_URL)
+
+
+class LimitedSession(AsyncSession):
+    """
+    AsyncSession that takes its limiter slot (see _session) on first use of
+    the database, so a request answered from a cache, or with a 304, never
+    waits for one. Sessions opened outside a request have no slot.
+    """
+    slot: Optional["_Slot"] = None
+
+
+def _takes_slot(name: str):
+    method = getattr(AsyncSession, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kw):
+        if self.slot is not None:
+            await self.slot.take()
+        return await method(self, *args, **kw)
+    return wrapper
+
+
+# everything that may check out a connection (commit and flush only with pending objects)
+for _name in ("execute", "scalar", "scalars", "stream", "stream_scalars", "get", "get_one", "merge",
+              "refresh", "delete", "flush", "commit", "connection", "run_sync"):
+    setattr(LimitedSession, _name, _takes_slot(_name))
+
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
-    class_=AsyncSession,
+    class_=LimitedSession,
     expire_on_commit=False,
 )
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
+# request sessions per engine, sized to its pool (see db/limiter.py)
+def _make_limiter() -> AdaptiveLimiter:
+    return AdaptiveLimiter(max_limit=DB_POOL_SIZE + DB_MAX_OVERFLOW, initial=DB_POOL_SIZE)
+
+db_limiter = _make_limiter()
+
+
+# ---- Read replicas ----
+
+# seconds since the last replayed transaction; 0 when the replica has replayed
+# everything it received (an idle primary is not lag) or is not a standby at all
+_LAG_SQL = sa.text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine = _make_engine(url, execution_options={"postgresql_readonly": True})
+        self.name = f"{self.engine.url.host}:{self.engine.url.port or 5432}/{self.engine.url.database}"
+        self.sessionmaker = async_sessionmaker(bind=self.engine, class_=LimitedSession, expire_on_commit=False)
+        self.limiter = _make_limiter()
+        self.healthy = True  # until the first check says otherwise
+        self.lag_s: Optional[float] = None
+
+    def in_use(self) -> int:
+        return self.engine.sync_engine.pool.checkedout()
+
+    async def check(self) -> None:
         try:
-            yield session
+            async with self.engine.connect() as conn:
+                lag = await asyncio.wait_for(conn.scalar(_LAG_SQL), REPLICA_CHECK_TIMEOUT_S)
         except Exception:
-           
-            await session.rollback()
-            raise
-       
+            self.healthy, self.lag_s = False, None
+            return
+        self.lag_s = float(lag or 0)
+        self.healthy = self.lag_s <= REPLICA_MAX_LAG_S
+
+
+class ReplicaSet:
+    """
+    Picks the least loaded healthy replica (round-robin between equals).
+    A background task re-checks reachability and replication lag every
+    REPLICA_CHECK_INTERVAL_S; with no healthy replica reads go to the primary.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.replicas = [Replica(u) for u in urls]
+        self._rr = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        start = next(self._rr)
+        order = (healthy[(start + i) % len(healthy)] for i in range(len(healthy)))
+        return min(order, key=Replica.in_use)
+
+    async def check(self) -> None:
+        await asyncio.gather(*(r.check() for r in self.replicas))
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL_S)
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for r in self.replicas:
+            await r.engine.dispose()
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+READ_METHODS = {"GET", "HEAD"}
+
+
+class _Slot:
+    """A request's limiter slot, taken by its session's first database use."""
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.t0: Optional[float] = None
+
+    async def take(self) -> None:
+        if self.t0 is not None:
+            return
+        try:
+            await self.limiter.acquire()
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail="Database busy", headers={"Retry-After": str(e.retry_after_s)})
+        self.t0 = time.perf_counter()
+
+    def release(self, ok: bool) -> None:
+        if self.t0 is not None:
+            self.limiter.release(time.perf_counter() - self.t0 if ok else None)
+            self.t0 = None
+
+
+@asynccontextmanager
+async def _session(maker, limiter: AdaptiveLimiter, replica: Optional[Replica] = None):
+    """
+    A session whose limiter slot is taken on first DB use and held until it
+    closes; 503 + Retry-After when the limiter refuses.
+    """
+    slot = _Slot(limiter)
+    ok = False
+    try:
+        async with maker() as session:
+            session.slot = slot
+            try:
+                yield session
+            except Exception as e:
+                await session.rollback()
+                # a dropped connection: stop routing here until the next check
+                if replica is not None and isinstance(e, sa.exc.DBAPIError) and e.connection_invalidated:
+                    replica.healthy = False
+                raise
+        ok = True
+    finally:
+        slot.release(ok)
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Read-only replica session for GET/HEAD when one is healthy, else the primary."""
+    replica = replicas.pick() if request.method in READ_METHODS else None
+    if replica is None:
+        session_cm = _session(AsyncSessionLocal, db_limiter)
+    else:
+        session_cm = _session(replica.sessionmaker, replica.limiter, replica)
+    async with session_cm as session:
+        yield session
+
+
+async def get_primary_db() -> AsyncGenerator[AsyncSession, None]:
+    """Primary session regardless of method (GET routes that write)."""
+    async with _session(AsyncSessionLocal, db_limiter) as session:
+        yield session
@@ -0,0 +1,56 @@
+# db/queries.py
+"""
+Statements of the hot paths, built once with bind parameters:
+
+    await db.execute(MEDIA_BY_ID, {"media_id": media_id})
+
+Building a select() and computing its cache key costs ~100µs of CPU per
+call; a prebuilt statement memoizes its key, so each execution goes
+straight to SQLAlchemy's compiled cache (and to the connection's prepared
+statement, see DB_PREPARED_STATEMENTS in db/postgres.py).
+"""
+from sqlalchemy import bindparam, exists, func, or_, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from models.course import CourseORM
+from models.media import MediaORM
+from models.user import UserORM
+
+# --- Catalog ---
+COURSES = select(*CourseORM.__table__.c)
+COURSES_BY_TYPE = COURSES.where(CourseORM.course_type == bindparam("course_type"))
+COURSE_BY_ID = COURSES.where(CourseORM.course_id == bindparam("course_id"))
+
+MEDIA_BY_ID = select(*MediaORM.__table__.c).where(MediaORM.media_id == bindparam("media_id"))
+MEDIA_TRANSCRIPT = select(MediaORM.media_id, MediaORM.media_transcript).where(
+    MediaORM.media_id == bindparam("media_id")
+)
+MEDIA_URL = select(MediaORM.media_url).where(MediaORM.media_id == bindparam("media_id"))
+
+# --- Users (by Firebase UID) ---
+USER_BY_SUB = select(UserORM).where(UserORM.sub == bindparam("sub"))
+
+
+def _user_upsert():
+    """
+    INSERT ... ON CONFLICT (sub) DO UPDATE ... RETURNING, in one round trip.
+    The update only fires when something changed (no dead row per login);
+    otherwise the UNION ALL branch returns the existing row.
+    Parameters: sub, email, name, avatar.
+    """
+    users = UserORM.__table__
+    ins = insert(UserORM).values(
+        sub=bindparam("sub"), email=bindparam("email"), name=bindparam("name"), avatar=bindparam("avatar")
+    )
+    new = {c: func.coalesce(ins.excluded[c], users.c[c]) for c in ("email", "name", "avatar")}
+    ins = ins.on_conflict_do_update(
+        index_elements=[UserORM.sub],
+        set_={**new, "updated_at": func.now()},
+        where=or_(*(users.c[c].is_distinct_from(v) for c, v in new.items())),
+    )
+    upserted = ins.returning(*users.c).cte("upserted")
+    return select(UserORM).from_statement(union_all(
+        select(*upserted.c),
+        select(*users.c).where(users.c.sub == bindparam("sub"), ~exists(select(upserted.c.user_id))),
+    )).execution_options(populate_existing=True)
+
+USER_UPSERT = _user_upsert()
@@ -0,0 +1,43 @@
+# db/schema.py
+import sqlalchemy as sa
+from sqlalchemy import Integer, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapped, mapped_column
+from db.postgres import engine, Base
+# every table: create_all only knows the models imported so far
+import models.catalog, models.course, models.media, models.progress, models.transcript, models.user  # noqa: F401
+
+# Bump whenever a model's table definition changes.
+SCHEMA_VERSION = 3  # 2: watch_progress, 3: catalog_meta + catalog_row_versions
+
+
+class SchemaVersionORM(Base):
+    __tablename__ = "schema_version"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+
+class SchemaMismatch(RuntimeError):
+    pass
+
+
+async def create_schema() -> None:
+    """create_all (missing tables only) and record SCHEMA_VERSION."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(sa.delete(SchemaVersionORM).where(SchemaVersionORM.version != SCHEMA_VERSION))
+        await conn.execute(insert(SchemaVersionORM).values(version=SCHEMA_VERSION).on_conflict_do_nothing())
+
+
+async def verify_schema() -> None:
+    """One query instead of create_all's per-table reflection."""
+    async with engine.connect() as conn:
+        try:
+            found = await conn.scalar(select(sa.func.max(SchemaVersionORM.version)))
+        except sa.exc.ProgrammingError:
+            found = None
+    if found != SCHEMA_VERSION:
+        raise SchemaMismatch(
+            f"database schema version is {found}, this build expects {SCHEMA_VERSION} "
+            f"(start once with DB_SCHEMA_MODE=create, or migrate)"
+        )
@@ -0,0 +1,43 @@
+# db/warmup.py
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.postgres import engine, replicas, DB_POOL_SIZE
+from db.queries import (
+    COURSES, COURSES_BY_TYPE, COURSE_BY_ID, MEDIA_BY_ID, MEDIA_TRANSCRIPT, MEDIA_URL, USER_UPSERT,
+)
+
+# the statements the hot routes execute, with the parameter names they pass,
+# so their compiled SQL and the connections' prepared statements are cached
+# before traffic arrives
+_READS = [
+    (COURSES, {}),
+    (COURSES_BY_TYPE, {"course_type": ""}),
+    (COURSE_BY_ID, {"course_id": ""}),
+    (MEDIA_BY_ID, {"media_id": ""}),
+    (MEDIA_TRANSCRIPT, {"media_id": ""}),
+    (MEDIA_URL, {"media_id": ""}),
+]
+# GET /me (crud.users.upsert_user_from_identity); rolled back
+_WRITES = [
+    (USER_UPSERT, {"sub": "", "email": None, "name": None, "avatar": None}),
+]
+
+
+async def _warm(eng, statements, connections: int) -> None:
+    async def one():
+        async with eng.connect() as conn:
+            # a session on the connection: ORM statements compile as they do in the routes
+            async with AsyncSession(bind=conn) as session:
+                for stmt, params in statements:
+                    await session.execute(stmt, params)
+                await session.rollback()
+
+    await asyncio.gather(*(one() for _ in range(connections)))
+
+
+async def warm_pool(connections: int = DB_POOL_SIZE) -> None:
+    """Open `connections` pooled connections per engine and run the hot statements on each."""
+    await asyncio.gather(
+        _warm(engine, _READS + _WRITES, connections),
+        *(_warm(r.engine, _READS, connections) for r in replicas.replicas),
+    )
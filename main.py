@@ -1,15 +1,30 @@
 # main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from dotenv import load_dotenv
-import os
+import asyncio, os
 
 from routers.course import router as course_router
 from routers.media import router as media_router
 from routers.auth_public import router as public_router
 from routers.me import router as me_router  
+from routers.search import router as search_router
+from routers.catalog import router as catalog_router
+from routers.bulk import router as bulk_router
 
-from db.postgres import engine, Base
+from sqlalchemy import text
+from db.postgres import engine, replicas
+from db.schema import create_schema, verify_schema
+from db.warmup import warm_pool
+from crud.progress import progress_buffer
+from cache.changes import change_feed
+from cache.snapshot import catalog_snapshot
+from cache.suggest import suggest_index
+from metrics.middleware import MetricsMiddleware
+from auth.ratelimit import RateLimitMiddleware
+import metrics.db  # noqa: F401  (engine hooks + pool/cache collectors)
 
 load_dotenv()
 
@@ -20,6 +35,10 @@ CLIENT_ORIGINS = [
     ).split(",") if o.strip()
 ]
 
+# create: create_all at boot (development). verify: only check the schema version.
+DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "create").lower()
+READY_DB_TIMEOUT_S = float(os.getenv("READY_DB_TIMEOUT_S", "2"))
+
 CLIENT_ORIGIN_REGEX = os.getenv(
     "CLIENT_ORIGIN_REGEX",
     r"^https?://(localhost|127\.0\.0\.1|10\.0\.2\.2|192\.168\.\d+\.\d+)(:\d+)?$"
@@ -32,28 +51,80 @@ app = FastAPI(
 )
 
 
+# inside CORS, so 429s carry the CORS headers too
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CLIENT_ORIGINS,
     allow_origin_regex=CLIENT_ORIGIN_REGEX,
     allow_credentials=False,  
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],  
+    allow_headers=["Authorization", "Content-Type", "If-None-Match"],  
+    expose_headers=["ETag", "Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset"],
 )
 
+# outermost, so CORS preflights are measured too
+app.add_middleware(MetricsMiddleware)
+
 # Routers
 app.include_router(public_router)  # /auth/check, /auth/health
 app.include_router(me_router)      # /me, /me/username
 app.include_router(course_router)
 app.include_router(media_router)
+app.include_router(search_router)    # /search
+app.include_router(catalog_router)   # /catalog/changes, /catalog/snapshot, /catalog/delta, /catalog/suggest
+app.include_router(bulk_router)      # /courses:bulk, /medias:bulk
+
+app.state.ready = False
 
 @app.on_event("startup")
 async def on_startup():
     print("CORS allow_origins:", CLIENT_ORIGINS)
     print("CORS allow_origin_regex:", CLIENT_ORIGIN_REGEX)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    if DB_SCHEMA_MODE == "verify":
+        await verify_schema()
+    else:
+        await create_schema()
+    try:
+        await warm_pool()
+    except Exception as e:
+        # not fatal: /ready keeps reporting the DB state
+        print("DB pool warm-up failed:", e)
+    replicas.start()
+    progress_buffer.start()
+    change_feed.start()
+    catalog_snapshot.watchers.append(suggest_index)
+    catalog_snapshot.start()
+    app.state.ready = True
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await catalog_snapshot.stop()
+    await change_feed.stop()
+    await progress_buffer.stop()  # drain pending watch progress
+    await replicas.stop()
 
+# liveness: the process is up
 @app.get("/health")
 async def health():
     return {"ok": True}
+
+async def _ping_db():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+# readiness: started up and the DB answers
+@app.get("/ready")
+async def ready():
+    if not app.state.ready:
+        return JSONResponse({"ok": False, "reason": "starting"}, status_code=503)
+    try:
+        await asyncio.wait_for(_ping_db(), READY_DB_TIMEOUT_S)
+    except Exception as e:
+        return JSONResponse({"ok": False, "reason": f"db: {type(e).__name__}"}, status_code=503)
+    return {"ok": True}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
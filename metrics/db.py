@@ -0,0 +1,194 @@
+# metrics/db.py
+import time
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from prometheus_client.registry import REGISTRY
+from sqlalchemy import event
+
+from auth.ratelimit import rate_buckets
+from cache.catalog import catalog_cache
+from cache.changes import change_feed
+from cache.snapshot import catalog_snapshot
+from cache.suggest import suggest_index
+from cache.transcripts import transcript_index
+from crud.progress import progress_buffer
+from db.postgres import db_limiter, engine, replicas
+from metrics.middleware import request_db_stats
+
+_sync_engine = engine.sync_engine
+
+
+# ---- Query hooks: count statements and DB time for the current request ----
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_t0"].pop()
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+
+def _handle_error(ctx):
+    t0 = ctx.connection.info.get("query_t0") if ctx.connection is not None else None
+    if t0:
+        t0.pop()
+
+
+for _e in (_sync_engine, *(r.engine.sync_engine for r in replicas.replicas)):
+    event.listen(_e, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_e, "after_cursor_execute", _after_cursor_execute)
+    event.listen(_e, "handle_error", _handle_error)
+
+
+# ---- Scrape-time collectors ----
+
+class PoolCollector:
+    def collect(self):
+        pool = _sync_engine.pool
+        for name, doc, value in (
+            ("db_pool_size", "Configured pool size (DB_POOL_SIZE)", pool.size()),
+            ("db_pool_checked_out", "Connections in use", pool.checkedout()),
+            ("db_pool_checked_in", "Idle connections in the pool", pool.checkedin()),
+            ("db_pool_overflow", "Connections above pool size (negative: not yet opened)", pool.overflow()),
+        ):
+            g = GaugeMetricFamily(name, doc)
+            g.add_metric([], value)
+            yield g
+
+
+class CatalogCacheCollector:
+    def collect(self):
+        stats = catalog_cache.stats()
+        for key in ("hits", "misses", "not_modified"):
+            c = CounterMetricFamily(f"catalog_cache_{key}", f"Catalog response cache {key.replace('_', ' ')}")
+            c.add_metric([], stats[key])
+            yield c
+        g = GaugeMetricFamily("catalog_cache_entries", "Catalog response cache entries")
+        g.add_metric([], stats["entries"])
+        yield g
+
+
+class LimiterCollector:
+    def collect(self):
+        limiters = [("primary", db_limiter)] + [(r.name, r.limiter) for r in replicas.replicas]
+        gauges = {
+            key: GaugeMetricFamily(f"db_limiter_{key}", doc, labels=["db"])
+            for key, doc in (
+                ("limit", "Adaptive cap on requests holding a DB session"),
+                ("inflight", "Requests holding a DB session"),
+                ("queued", "Requests waiting for a DB session slot"),
+            )
+        }
+        rejected = CounterMetricFamily("db_limiter_rejected", "Requests refused with 503 (queue full or wait too long)", labels=["db"])
+        for name, limiter in limiters:
+            stats = limiter.stats()
+            for key, g in gauges.items():
+                g.add_metric([name], stats[key])
+            rejected.add_metric([name], stats["rejected"])
+        yield from gauges.values()
+        yield rejected
+
+
+class ReplicaCollector:
+    def collect(self):
+        healthy = GaugeMetricFamily("db_replica_healthy", "1 when reads are routed to the replica", labels=["replica"])
+        lag = GaugeMetricFamily("db_replica_lag_seconds", "Replication lag at the last check", labels=["replica"])
+        in_use = GaugeMetricFamily("db_replica_checked_out", "Replica connections in use", labels=["replica"])
+        for r in replicas.replicas:
+            healthy.add_metric([r.name], int(r.healthy))
+            if r.lag_s is not None:
+                lag.add_metric([r.name], r.lag_s)
+            in_use.add_metric([r.name], r.in_use())
+        yield healthy
+        yield lag
+        yield in_use
+
+
+class TranscriptIndexCollector:
+    def collect(self):
+        stats = transcript_index.stats()
+        for key in ("hits", "misses"):
+            c = CounterMetricFamily(f"transcript_index_{key}", f"Transcript index cache {key}")
+            c.add_metric([], stats[key])
+            yield c
+        for key, doc in (("entries", "Transcript indexes held"), ("bytes", "Approximate size of the held indexes")):
+            g = GaugeMetricFamily(f"transcript_index_{key}", doc)
+            g.add_metric([], stats[key])
+            yield g
+
+
+class ProgressBufferCollector:
+    def collect(self):
+        stats = progress_buffer.stats()
+        g = GaugeMetricFamily("progress_pending", "Watch progress updates waiting for the next flush")
+        g.add_metric([], stats["pending"])
+        yield g
+        for key, doc in (("flushed", "Watch progress rows written"), ("rejected", "Watch progress updates refused (buffer full)")):
+            c = CounterMetricFamily(f"progress_{key}", doc)
+            c.add_metric([], stats[key])
+            yield c
+
+
+class ChangeFeedCollector:
+    def collect(self):
+        stats = change_feed.stats()
+        for key, doc in (("connected", "1 while the LISTEN connection is up"), ("subscribers", "Open /catalog/changes streams"),
+                         ("held", "Events held for Last-Event-ID resumes")):
+            g = GaugeMetricFamily(f"catalog_changes_{key}", doc)
+            g.add_metric([], float(stats[key]))
+            yield g
+        for key, doc in (("received", "Change notifications received"), ("resets", "Times the held events were dropped")):
+            c = CounterMetricFamily(f"catalog_changes_{key}", doc)
+            c.add_metric([], stats[key])
+            yield c
+
+
+class CatalogSnapshotCollector:
+    def collect(self):
+        stats = catalog_snapshot.stats()
+        for key, doc in (("version", "Catalog version of the bundle and deltas served"), ("bundle_bytes", "Size of the gzipped bundle"),
+                         ("last_rebuild_s", "Duration of the last refresh")):
+            g = GaugeMetricFamily(f"catalog_snapshot_{key}", doc)
+            g.add_metric([], float(stats[key] or 0))
+            yield g
+        c = CounterMetricFamily("catalog_snapshot_rebuilds", "Bundles written")
+        c.add_metric([], stats["rebuilds"])
+        yield c
+
+
+class SuggestIndexCollector:
+    def collect(self):
+        stats = suggest_index.stats()
+        for key, doc in (("entries", "Texts in the typeahead index"), ("words", "Distinct words in the typeahead index"),
+                         ("churn", "Share of typeahead entries dead or out of rank order")):
+            g = GaugeMetricFamily(f"catalog_suggest_{key}", doc)
+            g.add_metric([], float(stats[key]))
+            yield g
+        c = CounterMetricFamily("catalog_suggest_rebuilds", "Full builds of the typeahead index")
+        c.add_metric([], stats["rebuilds"])
+        yield c
+
+
+class RateLimitCollector:
+    def collect(self):
+        g = GaugeMetricFamily("rate_limit_buckets", "Rate limit buckets held (not yet refilled)")
+        g.add_metric([], len(rate_buckets))
+        yield g
+        c = CounterMetricFamily("rate_limit_buckets_evicted", "Buckets dropped before refilling, table full")
+        c.add_metric([], rate_buckets.evicted)
+        yield c
+
+
+REGISTRY.register(PoolCollector())
+REGISTRY.register(ReplicaCollector())
+REGISTRY.register(LimiterCollector())
+REGISTRY.register(CatalogCacheCollector())
+REGISTRY.register(TranscriptIndexCollector())
+REGISTRY.register(ProgressBufferCollector())
+REGISTRY.register(ChangeFeedCollector())
+REGISTRY.register(CatalogSnapshotCollector())
+REGISTRY.register(SuggestIndexCollector())
+REGISTRY.register(RateLimitCollector())
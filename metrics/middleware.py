@@ -0,0 +1,78 @@
+# metrics/middleware.py
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from metrics.registry import (
+    HTTP_REQUESTS, HTTP_LATENCY,
+    DB_QUERIES, DB_TIME, DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST,
+)
+
+
+class RequestDBStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# set by the middleware, filled in by the engine hooks in metrics.db
+request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task/queue overhead).
+    Labels use the matched route template, so cardinality stays bounded,
+    and the labelled children are looked up once per (method, route, status).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children: dict[tuple, tuple] = {}
+
+    def _metrics_for(self, method: str, route: str, status: int) -> tuple:
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                HTTP_REQUESTS.labels(method, route, str(status)),
+                HTTP_LATENCY.labels(method, route),
+                DB_QUERIES.labels(route),
+                DB_TIME.labels(route),
+                DB_QUERIES_PER_REQUEST.labels(route),
+                DB_TIME_PER_REQUEST.labels(route),
+            )
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        db = RequestDBStats()
+        token = request_db_stats.set(db)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            request_db_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            requests, latency, queries, db_time, queries_hist, db_time_hist = \
+                self._metrics_for(scope["method"], route, status)
+            requests.inc()
+            latency.observe(elapsed)
+            if db.queries:
+                queries.inc(db.queries)
+                db_time.inc(db.seconds)
+            queries_hist.observe(db.queries)
+            db_time_hist.observe(db.seconds)
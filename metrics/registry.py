@@ -0,0 +1,36 @@
+# metrics/registry.py
+from prometheus_client import Counter, Histogram, disable_created_metrics
+
+# *_created series only add scrape weight here
+disable_created_metrics()
+
+# ---- HTTP ----
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_RATE_LIMITED = Counter(
+    "http_rate_limited_total", "Requests refused with 429 by auth.ratelimit", ["policy"],
+)
+
+# ---- DB (per request) ----
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["route"])
+DB_TIME = Counter("db_query_seconds_total", "Time spent in SQL statements", ["route"])
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements per HTTP request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Time in SQL statements per HTTP request", ["route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+
+# ---- DB pool ----
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that hit DB_POOL_TIMEOUT_S")
@@ -0,0 +1,44 @@
+# models/catalog.py
+from typing import List, Optional
+from pydantic import BaseModel
+from sqlalchemy.orm import Mapped, mapped_column
+import sqlalchemy as sa
+from sqlalchemy import BigInteger, Integer, Text
+from db.postgres import Base
+
+# --- ORM ---
+class CatalogMetaORM(Base):
+    """
+    Single row (id 1): the catalog version, bumped by every catalog write
+    (crud.changes). Its row lock orders the writers, so versions follow
+    commit order.
+    """
+    __tablename__ = "catalog_meta"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class CatalogRowVersionORM(Base):
+    """Version of the last write to each course/media row (none: version 0)."""
+    __tablename__ = "catalog_row_versions"
+
+    kind: Mapped[str] = mapped_column(Text, primary_key=True)  # course | media
+    key: Mapped[str] = mapped_column(Text, primary_key=True)   # course_id / media_id
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        sa.Index("ix_catalog_row_versions_version", "version"),
+    )
+
+# --- Pydantic ---
+class Suggestion(BaseModel):
+    kind: str                       # course | media
+    course_id: Optional[str] = None
+    media_id: Optional[str] = None  # media suggestions only
+    field: str                      # course_title | course_description | media_title
+    text: str
+    score: float
+
+class SuggestList(BaseModel):
+    items: List[Suggestion]
@@ -1,7 +1,9 @@
+from typing import List, Optional
 from pydantic import BaseModel
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import Text
 from db.postgres import Base
+from models.media import MediaItem
 
 
 class CourseORM(Base):
@@ -18,3 +20,8 @@ class Course(BaseModel):
     course_title: str
     course_description: str | None = None
     course_type: str
+
+
+# GET /courses/{course_id}; medias only with ?include=medias
+class CourseDetail(Course):
+    medias: Optional[List[MediaItem]] = None
@@ -1,6 +1,7 @@
 from typing import List, Union, Optional
 from pydantic import BaseModel
 from sqlalchemy.orm import Mapped, mapped_column
+import sqlalchemy as sa
 from sqlalchemy import Text, ForeignKey
 from sqlalchemy.dialects.postgresql import JSONB
 from db.postgres import Base
@@ -17,6 +18,11 @@ class MediaORM(Base):
     media_url: Mapped[str] = mapped_column(Text, nullable=False)
     media_transcript: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
 
+    # keyset pagination of /courses/{course_id}/medias walks (course_id, media_id)
+    __table_args__ = (
+        sa.Index("ix_medias_course_id_media_id", "course_id", "media_id"),
+    )
+
 # --- Pydantic ---
 class TranscriptLine(BaseModel):
     time: int
@@ -30,3 +36,26 @@ class Media(BaseModel):
     media_url: str
     media_transcript: Optional[Union[str, List[TranscriptLine]]] = None
     model_config = ConfigDict(from_attributes=True)
+
+# list rows carry only the requested `fields` (media_id always)
+class MediaItem(BaseModel):
+    media_id: str
+    media_title: Optional[str] = None
+    media_description: Optional[str] = None
+    course_id: Optional[str] = None
+    media_url: Optional[str] = None
+    media_transcript: Optional[Union[str, List[TranscriptLine]]] = None
+
+class MediaPage(BaseModel):
+    items: List[MediaItem]
+    next_cursor: Optional[str] = None
+
+class MediaTranscript(BaseModel):
+    media_id: str
+    media_transcript: Optional[Union[str, List[TranscriptLine]]] = None
+
+# lines of a transcript around a playback time (?at= / ?from=&to=)
+class TranscriptWindow(BaseModel):
+    media_id: str
+    lines: List[TranscriptLine]
+    next_time: Optional[int] = None  # start of the first line after the window
@@ -0,0 +1,39 @@
+# models/progress.py
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Text, Float, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from db.postgres import Base
+
+# --- ORM ---
+class WatchProgressORM(Base):
+    """Last playback position per user and media (written by crud.progress)."""
+    __tablename__ = "watch_progress"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True
+    )
+    media_id: Mapped[str] = mapped_column(
+        Text, ForeignKey("medias.media_id", ondelete="CASCADE"), primary_key=True
+    )
+    position_s: Mapped[float] = mapped_column(Float, nullable=False)
+    duration_s: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # when the heartbeat was received; older flushes never overwrite newer ones
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+# --- Pydantic ---
+class ProgressIn(BaseModel):
+    position_s: float = Field(ge=0)
+    duration_s: Optional[float] = Field(None, gt=0)
+
+class ProgressItem(BaseModel):
+    media_id: str
+    position_s: float
+    duration_s: Optional[float] = None
+    updated_at: datetime
+
+class ProgressList(BaseModel):
+    items: List[ProgressItem]
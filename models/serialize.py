@@ -0,0 +1,7 @@
+# models/serialize.py
+import orjson
+
+
+def dumps(content) -> bytes:
+    """JSON bytes for row dicts and lists (orjson; non-str dict keys allowed)."""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
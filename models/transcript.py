@@ -0,0 +1,46 @@
+# models/transcript.py
+import os, re
+from typing import List, Optional
+import sqlalchemy as sa
+from pydantic import BaseModel
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Text, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from db.postgres import Base
+
+# text search configuration of the index and of the queries (baked into the DDL)
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "english")
+if not re.fullmatch(r"\w+", SEARCH_TS_CONFIG):
+    raise ValueError(f"Invalid SEARCH_TS_CONFIG: {SEARCH_TS_CONFIG!r}")
+
+# --- ORM ---
+class TranscriptLineORM(Base):
+    """One row per TranscriptLine of MediaORM.media_transcript, for full-text search."""
+    __tablename__ = "transcript_lines"
+
+    media_id: Mapped[str] = mapped_column(
+        Text, ForeignKey("medias.media_id", ondelete="CASCADE"), primary_key=True
+    )
+    line_no: Mapped[int] = mapped_column(Integer, primary_key=True)
+    course_id: Mapped[str] = mapped_column(Text, nullable=False)
+    time: Mapped[int] = mapped_column(Integer, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    text_tsv = mapped_column(
+        TSVECTOR, sa.Computed(f"to_tsvector('{SEARCH_TS_CONFIG}'::regconfig, text)", persisted=True)
+    )
+
+    __table_args__ = (
+        sa.Index("ix_transcript_lines_text_tsv", "text_tsv", postgresql_using="gin"),
+    )
+
+# --- Pydantic ---
+class SearchHit(BaseModel):
+    media_id: str
+    course_id: str
+    time: int
+    snippet: str
+    rank: float
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    next_cursor: Optional[str] = None
@@ -1,10 +1,27 @@
 # routers/auth_public.py
+import asyncio, os
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, Query, Response, HTTPException
 from pydantic import BaseModel, EmailStr
-from firebase_admin import auth as fb_auth
+
+from auth.firebase import firebase_auth
+
+from cache.ttl import TTLCache, SingleFlight
 
 router = APIRouter(prefix="/auth", tags=["auth-public"])
 
+# ---- ENV ----
+AUTH_CHECK_TTL_S     = float(os.getenv("AUTH_CHECK_TTL_S", "60"))
+AUTH_CHECK_NEG_TTL_S = float(os.getenv("AUTH_CHECK_NEG_TTL_S", "10"))
+AUTH_CHECK_CACHE_MAX = int(os.getenv("AUTH_CHECK_CACHE_MAX", "10000"))
+AUTH_CHECK_WORKERS   = int(os.getenv("AUTH_CHECK_WORKERS", "8"))
+
+# get_user_by_email is a blocking HTTP call to Firebase
+_executor = ThreadPoolExecutor(max_workers=AUTH_CHECK_WORKERS, thread_name_prefix="auth-check")
+_found = TTLCache(AUTH_CHECK_CACHE_MAX, AUTH_CHECK_TTL_S)
+_missing = TTLCache(AUTH_CHECK_CACHE_MAX, AUTH_CHECK_NEG_TTL_S)
+_inflight = SingleFlight()
+
 
 class CheckOut(BaseModel):
 
@@ -13,27 +30,12 @@ class CheckOut(BaseModel):
     provider: str | None = None 
 
 
-@router.get("/health")
-async def health():
-
-    return {"ok": True}
-
-
-@router.get("/check", response_model=CheckOut)
-async def check(response: Response, email: EmailStr = Query(..., description="Email address to check"
-)):
- 
-    response.headers["Cache-Control"] = "no-store"
-
-    email_norm = str(email).lower()
-
+def _lookup(email_norm: str) -> dict:
+    fb_auth = firebase_auth()
     try:
         u = fb_auth.get_user_by_email(email_norm)
     except fb_auth.UserNotFoundError:
         return {"exists": False}
-    except Exception as e:
-        
-        raise HTTPException(status_code=502, detail=f"FIREBASE_LOOKUP_FAILED: {e}")
 
     provider_ids = {p.provider_id for p in (u.provider_data or [])}
     has_pw = "password" in provider_ids
@@ -50,3 +52,38 @@ async def check(response: Response, email: EmailStr = Query(..., description="Em
         summary = next(iter(provider_ids), None)
 
     return {"exists": True, "has_password": has_pw, "provider": summary}
+
+
+async def _lookup_cached(email_norm: str) -> dict:
+    out = _found.get(email_norm) or _missing.get(email_norm)
+    if out is not None:
+        return out
+
+    async def fetch():
+        loop = asyncio.get_running_loop()
+        res = await loop.run_in_executor(_executor, _lookup, email_norm)
+        (_found if res["exists"] else _missing).set(email_norm, res)
+        return res
+
+    return await _inflight.do(email_norm, fetch)
+
+
+@router.get("/health")
+async def health():
+
+    return {"ok": True}
+
+
+@router.get("/check", response_model=CheckOut)
+async def check(response: Response, email: EmailStr = Query(..., description="Email address to check"
+)):
+ 
+    response.headers["Cache-Control"] = "no-store"
+
+    email_norm = str(email).lower()
+
+    try:
+        return await _lookup_cached(email_norm)
+    except Exception as e:
+        
+        raise HTTPException(status_code=502, detail=f"FIREBASE_LOOKUP_FAILED: {e}")
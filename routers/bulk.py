@@ -0,0 +1,80 @@
+# routers/bulk.py
+import os, tempfile
+from typing import AsyncIterator, Literal
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.postgres import get_db
+from crud.catalog import ingest, Item
+from models.serialize import dumps
+
+router = APIRouter(tags=["bulk"])
+
+# ---- ENV ----
+BULK_MAX_LINE_BYTES    = int(os.getenv("BULK_MAX_LINE_BYTES", str(16 * 1024 * 1024)))
+BULK_RESULTS_SPOOL_MAX = int(os.getenv("BULK_RESULTS_SPOOL_MAX", str(1024 * 1024)))  # then on disk
+
+
+async def ndjson_items(request: Request) -> AsyncIterator[Item]:
+    """(line_no, raw line) for each non-blank NDJSON line, read as the body streams in."""
+    buf = bytearray()
+    line_no = 0
+    too_long = False
+    async for chunk in request.stream():
+        start = 0
+        while (nl := chunk.find(b"\n", start)) >= 0:
+            line_no += 1
+            if too_long or len(buf) + nl - start > BULK_MAX_LINE_BYTES:
+                too_long = False
+                yield line_no, ValueError(f"line longer than {BULK_MAX_LINE_BYTES} bytes")
+            else:
+                buf += chunk[start:nl]
+                if buf.strip():
+                    yield line_no, bytes(buf)
+            buf.clear()
+            start = nl + 1
+        if not too_long:
+            buf += chunk[start:]
+            if len(buf) > BULK_MAX_LINE_BYTES:
+                too_long = True
+                buf.clear()
+    if too_long:
+        yield line_no + 1, ValueError(f"line longer than {BULK_MAX_LINE_BYTES} bytes")
+    elif buf.strip():
+        yield line_no + 1, bytes(buf)
+
+
+async def _bulk_response(request: Request, db: AsyncSession, kind: str, on_conflict: str) -> StreamingResponse:
+    # The body is ingested batch by batch while it streams in. Results are
+    # spooled (memory, then disk) and sent once the body has been read: a
+    # streaming response would race the request body for `receive`.
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_RESULTS_SPOOL_MAX)
+    async for res in ingest(db, kind, ndjson_items(request), update=on_conflict == "update"):
+        spool.write(dumps(res) + b"\n")
+    spool.seek(0)
+
+    def results():
+        with spool:
+            yield from iter(lambda: spool.read(64 * 1024), b"")
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("/courses:bulk")
+async def bulk_courses(
+    request: Request,
+    on_conflict: Literal["skip", "update"] = Query("skip"),
+    db: AsyncSession = Depends(get_db),
+):
+    """NDJSON body, one Course per line; NDJSON response, one result per line."""
+    return await _bulk_response(request, db, "courses", on_conflict)
+
+
+@router.post("/medias:bulk")
+async def bulk_medias(
+    request: Request,
+    on_conflict: Literal["skip", "update"] = Query("skip"),
+    db: AsyncSession = Depends(get_db),
+):
+    """NDJSON body, one Media per line; NDJSON response, one result per line."""
+    return await _bulk_response(request, db, "medias", on_conflict)
@@ -0,0 +1,130 @@
+# routers/catalog.py
+import os
+from typing import Literal, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from cache.catalog import catalog_cache
+from cache.changes import RESET_FRAME, change_feed
+from cache.snapshot import catalog_snapshot
+from cache.suggest import suggest_index
+from models.catalog import SuggestList
+from routers.responses import FastJSONResponse, MediaFileResponse
+
+router = APIRouter(prefix="/catalog", tags=["catalog"])
+
+# ---- ENV ----
+CATALOG_SSE_MAX_SUBSCRIBERS = int(os.getenv("CATALOG_SSE_MAX_SUBSCRIBERS", "10000"))  # per worker
+CATALOG_SSE_PING_S          = float(os.getenv("CATALOG_SSE_PING_S", "15"))  # keeps proxies from timing out
+CATALOG_SSE_RETRY_MS        = int(os.getenv("CATALOG_SSE_RETRY_MS", "3000"))
+CATALOG_DELTA_WAIT_S        = float(os.getenv("CATALOG_DELTA_WAIT_S", "2"))  # for a client ahead of this worker
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return catalog_cache.stats()
+
+
+# --- Change feed (Server-Sent Events) ---
+# `change` events carry {"id", "version", "kind": course|media,
+# "op": created|updated, "course_id", "media_id"}; a `reset` event means
+# changes may have been missed and the client should refetch what it shows
+# (or sync with /catalog/delta).
+@router.get("/changes", response_class=StreamingResponse)
+async def catalog_changes(last_event_id: Optional[str] = Header(None)):
+    if change_feed.subscribers >= CATALOG_SSE_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many subscribers", headers={"Retry-After": "5"})
+    seq, missed = change_feed.resume(last_event_id)
+
+    async def events():
+        nonlocal seq, missed
+        change_feed.subscribers += 1
+        try:
+            yield f"retry: {CATALOG_SSE_RETRY_MS}\n\n".encode()
+            while True:
+                if missed:
+                    yield RESET_FRAME
+                frames, seq, missed = change_feed.read(seq)
+                if frames:
+                    yield b"".join(frames)
+                elif not missed and not await change_feed.wait(seq, CATALOG_SSE_PING_S):
+                    yield b": ping\n\n"
+        finally:
+            change_feed.subscribers -= 1
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Offline sync: full bundle + deltas (cache/snapshot.py) ---
+# The bundle is gzipped JSON {"version", "courses": [...], "medias": [...]}
+# with every column; X-Catalog-Version is the `since` of the next delta.
+
+def _not_ready() -> HTTPException:
+    return HTTPException(status_code=503, detail="Catalog snapshot not built yet", headers={"Retry-After": "5"})
+
+@router.get("/snapshot", response_class=MediaFileResponse)
+@router.head("/snapshot", response_class=MediaFileResponse)
+async def get_catalog_snapshot():
+    bundle = catalog_snapshot.bundle
+    if bundle is None:
+        raise _not_ready()
+    try:
+        st = os.stat(bundle.path)
+    except FileNotFoundError:
+        raise _not_ready()
+    return MediaFileResponse(
+        bundle.path, st, media_type="application/gzip",
+        headers={
+            "X-Catalog-Version": str(bundle.version),
+            "Content-Disposition": f'attachment; filename="catalog-{bundle.version}.json.gz"',
+            "Cache-Control": "no-cache",
+        },
+    )
+
+# {"version", "since", "courses": [...], "medias": [...], "deleted": {"courses": [ids], "medias": [ids]}}
+@router.get("/delta")
+async def get_catalog_delta(since: int = Query(..., ge=0, description="version of the client's copy")):
+    if catalog_snapshot.version is None:
+        raise _not_ready()
+    if since > catalog_snapshot.version:
+        # no write announced it: not a version of this catalog (refetch the snapshot)
+        if change_feed.connected and since > change_feed.version:
+            raise HTTPException(status_code=400, detail="Unknown catalog version")
+        # another worker is ahead of this one: this one refreshes on the same
+        # notification, so wait for it (no query per request)
+        if not await catalog_snapshot.wait_version(since, CATALOG_DELTA_WAIT_S):
+            raise HTTPException(status_code=503, detail="Catalog version not reached yet", headers={"Retry-After": "1"})
+    return Response(
+        catalog_snapshot.delta(since),
+        media_type="application/json",
+        headers={"X-Catalog-Version": str(catalog_snapshot.version)},
+    )
+
+
+@router.get("/snapshot/stats")
+async def snapshot_stats():
+    return catalog_snapshot.stats()
+
+
+# --- Typeahead (cache/suggest.py) ---
+# Built from the snapshot rows, so it follows catalog writes within
+# CATALOG_SNAPSHOT_DEBOUNCE_S of their notification.
+
+@router.get("/suggest", response_model=SuggestList)
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100, description="What has been typed so far"),
+    kind: Optional[Literal["course", "media"]] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+):
+    items = suggest_index.search(q, limit, kind)
+    if items is None:
+        raise HTTPException(status_code=503, detail="Suggestions not built yet", headers={"Retry-After": "5"})
+    return FastJSONResponse({"items": items})
+
+
+@router.get("/suggest/stats")
+async def suggest_stats():
+    return suggest_index.stats()
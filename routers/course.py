@@ -1,12 +1,16 @@
 # routes/course_routes.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from db.postgres import get_db
-from models.course import Course, CourseORM
-from models.media import Media, MediaORM
+from db.queries import COURSES, COURSES_BY_TYPE, COURSE_BY_ID
+from cache.catalog import catalog_cache, catalog_response
+from crud.changes import course_change, record_changes
+from models.course import Course, CourseDetail, CourseORM
+from models.media import MediaORM
+from routers.media import parse_fields
 
 router = APIRouter()
 
@@ -14,15 +18,18 @@ router = APIRouter()
 
 @router.get("/courses", response_model=List[Course])
 async def get_courses(
+    request: Request,
     course_type: Optional[str] = Query(None, alias="type"),  # /courses?type=video
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = select(CourseORM)
-    if course_type:
-        stmt = stmt.where(CourseORM.course_type == course_type)
-    result = await db.execute(stmt)
-    rows = result.scalars().all()
-    return [Course.model_validate(r.__dict__) for r in rows]
+    async def build():
+        if course_type:
+            result = await db.execute(COURSES_BY_TYPE, {"course_type": course_type})
+        else:
+            result = await db.execute(COURSES)
+        return [dict(r) for r in result.mappings().all()]
+
+    return await catalog_response(request, build)
 
 @router.post("/courses", response_model=Course)
 async def create_course(course: Course, db: AsyncSession = Depends(get_db)):
@@ -31,16 +38,53 @@ async def create_course(course: Course, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=409, detail="course_id already exists")
     row = CourseORM(**course.model_dump())
     db.add(row)
+    await record_changes(db, [course_change("created", row.course_id)])
     await db.commit()
+    catalog_cache.invalidate()
     await db.refresh(row)
     return Course.model_validate(row.__dict__)
 
-# --- Medias by Course ---
+# --- One course, optionally with its medias (single joined query) ---
+
+INCLUDES = {"medias"}
+
+@router.get("/courses/{course_id}", response_model=CourseDetail)
+async def get_course(
+    course_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    include: Optional[str] = Query(None, description="medias: add the course's medias"),
+    fields: Optional[str] = Query(None, description="Media fields with include=medias (transcript only if listed)"),
+):
+    wanted = {i.strip() for i in include.split(",") if i.strip()} if include else set()
+    if wanted - INCLUDES:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(wanted - INCLUDES))}")
+
+    async def build():
+        if "medias" not in wanted:
+            result = await db.execute(COURSE_BY_ID, {"course_id": course_id})
+            row = result.mappings().one_or_none()
+            if not row:
+                raise HTTPException(status_code=404, detail=f"Course with id '{course_id}' not found")
+            return dict(row)
+
+        course_cols = list(CourseORM.__table__.c)
+        media_fields = parse_fields(fields)
+        media_cols = [MediaORM.__table__.c[f].label(f"m__{f}") for f in media_fields]
+        result = await db.execute(
+            select(*course_cols, *media_cols)
+            .select_from(CourseORM.__table__.outerjoin(MediaORM, MediaORM.course_id == CourseORM.course_id))
+            .where(CourseORM.course_id == course_id)
+            .order_by(MediaORM.media_id)
+        )
+        rows = result.mappings().all()
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"Course with id '{course_id}' not found")
+        out = {c.name: rows[0][c.name] for c in course_cols}
+        # a course without medias comes back as one row of NULL media columns
+        out["medias"] = [
+            {f: r[f"m__{f}"] for f in media_fields} for r in rows if r["m__media_id"] is not None
+        ]
+        return out
 
-@router.get("/courses/{course_id}/medias", response_model=List[Media])
-async def get_medias_by_course(course_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(MediaORM).where(MediaORM.course_id == course_id))
-    medias = result.scalars().all()
-    if not medias:
-        raise HTTPException(status_code=404, detail=f"No medias found for course_id '{course_id}'")
-    return [Media.model_validate(m.__dict__) for m in medias]
+    return await catalog_response(request, build)
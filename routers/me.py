@@ -1,13 +1,15 @@
 # routers/me.py
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel, constr
-from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.deps import get_identity, Identity
-from db.postgres import get_db
-from models.user import UserORM
+from db.postgres import get_db, get_primary_db
+from crud.users import upsert_user_from_identity, update_username, user_cache, cache_user, user_id_for
+from crud.usernames import username_index
+from crud.progress import BufferFull, PROGRESS_FLUSH_INTERVAL_S, list_progress, progress_buffer
+from models.progress import ProgressIn, ProgressList
 
 router = APIRouter(tags=["me"])
 
@@ -18,6 +20,12 @@ class MeOut(BaseModel):
     username: str | None
 
 
+class UsernameAvailableOut(BaseModel):
+    username: str
+    available: bool
+    suggestions: list[str] = []
+
+
 class UsernameIn(BaseModel):
    
     username: constr(
@@ -33,17 +41,30 @@ class UsernameIn(BaseModel):
 @router.get("/me", response_model=MeOut)
 async def me(
     idn: Identity = Depends(get_identity),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_primary_db),  # upserts, so never a replica
 ):
    
-    user = await db.scalar(select(UserORM).where(UserORM.sub == idn.uid))
-    if not user:
-        user = UserORM(sub=idn.uid, email=idn.email)
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
+    email = idn.email.lower() if idn.email else None
+    cached = user_cache.get(idn.uid)
+    # a new email in the token has to reach the DB
+    if cached is not None and (email is None or cached["email"] == email):
+        return cached
+
+    user = await upsert_user_from_identity(db, uid=idn.uid, email=email)
+    return cache_user(user)
+
 
-    return MeOut.model_validate(user, from_attributes=True)
+@router.get("/me/username/available", response_model=UsernameAvailableOut)
+async def username_available(
+    u: str = Query(..., min_length=3, max_length=20, pattern=r"^[A-Za-z0-9_]+$"),
+    idn: Identity = Depends(get_identity),
+):
+    # answered from memory; PATCH /me/username is the authoritative check
+    uname = u.lower()
+    await username_index.ready()
+    if username_index.is_available(uname, idn.uid):
+        return {"username": uname, "available": True}
+    return {"username": uname, "available": False, "suggestions": username_index.suggest(uname)}
 
 
 @router.patch("/me/username", status_code=status.HTTP_204_NO_CONTENT)
@@ -53,24 +74,40 @@ async def change_username(
     db: AsyncSession = Depends(get_db),
 ):
  
-    uname = payload.username.lower()
-
-  
-    taken = await db.scalar(
-        select(UserORM.user_id).where(func.lower(UserORM.username) == uname)
-    )
-    if taken:
+    try:
+        await update_username(db, uid=idn.uid, new_username=payload.username, email=idn.email)
+    except ValueError:
         raise HTTPException(status_code=409, detail="Username already taken")
 
-    user = await db.scalar(select(UserORM).where(UserORM.sub == idn.uid))
-    if not user:
-        
-        user = UserORM(sub=idn.uid, email=idn.email)
-        db.add(user)
-        await db.flush()  
-
-    user.username = uname
-    await db.commit()
-
     # 204 No Content
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ---------- Watch progress (write-behind, see crud/progress.py) ----------
+
+@router.put("/me/progress/{media_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def put_progress(
+    media_id: str,
+    payload: ProgressIn,
+    idn: Identity = Depends(get_identity),
+    db: AsyncSession = Depends(get_db),
+):
+    user_id = await user_id_for(db, uid=idn.uid, email=idn.email)
+    try:
+        await progress_buffer.put(user_id, media_id, payload.position_s, payload.duration_s)
+    except BufferFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many pending progress updates",
+            headers={"Retry-After": str(max(1, round(PROGRESS_FLUSH_INTERVAL_S)))},
+        )
+
+
+@router.get("/me/progress", response_model=ProgressList)
+async def get_progress(
+    idn: Identity = Depends(get_identity),
+    db: AsyncSession = Depends(get_primary_db),  # may create the user row
+    limit: int = Query(100, ge=1, le=500),
+):
+    user_id = await user_id_for(db, uid=idn.uid, email=idn.email)
+    return {"items": await list_progress(db, user_id, limit)}
@@ -1,24 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from typing import List
+import base64, binascii, os, stat
+from pathlib import Path
+from urllib.parse import urlsplit
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from db.postgres import get_db
-from models.media import Media, MediaORM
+from db.queries import MEDIA_BY_ID, MEDIA_TRANSCRIPT, MEDIA_URL
+from crud.captions import CaptionError, CaptionTooLarge, CAPTION_MAX_BYTES, parse_captions, to_vtt
+from crud.transcripts import index_transcript, replace_transcript
+from cache.catalog import catalog_cache, catalog_response
+from crud.changes import media_change, record_changes
+from cache.transcripts import Loaded, transcript_index
+from cache.ttl import TTLCache
+from models.media import Media, MediaORM, MediaPage, MediaTranscript, TranscriptWindow
+from routers.responses import FastJSONResponse, MediaFileResponse
 
 router = APIRouter()
 
-# --- Get all medias (with simple pagination) ---
-@router.get("/medias", response_model=List[Media])
+# ---- ENV ----
+MEDIA_ROOT           = os.getenv("MEDIA_ROOT", "media")  # media_url without a scheme is a path under it
+STREAM_MAX_AGE_S     = int(os.getenv("STREAM_MAX_AGE_S", "3600"))
+STREAM_URL_TTL_S     = float(os.getenv("STREAM_URL_TTL_S", "60"))
+STREAM_URL_CACHE_MAX = int(os.getenv("STREAM_URL_CACHE_MAX", "10000"))
+
+# --- Keyset pagination ---
+# Listings are ordered by media_id (course listings by (course_id, media_id),
+# see ix_medias_course_id_media_id). The cursor is the last media_id of the
+# page, base64url encoded so clients treat it as opaque.
+
+def encode_cursor(media_id: str) -> str:
+    return base64.urlsafe_b64encode(media_id.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# --- Sparse fieldsets ---
+# Listings leave the media_transcript JSONB out unless asked for with
+# ?fields=...,media_transcript; it is served by /medias/{media_id}/transcript.
+
+MEDIA_FIELDS = tuple(c.name for c in MediaORM.__table__.columns)
+DEFAULT_LIST_FIELDS = tuple(f for f in MEDIA_FIELDS if f != "media_transcript")
+
+def parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    if not fields:
+        return DEFAULT_LIST_FIELDS
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted - set(MEDIA_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    wanted.add("media_id")  # needed for the cursor
+    return tuple(f for f in MEDIA_FIELDS if f in wanted)
+
+async def _page(db: AsyncSession, where, limit: int, cursor: Optional[str], fields: tuple[str, ...]) -> dict:
+    stmt = select(*(MediaORM.__table__.c[f] for f in fields))
+    if where is not None:
+        stmt = stmt.where(where)
+    if cursor:
+        stmt = stmt.where(MediaORM.media_id > decode_cursor(cursor))
+    # one extra row tells us whether there is a next page
+    result = await db.execute(stmt.order_by(MediaORM.media_id).limit(limit + 1))
+    rows = result.mappings().all()
+    next_cursor = encode_cursor(rows[limit - 1]["media_id"]) if len(rows) > limit else None
+    return {"items": [dict(r) for r in rows[:limit]], "next_cursor": next_cursor}
+
+# --- Get all medias (cursor pagination), or a batch by id ---
+MAX_IDS = 100
+
+def parse_ids(ids: str) -> list[str]:
+    out = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not out:
+        raise HTTPException(status_code=400, detail="ids is empty")
+    if len(out) > MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IDS} ids")
+    return out
+
+async def _by_ids(db: AsyncSession, ids: list[str], fields: tuple[str, ...]) -> dict:
+    """One IN query; items follow the order of `ids`, unknown ids are left out."""
+    result = await db.execute(
+        select(*(MediaORM.__table__.c[f] for f in fields)).where(MediaORM.media_id.in_(ids))
+    )
+    rows = {r["media_id"]: dict(r) for r in result.mappings().all()}
+    return {"items": [rows[i] for i in ids if i in rows], "next_cursor": None}
+
+@router.get("/medias", response_model=MediaPage)
 async def get_medias(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated media fields, e.g. media_id,media_title"),
+    ids: Optional[str] = Query(None, description=f"Comma separated media ids (at most {MAX_IDS}), returned in this order"),
 ):
-    stmt = select(MediaORM).limit(limit).offset(offset)
-    result = await db.execute(stmt)
-    rows = result.scalars().all()
-  
-    return [Media.model_validate(r) for r in rows]
+    if ids is not None and cursor:
+        raise HTTPException(status_code=400, detail="ids and cursor cannot be combined")
+
+    async def build():
+        if ids is not None:
+            return await _by_ids(db, parse_ids(ids), parse_fields(fields))
+        return await _page(db, None, limit, cursor, parse_fields(fields))
+
+    return await catalog_response(request, build)
 
 # --- Create a new media ---
 @router.post("/medias", response_model=Media, status_code=status.HTTP_201_CREATED)
@@ -30,28 +117,142 @@ async def create_media(media: Media, db: AsyncSession = Depends(get_db)):
 
     row = MediaORM(**media.model_dump())
     db.add(row)
+    await db.flush()
+    # same transaction, so search never sees a media without its lines
+    await index_transcript(db, media_id=row.media_id, course_id=row.course_id, transcript=row.media_transcript)
+    await record_changes(db, [media_change("created", row.media_id, row.course_id)])
     await db.commit()
+    catalog_cache.invalidate()
     await db.refresh(row)
     return Media.model_validate(row)
 
-# --- Get medias by course_id (collection: return [] when empty) ---
-@router.get("/courses/{course_id}/medias", response_model=List[Media])
+# --- Get medias by course_id (collection: empty page when none) ---
+@router.get("/courses/{course_id}/medias", response_model=MediaPage)
 async def get_medias_by_course(
     course_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated media fields, e.g. media_id,media_title"),
 ):
-    stmt = select(MediaORM).where(MediaORM.course_id == course_id).limit(limit).offset(offset)
-    result = await db.execute(stmt)
-    rows = result.scalars().all()
-    return [Media.model_validate(r) for r in rows]
+    async def build():
+        return await _page(db, MediaORM.course_id == course_id, limit, cursor, parse_fields(fields))
+
+    return await catalog_response(request, build)
 
 # --- Get media by media_id (item: 404 if not found) ---
 @router.get("/medias/{media_id}", response_model=Media)
 async def get_media_by_id(media_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(MediaORM).where(MediaORM.media_id == media_id))
-    row = result.scalar_one_or_none()
+    result = await db.execute(MEDIA_BY_ID, {"media_id": media_id})
+    row = result.mappings().one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail=f"Media with id '{media_id}' not found")
-    return Media.model_validate(row)
+    return FastJSONResponse(dict(row))
+
+async def _load_transcript(db: AsyncSession, media_id: str) -> Loaded:
+    result = await db.execute(MEDIA_TRANSCRIPT, {"media_id": media_id})
+    row = result.mappings().one_or_none()
+    return Loaded(False) if row is None else Loaded(True, row["media_transcript"])
+
+# --- Transcript of one media (kept out of the listings) ---
+# ?at=<s> returns the line active at that time, ?from=&to= the lines of a
+# window, both from the in-memory index (cache/transcripts.py); with neither
+# the whole stored transcript is returned.
+@router.get("/medias/{media_id}/transcript", response_model=Union[TranscriptWindow, MediaTranscript])
+async def get_media_transcript(
+    media_id: str,
+    db: AsyncSession = Depends(get_db),
+    at: Optional[int] = Query(None, ge=0, description="Playback time"),
+    from_: Optional[int] = Query(None, alias="from", ge=0),
+    to: Optional[int] = Query(None, ge=0),
+):
+    async def load_transcript() -> Loaded:
+        return await _load_transcript(db, media_id)
+
+    if at is None and from_ is None and to is None:
+        loaded = await load_transcript()
+        if not loaded.found:
+            raise HTTPException(status_code=404, detail=f"Media with id '{media_id}' not found")
+        return FastJSONResponse({"media_id": media_id, "media_transcript": loaded.transcript})
+
+    if at is not None and (from_ is not None or to is not None):
+        raise HTTPException(status_code=400, detail="Use either at or from/to")
+    if from_ is not None and to is not None and from_ > to:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+
+    index = await transcript_index.get(media_id, load_transcript)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Media with id '{media_id}' not found")
+    if at is not None:
+        lines, next_time = index.at(at)
+    else:
+        lines, next_time = index.between(from_ or 0, to)
+    return FastJSONResponse({"media_id": media_id, "lines": lines, "next_time": next_time})
+
+# --- Transcript as captions: WebVTT/SRT in, WebVTT out ---
+# The upload is parsed while it streams in (crud/captions.py) and replaces
+# the stored transcript; the export is written from the transcript index.
+@router.put("/medias/{media_id}/transcript", status_code=status.HTTP_204_NO_CONTENT)
+async def put_media_transcript(media_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Body: WebVTT (text/vtt) or SRT, UTF-8."""
+    try:
+        transcript = await parse_captions(request.stream())
+    except CaptionTooLarge:
+        raise HTTPException(status_code=413, detail=f"Captions larger than {CAPTION_MAX_BYTES} bytes")
+    except CaptionError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid captions, {e}")
+    if not await replace_transcript(db, media_id, transcript):
+        raise HTTPException(status_code=404, detail=f"Media with id '{media_id}' not found")
+    catalog_cache.invalidate()
+    transcript_index.pop(media_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+# the session is only needed to load the index: released before the body streams
+@router.get("/medias/{media_id}/transcript.vtt", response_class=StreamingResponse)
+async def get_media_transcript_vtt(media_id: str, db: AsyncSession = Depends(get_db, scope="function")):
+    index = await transcript_index.get(media_id, lambda: _load_transcript(db, media_id))
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Media with id '{media_id}' not found")
+
+    async def body():
+        for chunk in to_vtt(index.times, index.texts()):
+            yield chunk.encode()
+
+    return StreamingResponse(body(), media_type="text/vtt; charset=utf-8")
+
+# --- Stream a locally stored media file (Range, conditional GET) ---
+# media_id -> media_url, so range requests (players seek a lot) skip the DB
+_media_urls = TTLCache(STREAM_URL_CACHE_MAX, STREAM_URL_TTL_S)
+
+def _local_file(media_url: str) -> tuple[Path, os.stat_result] | None:
+    """Resolve media_url under MEDIA_ROOT and stat it; None if not a local file."""
+    if urlsplit(media_url).scheme:
+        return None
+    root = Path(MEDIA_ROOT).resolve()
+    path = (root / media_url.lstrip("/")).resolve()
+    if not path.is_relative_to(root):
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st) if stat.S_ISREG(st.st_mode) else None
+
+# the session is only needed for media_url: released before the file is sent
+@router.get("/medias/{media_id}/stream", response_class=MediaFileResponse)
+@router.head("/medias/{media_id}/stream", response_class=MediaFileResponse)
+async def stream_media(media_id: str, db: AsyncSession = Depends(get_db, scope="function")):
+    media_url = _media_urls.get(media_id)
+    if media_url is None:
+        result = await db.execute(MEDIA_URL, {"media_id": media_id})
+        media_url = result.scalar_one_or_none()
+        if media_url is None:
+            raise HTTPException(status_code=404, detail=f"Media with id '{media_id}' not found")
+        _media_urls.set(media_id, media_url)
+
+    local = await anyio.to_thread.run_sync(_local_file, media_url)
+    if local is None:
+        raise HTTPException(status_code=404, detail="Media is not stored locally")
+    path, st = local
+    return MediaFileResponse(path, st, headers={"Cache-Control": f"public, max-age={STREAM_MAX_AGE_S}"})
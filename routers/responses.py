@@ -0,0 +1,58 @@
+# routers/responses.py
+import os
+from email.utils import parsedate_to_datetime
+
+from fastapi import Response
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+
+from cache.catalog import etag_matches
+from models.serialize import dumps
+
+# ---- ENV ----
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", str(1024 * 1024)))
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for plain dicts/lists straight from DB rows. Returning it
+    skips the response_model pass, so rows are validated/serialized once.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class MediaFileResponse(FileResponse):
+    """
+    FileResponse for media streaming, with STREAM_CHUNK_BYTES reads and 304
+    answers to If-None-Match / If-Modified-Since. Range, If-Range, 206 and
+    416 are FileResponse's, and so is the body: the server's zero-copy
+    `http.response.pathsend` when it offers it, chunked reads otherwise.
+    """
+    chunk_size = STREAM_CHUNK_BYTES
+
+    def __init__(self, path, stat_result: os.stat_result, status_code: int = 200, headers: dict | None = None,
+                 media_type: str | None = None):
+        super().__init__(path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result)
+
+    def _not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, self.headers["etag"])
+        if_modified_since = request_headers.get("if-modified-since")
+        if not if_modified_since:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(self.stat_result.st_mtime) <= since
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self._not_modified(Headers(scope=scope)):
+            keep = ("etag", "last-modified", "cache-control")
+            headers = {k: self.headers[k] for k in keep if k in self.headers}
+            return await Response(status_code=304, headers=headers)(scope, receive, send)
+        await super().__call__(scope, receive, send)
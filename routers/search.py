@@ -0,0 +1,67 @@
+# routers/search.py
+import base64, binascii
+from typing import Optional
+import sqlalchemy as sa
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.postgres import get_db
+from models.transcript import TranscriptLineORM, SearchPage, SEARCH_TS_CONFIG
+from routers.responses import FastJSONResponse
+
+router = APIRouter(tags=["search"])
+
+T = TranscriptLineORM
+_TS_CONFIG = sa.literal_column(f"'{SEARCH_TS_CONFIG}'::regconfig")
+_HEADLINE_OPTS = "StartSel=<b>, StopSel=</b>, MaxWords=25, MinWords=8"
+
+# --- Cursor ---
+# Hits are ordered by (rank, media_id, line_no) descending; the cursor is
+# that triple of the last hit, base64url encoded.
+
+def _encode_cursor(rank: float, media_id: str, line_no: int) -> str:
+    raw = f"{rank!r}|{line_no}|{media_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[float, str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        rank, line_no, media_id = raw.split("|", 2)
+        return float(rank), media_id, int(line_no)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/search", response_model=SearchPage)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words or \"phrases\", web search syntax"),
+    course_id: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_db),
+):
+    tsq = func.websearch_to_tsquery(_TS_CONFIG, q)
+    rank = sa.cast(func.ts_rank(T.text_tsv, tsq), sa.Float)
+
+    stmt = (
+        select(
+            T.media_id, T.course_id, T.time, T.line_no, rank.label("rank"),
+            func.ts_headline(_TS_CONFIG, T.text, tsq, _HEADLINE_OPTS).label("snippet"),
+        )
+        .where(T.text_tsv.op("@@")(tsq))
+    )
+    if course_id:
+        stmt = stmt.where(T.course_id == course_id)
+    if cursor:
+        c_rank, c_media_id, c_line_no = _decode_cursor(cursor)
+        stmt = stmt.where(sa.tuple_(rank, T.media_id, T.line_no) < sa.tuple_(c_rank, c_media_id, c_line_no))
+
+    # one extra row tells us whether there is a next page
+    stmt = stmt.order_by(rank.desc(), T.media_id.desc(), T.line_no.desc()).limit(limit + 1)
+    rows = (await db.execute(stmt)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_cursor(last["rank"], last["media_id"], last["line_no"])
+    return FastJSONResponse({"items": [dict(r) for r in rows[:limit]], "next_cursor": next_cursor})